@@ -1,96 +1,243 @@
-import tkinter as tk
-from tkinter import messagebox, simpledialog
-import sqlite3, webbrowser
-from datetime import datetime
+import time
+STARTED = time.perf_counter()   # --profile-startup measures from here
 
-# -----------------------------
-# Database setup
-# -----------------------------
-conn = sqlite3.connect("astronomy_app.db")
-cur = conn.cursor()
-
-# user table
-cur.execute("""
-CREATE TABLE IF NOT EXISTS users (
-    username TEXT PRIMARY KEY,
-    password TEXT NOT NULL
-)
-""")
-
-# quiz results table
-cur.execute("""
-CREATE TABLE IF NOT EXISTS quiz_results (
-    username TEXT,
-    score INTEGER,
-    total INTEGER,
-    level TEXT,
-    time TEXT
-)
-""")
-
-# completed topics
-cur.execute("""
-CREATE TABLE IF NOT EXISTS completed_topics (
-    username TEXT,
-    topic_id INTEGER
-)
-""")
-
-# schedule data
-cur.execute("""
-CREATE TABLE IF NOT EXISTS schedules (
-    username TEXT,
-    time TEXT,
-    object TEXT
-)
-""")
-conn.commit()
+import tkinter as tk
+from tkinter import filedialog, messagebox, simpledialog
+import argparse, base64
+from collections import OrderedDict
+from contextlib import nullcontext
+from datetime import date, datetime
+from functools import wraps
+
+# question_bank, schedule_io, content_store and the sky modules are imported
+# inside the worker jobs that use them, keeping them off the startup path
+import auth
+import services
+from instrument import TRACER, Overlay, trace_cursor
+from storage import DB_PATH, Database, ScheduleEntry
+from worker import CallbackMonitor, DbWorker, StartupProfile
+
+FIRST_PAINT_TIMEOUT_MS = 500    # start disk work anyway if the window is never exposed
 
 # -----------------------------
 # Base Screen
 # -----------------------------
 class BaseScreen:
+    # data topics this screen shows; AstronomyApp.invalidate() refreshes it when one changes
+    depends_on = frozenset()
+
     def __init__(self, parent, app):
         self.app = app
         self.parent = parent
+        self.stale = False
         self.frame = tk.Frame(parent, bg="#050A1A")
         self.frame.pack(fill="both", expand=True)
 
     def destroy(self):
         self.frame.destroy()
 
+    def hide(self):
+        self.frame.pack_forget()
+
+    def show(self):
+        self.frame.pack(fill="both", expand=True)
+        if self.stale:
+            self.stale = False
+            self.refresh()
+
+    def refresh(self):
+        pass
+
+    def run_io(self, job, callback=None, error=None, worker=None):
+        # job(db) runs on the DB thread (or worker's); results for a screen that is gone are dropped
+        def guard(fn):
+            @wraps(fn)
+            def deliver(result):
+                if self.frame.winfo_exists():
+                    fn(result)
+            return deliver if fn else None
+        (worker or self.app.io).submit(job, guard(callback), guard(error))
+
 
 # -----------------------------
 # Main App Class
 # -----------------------------
 class AstronomyApp:
-    def __init__(self):
-        self.root = tk.Tk()
-        self.root.title("🌌 Astronomy Learning App")
-        self.root.geometry("1100x700")
-        self.root.config(bg="#000010")
-
-        self.canvas = tk.Canvas(self.root, bg="#000010", highlightthickness=0)
-        self.canvas.pack(fill="both", expand=True)
-
+    def __init__(self, watchdog_ms=None, db_path=DB_PATH, cache_size=4, profile=None, trace_path=None):
+        # must wrap tkinter before any command is registered
+        self.monitor = CallbackMonitor(watchdog_ms).install() if watchdog_ms else None
+        self.profile = profile
+        self.trace_path = trace_path
+        TRACER.enabled = trace_path is not None
+        with self.phase("create Tk window"):
+            self.root = tk.Tk()
+            self.root.title("🌌 Astronomy Learning App")
+            self.root.geometry("1100x700")
+            self.root.config(bg="#000010")
+
+            self.canvas = tk.Canvas(self.root, bg="#000010", highlightthickness=0)
+            self.canvas.pack(fill="both", expand=True)
+
+        # the worker thread opens (and if needed migrates) the database on its first job
+        self.db_path = db_path
+        self.io = DbWorker(self.root, lambda: self.open_database(db_path), tracer=TRACER)
+        self.session_file = auth.session_path(db_path)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        # F12: live span overlay (tracing stays on while it is shown); Ctrl+F12: save a Chrome trace
+        self.overlay = Overlay(self.root)
+        self.root.bind("<F12>", self.toggle_overlay)
+        self.root.bind("<Control-F12>", self.save_trace)
+
+        # built screens, least recently shown first; hidden ones keep their widgets
+        self.screens = OrderedDict()
+        self.cache_size = cache_size
         self.current_screen = None
         self.username = None
-        self.show_screen("LoginScreen")
+        self.painted = False
+        self.io_started = False
+        self.closing = False
+        with self.phase("build login screen"):
+            self.show_screen("LoginScreen")
+        # no disk work until the login window is on screen
+        self.current_screen.frame.bind("<Expose>", self.on_first_paint, add="+")
+        self.root.after(FIRST_PAINT_TIMEOUT_MS, self.start_io)
+
+    def phase(self, name):
+        return self.profile.span(name) if self.profile else nullcontext()
+
+    def open_database(self, path):
+        with self.phase("open + migrate database"):
+            db = Database(path)
+        if TRACER.enabled:
+            trace_cursor(db)
+        return db
+
+    def on_first_paint(self, event):
+        if self.painted:
+            return
+        self.painted = True
+        if self.profile:
+            self.profile.mark("first paint")
+        # idle callbacks queued by the expose (widget redraws) run before this one
+        self.root.after_idle(self.start_io)
+
+    def start_io(self):
+        if self.io_started:
+            return
+        self.io_started = True
+        login = self.screens.get("LoginScreen")
+        if login is not None:
+            login.resume_session()
+        if self.profile:
+            # jobs run in order, so this lands right after the saved-session check
+            self.io.submit(lambda db: None, self.finish_profile)
+        self.migrate_passwords()
+
+    def finish_profile(self, _):
+        self.profile.mark("login ready")
+        print(self.profile.report(), file=self.profile.stream)
+        painted = self.profile.elapsed("first paint")
+        print(f"[startup] first paint: {'not seen' if painted is None else f'{painted:.1f} ms'}, "
+              f"usable login: {self.profile.elapsed('login ready'):.1f} ms", file=self.profile.stream)
+        # not from inside the worker's poll, which still has to return through root
+        self.root.after_idle(self.close)
+
+    def migrate_passwords(self, converted=None):
+        # one small batch per job so logins queued behind it wait at most one batch
+        if converted != 0:
+            self.io.submit(lambda db: db.migrate_passwords(), self.migrate_passwords)
+
+    def forget_session(self):
+        path = self.session_file
+        self.io.submit(lambda db: services.forget_session(db, path))
+
+    def set_tracing(self, on):
+        TRACER.enabled = on
+        self.io.submit(lambda db: trace_cursor(db, on))
+
+    def toggle_overlay(self, event=None):
+        if self.overlay.visible:
+            self.overlay.hide()
+            self.set_tracing(self.trace_path is not None)
+        else:
+            self.set_tracing(True)
+            self.overlay.show()
+
+    def save_trace(self, event=None):
+        path = self.trace_path or f"starlens-trace-{datetime.now():%Y%m%d-%H%M%S}.json"
+
+        def saved(count):
+            self.overlay.note = f"saved {count} spans to {path}"
+            print(f"[trace] {self.overlay.note}")
+        # serializing a full buffer takes a while: keep it off the Tk thread
+        self.io.submit(lambda db: TRACER.dump(path), saved)
+
+    def close(self):
+        self.closing = True
+        # screens that run workers of their own (the leaderboard) shut them down in destroy()
+        for screen in self.screens.values():
+            screen.destroy()
+        self.screens.clear()
+        self.io.close()
+        self.root.destroy()
+        if self.monitor:
+            self.monitor.uninstall()
+            print(self.monitor.summary())
+        if self.trace_path:
+            print(f"[trace] saved {TRACER.dump(self.trace_path)} spans to {self.trace_path}")
 
     def show_screen(self, name):
-        if self.current_screen:
-            self.current_screen.destroy()
-
+        with TRACER.span(f"show {name}", "screens"):
+            if self.current_screen:
+                self.current_screen.hide()
+
+            screen = self.screens.pop(name, None)
+            if screen is None:
+                screen = self.build_screen(name)
+            else:
+                screen.show()
+            self.screens[name] = screen
+            self.current_screen = screen
+
+            while len(self.screens) > max(self.cache_size, 1):
+                _, old = self.screens.popitem(last=False)
+                old.destroy()
+        if TRACER.enabled:
+            # geometry and redraws queued by the switch run as idle tasks ahead of this one
+            start = time.perf_counter()
+            self.root.after_idle(lambda: TRACER.add(f"layout + draw {name}", "widgets", start, time.perf_counter()))
+
+    def build_screen(self, name):
         screens = {
             "LoginScreen": LoginScreen,
             "MainMenuScreen": MainMenuScreen,
             "ProfileScreen": ProfileScreen,
             "QuizScreen": QuizScreen,
             "LearningScreen": LearningScreen,
-            "ScheduleScreen": ScheduleScreen
+            "ScheduleScreen": ScheduleScreen,
+            "SkyMapScreen": SkyMapScreen,
+            "LeaderboardScreen": LeaderboardScreen,
         }
         ScreenClass = screens[name]
-        self.current_screen = ScreenClass(self.canvas, self)
+        with TRACER.span(f"build {name}", "widgets"):
+            return ScreenClass(self.canvas, self)
+
+    def invalidate(self, *topics, origin=None):
+        # origin: the screen that made the change and already shows it
+        for screen in self.screens.values():
+            if screen is not origin and screen.depends_on.intersection(topics):
+                if screen is self.current_screen:
+                    screen.refresh()
+                else:
+                    screen.stale = True
+
+    def set_user(self, username):
+        # cached screens show the previous user's data
+        self.username = username
+        for name, screen in list(self.screens.items()):
+            if screen is not self.current_screen:
+                screen.destroy()
+                del self.screens[name]
 
     def run(self):
         self.root.mainloop()
@@ -113,8 +260,25 @@ class LoginScreen(BaseScreen):
         self.password = tk.Entry(self.frame, width=30, show="*")
         self.password.pack(pady=6)
 
-        tk.Button(self.frame, text="Login", bg="#1768AC", fg="white", command=self.login).pack(pady=10)
-        tk.Button(self.frame, text="Create Account", bg="#1C2E4A", fg="white", command=self.create_account).pack(pady=5)
+        self.login_btn = tk.Button(self.frame, text="Login", bg="#1768AC", fg="white", command=self.login)
+        self.login_btn.pack(pady=10)
+        self.remember = tk.BooleanVar(value=True)
+        tk.Checkbutton(self.frame, text="Remember me", variable=self.remember, bg="#050A1A", fg="white",
+                       selectcolor="#1C2E4A", activebackground="#050A1A").pack()
+        self.create_btn = tk.Button(self.frame, text="Create Account", bg="#1C2E4A", fg="white", command=self.create_account)
+        self.create_btn.pack(pady=5)
+        self.status = tk.Label(self.frame, text="", bg="#050A1A", fg="#7CC7FF")
+        self.status.pack()
+
+    def show(self):
+        self.password.delete(0, "end")
+        super().show()
+
+    def set_busy(self, busy):
+        state = "disabled" if busy else "normal"
+        self.login_btn.config(state=state)
+        self.create_btn.config(state=state)
+        self.status.config(text="Please wait…" if busy else "")
 
     def login(self):
         uname = self.username.get().strip()
@@ -124,10 +288,19 @@ class LoginScreen(BaseScreen):
             messagebox.showerror("Error", "Please fill all fields")
             return
 
-        cur.execute("SELECT * FROM users WHERE username=? AND password=?", (uname, pwd))
-        user = cur.fetchone()
-        if user:
-            self.app.username = uname
+        remember, path = self.remember.get(), self.app.session_file
+        self.set_busy(True)
+        self.run_io(lambda db: services.login(db, uname, pwd, remember, path), lambda ok: self.finish_login(uname, ok))
+
+    def resume_session(self):
+        path = self.app.session_file
+        self.set_busy(True)
+        self.run_io(lambda db: services.resume_session(db, path), lambda uname: self.finish_login(uname, True) if uname else self.set_busy(False))
+
+    def finish_login(self, uname, ok):
+        self.set_busy(False)
+        if ok:
+            self.app.set_user(uname)
             self.app.show_screen("MainMenuScreen")
         else:
             messagebox.showerror("Error", "Invalid username or password!")
@@ -138,11 +311,14 @@ class LoginScreen(BaseScreen):
         if not uname or not pwd:
             messagebox.showerror("Error", "Enter username and password")
             return
-        try:
-            cur.execute("INSERT INTO users (username, password) VALUES (?, ?)", (uname, pwd))
-            conn.commit()
+        self.set_busy(True)
+        self.run_io(lambda db: db.create_user(uname, pwd), self.finish_create)
+
+    def finish_create(self, created):
+        self.set_busy(False)
+        if created:
             messagebox.showinfo("Success", "Account created successfully!")
-        except:
+        else:
             messagebox.showerror("Error", "Username already exists!")
 
 
@@ -168,20 +344,28 @@ class MainMenuScreen(BaseScreen):
                   command=lambda: app.show_screen("ProfileScreen")).pack(pady=10)
         tk.Button(menu, text="📅 Schedule", width=25, height=2, bg="#1C2E4A", fg="white", font=("Segoe UI", 13),
                   command=lambda: app.show_screen("ScheduleScreen")).pack(pady=10)
+        tk.Button(menu, text="🗺 Sky Map", width=25, height=2, bg="#24345C", fg="white", font=("Segoe UI", 13),
+                  command=lambda: app.show_screen("SkyMapScreen")).pack(pady=10)
         tk.Button(menu, text="🧠 Quiz", width=25, height=2, bg="#1768AC", fg="white", font=("Segoe UI", 13),
                   command=lambda: app.show_screen("QuizScreen")).pack(pady=10)
         tk.Button(menu, text="📖 Learning Section", width=25, height=2, bg="#3B7A57", fg="white", font=("Segoe UI", 13),
                   command=lambda: app.show_screen("LearningScreen")).pack(pady=10)
+        tk.Button(menu, text="🏆 Leaderboard", width=25, height=2, bg="#6B4E16", fg="white", font=("Segoe UI", 13),
+                  command=lambda: app.show_screen("LeaderboardScreen")).pack(pady=10)
 
     def logout(self):
-        self.app.username = None
+        # queued before the login screen can look for a saved session
+        self.app.forget_session()
         self.app.show_screen("LoginScreen")
+        self.app.set_user(None)
 
 
 # -----------------------------
 # Profile Screen
 # -----------------------------
 class ProfileScreen(BaseScreen):
+    depends_on = frozenset({"quiz_results"})
+
     def __init__(self, parent, app):
         super().__init__(parent, app)
 
@@ -192,29 +376,317 @@ class ProfileScreen(BaseScreen):
         frame = tk.Frame(self.frame, bg="#050A1A")
         frame.pack(pady=10)
 
-        cur.execute("SELECT score,total,level,time FROM quiz_results WHERE username=?", (app.username,))
-        data = cur.fetchall()
+        self.total_lbl = tk.Label(frame, text="Total Quizzes: …", fg="white", bg="#050A1A", font=("Segoe UI", 14))
+        self.total_lbl.pack()
+        self.avg_lbl = tk.Label(frame, text="Average Score: …", fg="white", bg="#050A1A", font=("Segoe UI", 14))
+        self.avg_lbl.pack()
+        self.best_lbl = tk.Label(frame, text="Best Score: …", fg="white", bg="#050A1A", font=("Segoe UI", 14))
+        self.best_lbl.pack()
 
-        total_quizzes = len(data)
-        avg = round(sum(d[0]/d[1] for d in data)/total_quizzes*100, 1) if total_quizzes else 0
-        best = max((d[0]/d[1])*100 for d in data) if data else 0
+        tk.Label(self.frame, text="\nRecent Quiz History", bg="#050A1A", fg="#7CC7FF", font=("Segoe UI", 14, "bold")).pack()
+        self.box = tk.Text(self.frame, height=10, width=80, bg="#0B1733", fg="white")
+        self.box.pack(pady=8)
+        self.box.insert("end", "Loading…")
+        self.box.config(state="disabled")
+        self.refresh()
 
-        tk.Label(frame, text=f"Total Quizzes: {total_quizzes}", fg="white", bg="#050A1A", font=("Segoe UI", 14)).pack()
-        tk.Label(frame, text=f"Average Score: {avg}%", fg="white", bg="#050A1A", font=("Segoe UI", 14)).pack()
-        tk.Label(frame, text=f"Best Score: {best}%", fg="white", bg="#050A1A", font=("Segoe UI", 14)).pack()
+    def refresh(self):
+        uname = self.app.username
+        self.run_io(lambda db: services.profile(db, uname), self.show_stats)
 
-        tk.Label(self.frame, text="\nRecent Quiz History", bg="#050A1A", fg="#7CC7FF", font=("Segoe UI", 14, "bold")).pack()
-        box = tk.Text(self.frame, height=10, width=80, bg="#0B1733", fg="white")
-        box.pack(pady=8)
-        for row in data[-10:]:
-            box.insert("end", f"{row[3]} — {row[2]} — Score: {row[0]}/{row[1]} ({round(row[0]/row[1]*100,1)}%)\n")
-        box.config(state="disabled")
+    def show_stats(self, data):
+        stats, recent = data
+        self.total_lbl.config(text=f"Total Quizzes: {stats.attempts}")
+        self.avg_lbl.config(text=f"Average Score: {stats.average}%")
+        self.best_lbl.config(text=f"Best Score: {stats.best}%")
+
+        self.box.config(state="normal")
+        self.box.delete("1.0", "end")
+        for row in recent:
+            self.box.insert("end", f"{row.time} — {row.level} — Score: {row.score}/{row.total} ({row.pct}%)\n")
+        self.box.config(state="disabled")
+
+
+# -----------------------------
+# Leaderboard Screen
+# -----------------------------
+class LeaderboardScreen(BaseScreen):
+    depends_on = frozenset({"quiz_results"})
+    board_rows = 15
+    curve_w, curve_h = 440, 220
+    level_colors = {"Easy": "#3B7A57", "Medium": "#1768AC", "Hard": "#A63232"}    # question_bank.LEVELS
+
+    def __init__(self, parent, app):
+        super().__init__(parent, app)
+        self.analytics = None
+        self.loading = False
+        self.reload = False
+
+        tk.Button(self.frame, text="← Back to Menu", bg="#1C2E4A", fg="white",
+                  command=lambda: app.show_screen("MainMenuScreen")).pack(anchor="nw", padx=12, pady=10)
+        tk.Label(self.frame, text="🏆 Leaderboard", font=("Segoe UI", 22, "bold"), fg="#7CC7FF", bg="#050A1A").pack(pady=10)
+
+        controls = tk.Frame(self.frame, bg="#050A1A")
+        controls.pack()
+        tk.Label(controls, text="Level:", bg="#050A1A", fg="white", font=("Segoe UI", 12)).pack(side="left")
+        self.level = tk.StringVar(value="All levels")
+        tk.OptionMenu(controls, self.level, "All levels", *self.level_colors,
+                      command=lambda _: self.refresh()).pack(side="left", padx=(4, 20))
+        tk.Label(controls, text="Rank by:", bg="#050A1A", fg="white", font=("Segoe UI", 12)).pack(side="left")
+        self.order = tk.StringVar(value="points")
+        for by in ("points", "average", "streak"):
+            tk.Radiobutton(controls, text=by.title(), value=by, variable=self.order, command=self.refresh,
+                           bg="#050A1A", fg="white", selectcolor="#1C2E4A", activebackground="#050A1A").pack(side="left")
+        self.status = tk.Label(self.frame, text="Updating…", bg="#050A1A", fg="#7CC7FF", font=("Segoe UI", 10))
+        self.status.pack(pady=4)
+
+        body = tk.Frame(self.frame, bg="#050A1A")
+        body.pack(fill="both", expand=True, padx=20, pady=8)
+        self.board = tk.Text(body, width=58, bg="#0B1733", fg="white", font=("Courier", 11), relief="flat", padx=8, pady=6)
+        self.board.pack(side="left", fill="y")
+        self.board.tag_configure("head", foreground="#7CC7FF")
+        self.board.tag_configure("me", foreground="#FFB347")
+
+        side = tk.Frame(body, bg="#050A1A")
+        side.pack(side="left", fill="both", expand=True, padx=(16, 0))
+        tk.Label(side, text="Average score by attempt", bg="#050A1A", fg="#7CC7FF", font=("Segoe UI", 13, "bold")).pack(anchor="w")
+        self.curve = tk.Canvas(side, width=self.curve_w, height=self.curve_h, bg="#0B1733", highlightthickness=0)
+        self.curve.pack(anchor="w", pady=4)
+        self.curve_lbl = tk.Label(side, text="", bg="#050A1A", fg="white", justify="left", font=("Segoe UI", 10))
+        self.curve_lbl.pack(anchor="w")
+        tk.Label(side, text="Hardest questions", bg="#050A1A", fg="#7CC7FF", font=("Segoe UI", 13, "bold")).pack(anchor="w", pady=(10, 0))
+        self.questions = tk.Text(side, height=6, bg="#0B1733", fg="white", wrap="word", relief="flat", padx=8, pady=6)
+        self.questions.pack(fill="x")
+        self.refresh()
+
+    def refresh(self):
+        # one update at a time; a change made meanwhile is picked up when it is done
+        if self.loading:
+            self.reload = True
+            return
+        self.loading, self.reload = True, False
+        if self.order.get() == "streak":
+            self.level.set("All levels")    # a streak runs across levels
+        if self.analytics is None:
+            # its own thread: a first full rebuild takes seconds and must not hold up the app's queries
+            path = self.app.db_path
+
+            def open_analytics():
+                import analytics    # NumPy, loaded on first use
+                return analytics.Analytics(path)
+            self.analytics = DbWorker(self.app.root, open_analytics, tracer=TRACER, name="starlens-analytics")
+
+        uname, by = self.app.username, self.order.get()
+        level = None if self.level.get() == "All levels" else self.level.get()
+        rows = self.board_rows
+
+        def job(engine):
+            report = engine.refresh()
+            return (report, engine.leaderboard(by, level, rows), engine.rank_of(uname, by, level),
+                    engine.difficulty_curves(), engine.question_accuracy(limit=5))
+
+        self.status.config(text="Updating…")
+        # results still queued on the app's connection must reach the file first
+        self.run_io(lambda db: db.flush(),
+                    lambda _: self.run_io(job, self.show_board, self.show_error, worker=self.analytics),
+                    self.show_error)
+
+    def show_board(self, data):
+        report, board, mine, curves, questions = data
+        self.loading = False
+        if self.reload:
+            self.refresh()
+        level = None if self.level.get() == "All levels" else self.level.get()
+        players = board[0].players if board else 0
+        self.status.config(text=f"{players:,} players · updated in {report.seconds:.2f}s")
+
+        self.board.config(state="normal")
+        self.board.delete("1.0", "end")
+        self.board.insert("end", f"{'#':>5}  {'Player':<18}{'Points':>7}{'Avg %':>7}{'Quizzes':>8}{'Streak':>8}\n", "head")
+        for row in board:
+            self.insert_row(row)
+        if mine is not None and all(row.username != mine.username for row in board):
+            self.board.insert("end", f"{'⋮':>5}\n")
+            self.insert_row(mine)
+        if not board:
+            self.board.insert("end", "\nNo quiz results yet. Take a quiz to get on the board!")
+        self.board.config(state="disabled")
+
+        self.draw_curves([c for c in curves if level in (None, c.level)])
+        self.questions.config(state="normal")
+        self.questions.delete("1.0", "end")
+        for q in questions:
+            self.questions.insert("end", f"{q.accuracy:5.1f}% right of {q.attempts:,} — [{q.level}] {q.text}\n")
+        if not questions:
+            self.questions.insert("end", "Not enough answers yet.")
+        self.questions.config(state="disabled")
+
+    def insert_row(self, row):
+        tag = "me" if row.username == self.app.username else ""
+        self.board.insert("end", f"{row.rank:>5}  {row.username[:17]:<18}{row.points:>7}{row.average:>7.1f}"
+                                 f"{row.attempts:>8}{row.streak:>4}/{row.best_streak:<3}\n", tag)
+
+    def draw_curves(self, curves):
+        c, w, h, pad = self.curve, self.curve_w, self.curve_h, 30
+        c.delete("all")
+        c.create_line(pad, h - pad, w - 10, h - pad, fill="#35507A")
+        c.create_line(pad, 10, pad, h - pad, fill="#35507A")
+
+        def y(pct):
+            return h - pad - pct * (h - pad - 10) / 100
+
+        for pct in (0, 50, 100):
+            c.create_text(pad - 4, y(pct), text=str(pct), anchor="e", fill="#7CC7FF", font=("Segoe UI", 8))
+        c.create_text(w - 10, h - pad + 12, text="attempt →", anchor="e", fill="#7CC7FF", font=("Segoe UI", 8))
+        for n, curve in enumerate(curves):
+            color = self.level_colors.get(curve.level, "#B8D8FF")
+            step = (w - pad - 10) / max(len(curve.by_attempt) - 1, 1)
+            points = [(pad + i * step, y(v)) for i, v in enumerate(curve.by_attempt) if v is not None]
+            if len(points) > 1:
+                c.create_line(*[xy for p in points for xy in p], fill=color, width=2)
+            c.create_text(pad + 8 + 80 * n, 14, text=curve.level, anchor="w", fill=color, font=("Segoe UI", 9, "bold"))
+        self.curve_lbl.config(text="\n".join(
+            f"{c.level}: {c.attempts:,} quizzes by {c.users:,} players, average {c.average}%, {c.pass_rate}% passed"
+            for c in curves) or "No quizzes taken yet.")
+
+    def show_error(self, exc):
+        self.loading = False
+        self.status.config(text=f"Leaderboard unavailable: {exc}")
+        if self.reload:
+            self.refresh()
+
+    def destroy(self):
+        if self.analytics is not None:
+            quitting = self.app.closing
+            if quitting and self.analytics.db is not None:
+                # cut a rebuild's SQL short; its transaction rolls back and the next refresh redoes it
+                self.analytics.db.interrupt()
+            # leaving the screen doesn't wait for a rebuild in progress, quitting the app does
+            self.analytics.close(wait=quitting)
+        super().destroy()
+
+
+# -----------------------------
+# Virtualized list
+# -----------------------------
+class VirtualRow:
+    def __init__(self, window, frame, label):
+        self.window = window
+        self.frame = frame
+        self.label = label
+        self.index = None
+
+
+class VirtualList:
+    """Scrollable list that only has widgets for the rows on screen.
+
+    A fixed pool of row frames is moved and relabelled as the view scrolls,
+    so the widget count depends on the window height, not on len(items).
+    Items are NamedTuples with an ``id`` field used for in-place updates.
+    """
+
+    def __init__(self, parent, row_text, on_edit, row_height=36, bg="#050A1A", button_text="Edit"):
+        self.row_text = row_text
+        self.on_edit = on_edit
+        self.button_text = button_text
+        self.row_height = row_height
+        self.bg = bg
+        self.items = []
+        self.positions = {}
+        self.rows = []
+
+        self.canvas = tk.Canvas(parent, bg=bg, highlightthickness=0, yscrollincrement=row_height)
+        self.scrollbar = tk.Scrollbar(parent, orient="vertical", command=self.canvas.yview)
+        self.canvas.config(yscrollcommand=self.on_view_change)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.canvas.bind("<Configure>", self.on_resize)
+        self.bind_wheel(self.canvas)
+
+    def bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self.canvas.yview_scroll(-1 if e.delta > 0 else 1, "units"))
+        widget.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-1, "units"))
+        widget.bind("<Button-5>", lambda e: self.canvas.yview_scroll(1, "units"))
+
+    def make_row(self):
+        frame = tk.Frame(self.canvas, bg=self.bg)
+        label = tk.Label(frame, bg=self.bg, fg="white", font=("Segoe UI", 12), anchor="w")
+        label.pack(side="left")
+        window = self.canvas.create_window(0, 0, window=frame, anchor="nw", state="hidden",
+                                           width=self.canvas.winfo_width())
+        row = VirtualRow(window, frame, label)
+        tk.Button(frame, text=self.button_text, bg="#2A4173", fg="white",
+                  command=lambda: self.on_edit(self.items[row.index])).pack(side="right")
+        self.bind_wheel(frame)
+        self.bind_wheel(label)
+        return row
+
+    def on_resize(self, event):
+        while len(self.rows) < event.height // self.row_height + 2:
+            self.rows.append(self.make_row())
+        for row in self.rows:
+            self.canvas.itemconfigure(row.window, width=event.width)
+        self.layout()
+
+    def on_view_change(self, first, last):
+        self.scrollbar.set(first, last)
+        self.layout()
+
+    @TRACER.traced("widgets")
+    def layout(self, force=False):
+        top = int(self.canvas.canvasy(0)) // self.row_height
+        for offset, row in enumerate(self.rows):
+            index = top + offset
+            if index >= len(self.items):
+                if row.index is not None:
+                    row.index = None
+                    self.canvas.itemconfigure(row.window, state="hidden")
+            elif index != row.index or force:
+                row.index = index
+                row.label.config(text=self.row_text(self.items[index]))
+                self.canvas.coords(row.window, 0, index * self.row_height)
+                self.canvas.itemconfigure(row.window, state="normal")
+
+    def update_scrollregion(self):
+        self.canvas.config(scrollregion=(0, 0, 0, len(self.items) * self.row_height))
+
+    @TRACER.traced("widgets")
+    def set_items(self, items):
+        self.items = list(items)
+        self.positions = {item.id: i for i, item in enumerate(self.items) if item.id is not None}
+        self.update_scrollregion()
+        self.canvas.yview_moveto(0)
+        self.layout(force=True)
+
+    def append(self, item):
+        self.positions[item.id] = len(self.items)
+        self.items.append(item)
+        self.update_scrollregion()
+        self.canvas.yview_moveto(1.0)
+        self.layout()
+
+    def update_item(self, item):
+        index = self.positions[item.id]
+        self.items[index] = item
+        for row in self.rows:
+            if row.index == index:
+                row.label.config(text=self.row_text(item))
 
 
 # -----------------------------
 # Schedule Screen
 # -----------------------------
+SCHEDULE_FILETYPES = [("Schedules", "*.csv *.ics"), ("CSV", "*.csv"), ("iCalendar", "*.ics")]
+
+DEFAULT_SCHEDULE = [
+    ScheduleEntry(None, "Evening (7 PM)", "Venus – The Evening Star"),
+    ScheduleEntry(None, "Midnight (12 AM)", "Orion Nebula"),
+    ScheduleEntry(None, "Dawn (4 AM)", "Jupiter and Saturn"),
+]
+
 class ScheduleScreen(BaseScreen):
+    depends_on = frozenset({"schedules"})
+
     def __init__(self, parent, app):
         super().__init__(parent, app)
         self.app = app
@@ -223,101 +695,645 @@ class ScheduleScreen(BaseScreen):
                   command=lambda: app.show_screen("MainMenuScreen")).pack(anchor="nw", padx=14, pady=10)
         tk.Label(self.frame, text="📅 Celestial Observation Schedule", font=("Segoe UI", 20, "bold"),
                  fg="#7CC7FF", bg="#050A1A").pack(pady=8)
+        self.status = tk.Label(self.frame, text="Loading schedule…", bg="#050A1A", fg="#7CC7FF",
+                               font=("Segoe UI", 12))
+        self.status.pack()
+
+        buttons = tk.Frame(self.frame, bg="#050A1A")
+        buttons.pack(side="bottom", pady=8)
+        tk.Button(buttons, text="➕ Add / Edit Schedule", bg="#1768AC", fg="white",
+                  command=self.add_edit).pack(side="left", padx=6)
+        tk.Button(buttons, text="📥 Import…", bg="#2A4173", fg="white",
+                  command=self.import_file).pack(side="left", padx=6)
+        tk.Button(buttons, text="📤 Export…", bg="#2A4173", fg="white",
+                  command=self.export_file).pack(side="left", padx=6)
+        tk.Button(buttons, text="🔭 Suggest Tonight", bg="#3B7A57", fg="white",
+                  command=self.suggest).pack(side="left", padx=6)
+        tk.Button(buttons, text="📍 Location", bg="#1C2E4A", fg="white",
+                  command=self.ask_location).pack(side="left", padx=6)
 
         self.container = tk.Frame(self.frame, bg="#050A1A")
         self.container.pack(padx=20, pady=12, fill="both", expand=True)
-        self.render_schedule()
+        self.list = VirtualList(self.container, lambda e: f"{e.time}: {e.object}", self.edit_item)
+        self.refresh()
 
-        tk.Button(self.frame, text="➕ Add / Edit Schedule", bg="#1768AC", fg="white", command=self.add_edit).pack(pady=8)
+    def refresh(self):
+        uname = self.app.username
+        self.run_io(lambda db: db.schedules(uname), self.render_schedule)
 
-    def render_schedule(self):
-        for w in self.container.winfo_children():
-            w.destroy()
+    def render_schedule(self, rows):
+        self.list.set_items(rows or DEFAULT_SCHEDULE)
+        self.update_status()
 
-        cur.execute("SELECT time,object FROM schedules WHERE username=?", (self.app.username,))
-        rows = cur.fetchall()
-        if not rows:
-            rows = [("Evening (7 PM)", "Venus – The Evening Star"), ("Midnight (12 AM)", "Orion Nebula"), ("Dawn (4 AM)", "Jupiter and Saturn")]
+    def update_status(self):
+        stored = len(self.list.positions)
+        self.status.config(text=f"{stored} planned observations" if stored else "Suggested targets")
 
-        for t, obj in rows:
-            row = tk.Frame(self.container, bg="#050A1A")
-            row.pack(fill="x", pady=6)
-            tk.Label(row, text=f"{t}: {obj}", bg="#050A1A", fg="white", font=("Segoe UI", 12)).pack(side="left")
-            tk.Button(row, text="Edit", bg="#2A4173", fg="white",
-                      command=lambda time=t, object=obj: self.edit_item(time, object)).pack(side="right")
+    def add_row(self, entry):
+        if not self.list.positions:
+            # the first real entry replaces the built-in suggestions
+            self.list.set_items([entry])
+        else:
+            self.list.append(entry)
+        self.update_status()
+        self.app.invalidate("schedules", origin=self)
 
     def add_edit(self):
         t = simpledialog.askstring("Add Schedule", "Enter new time (e.g., 9 PM):")
         o = simpledialog.askstring("Add Schedule", "Enter new celestial object:")
         if t and o:
-            cur.execute("INSERT INTO schedules (username, time, object) VALUES (?, ?, ?)", (self.app.username, t, o))
-            conn.commit()
-            self.render_schedule()
+            uname = self.app.username
+            self.check_visibility(t, o, lambda: self.run_io(lambda db: db.add_schedule(uname, t, o), self.add_row))
 
-    def edit_item(self, time, obj):
-        new_t = simpledialog.askstring("Edit Time", "Edit time:", initialvalue=time)
-        new_o = simpledialog.askstring("Edit Object", "Edit object:", initialvalue=obj)
-        if new_t and new_o:
-            cur.execute("UPDATE schedules SET time=?, object=? WHERE username=? AND time=? AND object=?",
-                        (new_t, new_o, self.app.username, time, obj))
-            conn.commit()
-            self.render_schedule()
+    def edit_item(self, entry):
+        new_t = simpledialog.askstring("Edit Time", "Edit time:", initialvalue=entry.time)
+        new_o = simpledialog.askstring("Edit Object", "Edit object:", initialvalue=entry.object)
+        if not (new_t and new_o):
+            return
+        self.check_visibility(new_t, new_o, lambda: self.save_edit(entry, new_t, new_o))
+
+    def save_edit(self, entry, new_t, new_o):
+        uname = self.app.username
+        if entry.id is None:
+            self.run_io(lambda db: db.add_schedule(uname, new_t, new_o), self.add_row)
+            return
+        self.run_io(lambda db: db.update_schedule(uname, entry.id, new_t, new_o))
+        self.list.update_item(entry._replace(time=new_t, object=new_o))
+        self.app.invalidate("schedules", origin=self)
+
+    # -----------------------------
+    # Sky engine (numpy + catalog load lazily, on the DB worker thread)
+    # -----------------------------
+    def check_visibility(self, when_text, obj, save):
+        uname = self.app.username
+
+        def job(db):
+            location = db.observer_location(uname)
+            if location is None:
+                return []
+            import sky
+            when = sky.parse_schedule_time(when_text)
+            if when is None:
+                return []
+            return sky.default_engine().check(sky.Observer(*location), obj, when)
+
+        # if the engine can't run (e.g. numpy missing) just save as before
+        self.run_io(job, lambda visible: self.confirm_visibility(visible, save), lambda exc: save())
+
+    def confirm_visibility(self, visible, save):
+        problems = [f"{v.name} is below the horizon at {v.when:%H:%M} (altitude {v.altitude:.0f}°)."
+                    for v in visible if not v.up]
+        if visible and visible[0].sun_altitude > 0:
+            problems.append(f"The Sun is still up at {visible[0].when:%H:%M}.")
+        if problems and not messagebox.askyesno("Check Schedule", "\n".join(problems) + "\n\nSave anyway?"):
+            return
+        save()
+
+    def ask_location(self):
+        lat = simpledialog.askfloat("Observer Location", "Your latitude in degrees (north positive):",
+                                    minvalue=-90, maxvalue=90)
+        if lat is None:
+            return False
+        lon = simpledialog.askfloat("Observer Location", "Your longitude in degrees (east positive):",
+                                    minvalue=-180, maxvalue=180)
+        if lon is None:
+            return False
+        uname = self.app.username
+        self.run_io(lambda db: db.set_observer_location(uname, lat, lon))
+        return True
+
+    def suggest(self):
+        uname = self.app.username
+
+        def job(db):
+            location = db.observer_location(uname)
+            if location is None:
+                return None
+            import sky
+            return sky.default_engine().suggest(sky.Observer(*location), date.today())
+
+        self.status.config(text="Computing tonight's sky…")
+        self.run_io(job, self.show_suggestions, self.show_error)
+
+    def show_suggestions(self, suggestions):
+        self.update_status()
+        if suggestions is None:
+            if self.ask_location():
+                self.suggest()
+            return
+        if not suggestions:
+            messagebox.showinfo("Suggested Targets", "Nothing is well placed tonight (or it never gets properly dark).")
+            return
+        lines = [f"{s.when:%H:%M}  {s.name} — altitude {s.altitude:.0f}°, azimuth {s.azimuth:.0f}°"
+                 for s in suggestions]
+        if messagebox.askyesno("Suggested Targets", "\n".join(lines) + "\n\nAdd these to your schedule?"):
+            uname = self.app.username
+            rows = [(uname, f"{s.when:%Y-%m-%d %H:%M}", s.name) for s in suggestions]
+            self.run_io(lambda db: db.add_schedules(rows), lambda count: self.app.invalidate("schedules"))
+
+    def import_file(self):
+        path = filedialog.askopenfilename(title="Import Schedule", filetypes=SCHEDULE_FILETYPES)
+        if not path:
+            return
+        uname = self.app.username
+        self.status.config(text="Importing…")
+
+        def job(db):
+            import schedule_io
+            return schedule_io.import_schedules(db, path, uname, force_user=True)
+
+        self.run_io(job, self.finish_import, self.show_error)
+
+    def finish_import(self, report):
+        text = f"Imported {report.imported} entries."
+        if report.skipped:
+            text += f"\nSkipped {report.skipped} invalid rows:\n" + "\n".join(report.errors)
+            if report.skipped > len(report.errors):
+                text += f"\n… and {report.skipped - len(report.errors)} more"
+        messagebox.showinfo("Import Schedule", text)
+        self.app.invalidate("schedules")
+
+    def export_file(self):
+        path = filedialog.asksaveasfilename(title="Export Schedule", defaultextension=".csv",
+                                            filetypes=SCHEDULE_FILETYPES)
+        if not path:
+            return
+        uname = self.app.username
+
+        def job(db):
+            import schedule_io
+            return schedule_io.export_schedules(db, path, uname)
+
+        self.run_io(job, lambda count: messagebox.showinfo("Export Schedule", f"Exported {count} entries."),
+                    self.show_error)
+
+    def show_error(self, exc):
+        self.update_status()
+        messagebox.showerror("Error", str(exc))
 
 
 # -----------------------------
-# Learning Screen
+# Sky Map Screen (draws straight on AstronomyApp.canvas)
 # -----------------------------
-LEARNING_TOPICS = [
-    {"id": 1, "title": "Planets", "desc": "Learn about the planets of our solar system."},
-    {"id": 2, "title": "Galaxies", "desc": "Explore the vast universe of galaxies beyond the Milky Way."},
-    {"id": 3, "title": "Space Missions", "desc": "Discover NASA's greatest missions and achievements."},
-    {"id": 4, "title": "Stars", "desc": "Understand how stars are born, live, and die."},
-]
+SKYMAP_TAG = "skymap"
+DEFAULT_LOCATION = (51.48, 0.0)   # Greenwich, until the user sets theirs on the Schedule screen
+
+
+class SkyMapScreen(BaseScreen):
+    depends_on = frozenset({"schedules"})
+    frame_ms = 33
+    speeds = (1, 60, 600, 3600)   # simulated seconds per real second
+    max_mag = 6.5
+
+    def __init__(self, parent, app):
+        super().__init__(parent, app)
+        self.canvas = parent
+        self.map = None
+        self.after_id = None
+        self.speed = 600
+        self.paused = False
+        self.loading_field = False
+        self.star_items = []
+        self.line_items = []
+        self.target_items = []
+        self.frames = 0
+        self.updates = 0
+        self.visible = 0
+        self.fps_since = 0.0
+
+        # the control bar floats on the canvas instead of covering it
+        self.frame.pack_forget()
+        self.frame.config(bg="#0B1430")
+        self.bar = self.canvas.create_window(12, 10, window=self.frame, anchor="nw", tags=SKYMAP_TAG)
+        tk.Button(self.frame, text="← Back to Menu", bg="#1C2E4A", fg="white",
+                  command=lambda: app.show_screen("MainMenuScreen")).pack(side="left", padx=4, pady=4)
+        self.pause_btn = tk.Button(self.frame, text="⏸ Pause", bg="#2A4173", fg="white", command=self.toggle_pause)
+        self.pause_btn.pack(side="left", padx=4)
+        tk.Button(self.frame, text="⏪", bg="#2A4173", fg="white", command=lambda: self.change_speed(-1)).pack(side="left")
+        tk.Button(self.frame, text="⏩", bg="#2A4173", fg="white", command=lambda: self.change_speed(1)).pack(side="left")
+        tk.Button(self.frame, text="Now", bg="#2A4173", fg="white", command=self.reset_time).pack(side="left", padx=4)
+        tk.Button(self.frame, text="★−", bg="#1C2E4A", fg="white", command=lambda: self.change_mag(-1)).pack(side="left")
+        tk.Button(self.frame, text="★+", bg="#1C2E4A", fg="white", command=lambda: self.change_mag(1)).pack(side="left")
+        self.status = tk.Label(self.frame, text="Loading sky…", bg="#0B1430", fg="#7CC7FF", font=("Segoe UI", 10))
+        self.status.pack(side="left", padx=8)
+
+        self.horizon = self.canvas.create_oval(0, 0, 0, 0, fill="#020720", outline="#1C2E4A", width=2, tags=SKYMAP_TAG)
+        self.compass = [self.canvas.create_text(0, 0, text=c, fill="#3D5A80", font=("Segoe UI", 12, "bold"),
+                                                tags=SKYMAP_TAG) for c in "NESW"]
+        self.info = self.canvas.create_text(0, 0, anchor="se", fill="#7CC7FF", font=("Consolas", 10), tags=SKYMAP_TAG)
+        self.canvas.tag_lower(self.horizon)
+        self.load()
+
+    def load(self):
+        uname, max_mag = self.app.username, self.max_mag
+
+        # numpy, the catalogs and the star field load on the DB worker thread
+        def job(db):
+            location = db.observer_location(uname)
+            targets = [e.object for e in db.schedules(uname)]
+            import sky, skymap
+            engine = sky.default_engine()
+            field = skymap.load_field(engine, sky.julian_date(datetime.now()), max_mag)
+            observer = sky.Observer(*(location or DEFAULT_LOCATION))
+            return skymap.SkyMap(field, engine, observer, targets, max_mag), location is None
+
+        self.run_io(job, self.start, lambda exc: self.status.config(text=f"Sky map unavailable: {exc}"))
+
+    def start(self, result):
+        import sky
+        self.map, default_location = result
+        self.sim_jd = sky.julian_date(datetime.now())
+        self.make_target_items()
+        self.line_items = [self.canvas.create_line(0, 0, 0, 0, fill="#35507A", state="hidden", tags=SKYMAP_TAG)
+                           for _ in self.map.line_pairs]
+        self.note = "Location not set, showing Greenwich (📍 on the Schedule screen)" if default_location else ""
+        self.status.config(text=self.note)
+        # the user may have left while it loaded; show() starts the animation later
+        if self.app.current_screen is self:
+            self.run()
+
+    def make_target_items(self):
+        for item in self.target_items:
+            self.canvas.delete(item)
+        self.target_items = []
+        for name in self.map.target_names:
+            ring = self.canvas.create_oval(0, 0, 0, 0, outline="#FFB347", width=2, state="hidden", tags=SKYMAP_TAG)
+            label = self.canvas.create_text(0, 0, text=name, anchor="sw", fill="#FFB347", state="hidden",
+                                            font=("Segoe UI", 10), tags=SKYMAP_TAG)
+            self.target_items.append((ring, label))
+
+    def refresh(self):
+        # schedule changed: only the targets need reloading
+        if self.map is None:
+            return
+        uname = self.app.username
+        self.run_io(lambda db: [e.object for e in db.schedules(uname)], self.set_targets)
+
+    def set_targets(self, targets):
+        self.map.set_targets(targets)
+        self.make_target_items()
+
+    # -----------------------------
+    # Animation
+    # -----------------------------
+    def run(self):
+        self.last_tick = self.fps_since = time.perf_counter()
+        self.frames = self.updates = 0
+        if self.after_id is None:
+            self.tick()
+
+    def stop(self):
+        if self.after_id is not None:
+            self.app.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def tick(self):
+        now = time.perf_counter()
+        if not self.paused:
+            self.sim_jd += (now - self.last_tick) * self.speed / 86400
+        self.last_tick = now
+        if self.map.resize(self.canvas.winfo_width(), self.canvas.winfo_height()):
+            self.layout()
+        self.draw(self.map.prepare(self.sim_jd))
+
+        self.frames += 1
+        if now - self.fps_since >= 1:
+            self.show_info(self.frames / (now - self.fps_since))
+            self.frames = self.updates = 0
+            self.fps_since = now
+        self.after_id = self.app.root.after(self.frame_ms, self.tick)
+
+    def layout(self):
+        p = self.map.proj
+        c = self.canvas
+        c.coords(self.horizon, p.cx - p.radius, p.cy - p.radius, p.cx + p.radius, p.cy + p.radius)
+        # east is on the left when looking up
+        for item, (dx, dy) in zip(self.compass, ((0, -1), (-1, 0), (0, 1), (1, 0))):
+            c.coords(item, p.cx + dx * (p.radius + 12), p.cy + dy * (p.radius + 12))
+        c.coords(self.info, p.width - 10, p.height - 8)
+
+    @TRACER.traced("widgets")
+    def draw(self, frame):
+        c = self.canvas
+        stars = frame.stars
+        items = self.star_items
+        for _ in range(stars.new_items):
+            items.append(c.create_oval(0, 0, 0, 0, outline="", tags=(SKYMAP_TAG, "skymap_star")))
+        if stars.new_items:
+            # new stars go under the lines and markers, but above the horizon disc
+            c.tag_lower("skymap_star")
+            c.tag_lower(self.horizon)
+        for slot in stars.hide_slots.tolist():
+            c.itemconfigure(items[slot], state="hidden")
+        for slot in stars.unhide_slots.tolist():
+            c.itemconfigure(items[slot], state="normal")
+        for slot, star in zip(stars.restyle_slots.tolist(), stars.restyle_stars.tolist()):
+            c.itemconfigure(items[slot], fill=self.map.field.color(star))
+        for slot, box in zip(stars.place_slots.tolist(), stars.place_boxes.tolist()):
+            c.coords(items[slot], *box)
+
+        lines = frame.line_diff
+        for i in lines.hide.tolist():
+            c.itemconfigure(self.line_items[i], state="hidden")
+        for i in lines.show.tolist():
+            c.itemconfigure(self.line_items[i], state="normal")
+        for i in lines.place.tolist():
+            c.coords(self.line_items[i], *frame.lines[i].tolist())
+
+        targets = frame.target_diff
+        for i in targets.hide.tolist():
+            for item in self.target_items[i]:
+                c.itemconfigure(item, state="hidden")
+        for i in targets.show.tolist():
+            for item in self.target_items[i]:
+                c.itemconfigure(item, state="normal")
+        for i in targets.place.tolist():
+            x, y = frame.targets[i].tolist()
+            ring, label = self.target_items[i]
+            c.coords(ring, x - 8, y - 8, x + 8, y + 8)
+            c.coords(label, x + 9, y - 6)
+        self.visible = frame.visible
+        self.updates += len(stars.place_slots) + len(lines.place) + len(targets.place)
+
+    def show_info(self, fps):
+        import sky
+        when = sky.from_julian_date(self.sim_jd)
+        speed = "paused" if self.paused else f"{self.speed}×"
+        self.canvas.itemconfigure(self.info, text=f"{when:%Y-%m-%d %H:%M}  {speed}  mag ≤ {self.map.max_mag:g}\n"
+                                                  f"{fps:4.0f} fps  {self.visible:,} stars  "
+                                                  f"{self.updates / max(self.frames, 1):,.0f} updates/frame")
+
+    # -----------------------------
+    # Controls
+    # -----------------------------
+    def toggle_pause(self):
+        self.paused = not self.paused
+        self.pause_btn.config(text="▶ Play" if self.paused else "⏸ Pause")
+
+    def change_speed(self, step):
+        i = self.speeds.index(self.speed) + step
+        self.speed = self.speeds[max(0, min(i, len(self.speeds) - 1))]
+
+    def reset_time(self):
+        import sky
+        self.sim_jd = sky.julian_date(datetime.now())
+
+    def change_mag(self, step):
+        if self.map is None:
+            return
+        max_mag = max(1.0, min(self.map.max_mag + step, 12.0))
+        if max_mag <= self.map.field.limit:
+            self.map.set_max_mag(max_mag)
+        elif not self.loading_field:
+            # the star field was cut at the limit it loaded with: fetch the fainter stars first
+            self.loading_field = True
+            self.status.config(text=f"Loading stars to mag {max_mag:g}…")
+
+            def job(db):
+                import sky, skymap
+                return skymap.load_field(sky.default_engine(), sky.julian_date(datetime.now()), max_mag)
+
+            self.run_io(job, lambda field: self.set_field(field, max_mag), self.field_failed)
+
+    def set_field(self, field, max_mag):
+        self.loading_field = False
+        self.map.set_field(field, max_mag)
+        self.status.config(text=self.note)
+
+    def field_failed(self, exc):
+        self.loading_field = False
+        self.status.config(text=f"Could not load fainter stars: {exc}")
+
+    # -----------------------------
+    # Screen cache hooks
+    # -----------------------------
+    def hide(self):
+        self.stop()
+        self.canvas.itemconfigure(self.bar, state="hidden")
+
+    def show(self):
+        self.canvas.itemconfigure(self.bar, state="normal")
+        if self.stale:
+            self.stale = False
+            self.refresh()
+        if self.map is not None:
+            self.run()
 
+    def destroy(self):
+        self.stop()
+        self.canvas.delete(SKYMAP_TAG)
+        self.frame.destroy()
+
+
+# -----------------------------
+# Learning Screen
+# -----------------------------
 class LearningScreen(BaseScreen):
+    depends_on = frozenset({"completed_topics"})
+    search_delay_ms = 150
+
     def __init__(self, parent, app):
         super().__init__(parent, app)
+        self.store = None
+        self.completed = frozenset()
+        self.article = None
+        self.next_id = None
+        self.opening = None
+        self.images = {}
+        self.search_after = None
 
         tk.Button(self.frame, text="← Back to Menu", bg="#1C2E4A", fg="white",
                   command=lambda: app.show_screen("MainMenuScreen")).pack(anchor="nw", padx=14, pady=10)
         tk.Label(self.frame, text="📖 Astronomy Learning Section", font=("Segoe UI", 20, "bold"),
                  fg="#7CC7FF", bg="#050A1A").pack(pady=6)
 
-        self.topics_frame = tk.Frame(self.frame, bg="#050A1A")
-        self.topics_frame.pack(fill="both", expand=True, padx=20, pady=10)
-        self.render_topics()
-
-    def render_topics(self):
-        for w in self.topics_frame.winfo_children():
-            w.destroy()
-        for t in LEARNING_TOPICS:
-            card = tk.Frame(self.topics_frame, bg="#0B1733", bd=1, relief="ridge")
-            card.pack(fill="x", pady=8)
-
-            tk.Label(card, text=t["title"], bg="#0B1733", fg="#B8D8FF",
-                     font=("Segoe UI", 13, "bold")).pack(anchor="w", padx=10, pady=4)
-            tk.Label(card, text=t["desc"], bg="#0B1733", fg="#DDEEFF",
-                     wraplength=900, justify="left").pack(anchor="w", padx=10)
-
-            btn_frame = tk.Frame(card, bg="#0B1733")
-            btn_frame.pack(anchor="e", padx=10, pady=6)
-            tk.Button(btn_frame, text="Read More", bg="#1768AC", fg="white",
-                      command=lambda tid=t["id"]: self.open_topic(tid)).grid(row=0, column=0, padx=6)
-            tk.Button(btn_frame, text="Search Google", bg="#2A4173", fg="white",
-                      command=lambda q=t["title"]: webbrowser.open(f"https://www.google.com/search?q={q}+astronomy")).grid(row=0, column=1, padx=6)
-            complete_btn = tk.Button(btn_frame, text="Mark Complete", bg="#3B7A57", fg="white",
-                                     command=lambda tid=t["id"]: self.mark_complete(tid))
-            complete_btn.grid(row=0, column=2, padx=6)
+        progress = tk.Frame(self.frame, bg="#050A1A")
+        progress.pack(pady=4)
+        self.progress_bar = tk.Canvas(progress, width=360, height=14, bg="#0B1733", highlightthickness=0)
+        self.progress_bar.pack(side="left")
+        self.progress_fill = self.progress_bar.create_rectangle(0, 0, 0, 14, fill="#3B7A57", width=0)
+        self.progress_label = tk.Label(progress, text="", bg="#050A1A", fg="#7CC7FF")
+        self.progress_label.pack(side="left", padx=10)
+
+        search = tk.Frame(self.frame, bg="#050A1A")
+        search.pack(fill="x", padx=20, pady=(6, 0))
+        tk.Label(search, text="🔍 Search", bg="#050A1A", fg="#7CC7FF").pack(side="left")
+        self.query = tk.StringVar()
+        self.query.trace_add("write", lambda *_: self.schedule_search())
+        tk.Entry(search, textvariable=self.query, width=40).pack(side="left", padx=6)
+        self.match_label = tk.Label(search, text="", bg="#050A1A", fg="#7CC7FF")
+        self.match_label.pack(side="left", padx=6)
+
+        body = tk.Frame(self.frame, bg="#050A1A")
+        body.pack(fill="both", expand=True, padx=20, pady=10)
+        topics = tk.Frame(body, bg="#050A1A", width=340)
+        topics.pack(side="left", fill="y")
+        topics.pack_propagate(False)
+        self.list = VirtualList(topics, self.topic_text, lambda t: self.open_topic(t.id), button_text="Read")
+
+        reader = tk.Frame(body, bg="#0B1733", bd=1, relief="ridge")
+        reader.pack(side="left", fill="both", expand=True, padx=(12, 0))
+        buttons = tk.Frame(reader, bg="#0B1733")
+        buttons.pack(side="bottom", fill="x", padx=10, pady=6)
+        self.complete_btn = tk.Button(buttons, text="Mark Complete", bg="#3B7A57", fg="white", state="disabled",
+                                      command=self.mark_complete)
+        self.complete_btn.pack(side="right", padx=6)
+        self.next_btn = tk.Button(buttons, text="Next ▶", bg="#1768AC", fg="white", state="disabled",
+                                  command=lambda: self.open_topic(self.next_id))
+        self.next_btn.pack(side="right")
+        scroll = tk.Scrollbar(reader, orient="vertical")
+        scroll.pack(side="right", fill="y")
+        self.text = tk.Text(reader, bg="#0B1733", fg="#DDEEFF", wrap="word", relief="flat", padx=14, pady=10,
+                            font=("Segoe UI", 11), yscrollcommand=scroll.set, cursor="arrow")
+        self.text.pack(side="left", fill="both", expand=True)
+        scroll.config(command=self.text.yview)
+        self.text.tag_configure("title", font=("Segoe UI", 18, "bold"), foreground="#B8D8FF")
+        self.text.tag_configure("category", foreground="#7CC7FF", spacing3=8)
+        self.text.tag_configure("body", spacing3=10)
+        self.text.tag_configure("link", foreground="#7CC7FF", underline=True)
+        self.text.tag_bind("link", "<Button-1>", self.follow_link)
+        self.show_text("Loading articles…")
+        self.load()
+
+    def load(self):
+        uname = self.app.username
+
+        # packing the archive (first run only) and reading its index stay off the Tk thread
+        def job(db):
+            import content_store
+            return content_store.open_store(), db.completed_topics(uname)
+
+        self.run_io(job, self.start, lambda exc: self.show_text(f"Learning content unavailable: {exc}"))
+
+    def start(self, result):
+        self.store, completed = result
+        self.list.set_items(self.store.topics)
+        self.show_progress(completed)
+        if self.query.get().strip():
+            self.search()
+        if self.store.topics:
+            self.open_topic(self.store.topics[0].id)
+
+    def refresh(self):
+        uname = self.app.username
+        self.run_io(lambda db: db.completed_topics(uname), self.show_progress)
+
+    def topic_text(self, topic):
+        return f"✓ {topic.title}" if topic.id in self.completed else topic.title
+
+    def show_progress(self, completed):
+        # ticks and the bar come from the cached set; no per-topic queries
+        self.completed = frozenset(completed)
+        total = len(self.store) if self.store else 0
+        done = sum(1 for tid in self.completed if self.store and self.store.topic(tid))
+        self.progress_bar.coords(self.progress_fill, 0, 0, 360 * done / total if total else 0, 14)
+        self.progress_label.config(text=f"{done} of {total} topics completed")
+        self.list.layout(force=True)
+        self.update_complete_btn()
+
+    def update_complete_btn(self):
+        done = self.article is not None and self.article.id in self.completed
+        self.complete_btn.config(state="disabled" if done or self.article is None else "normal",
+                                 text="Completed" if done else "Mark Complete")
+
+    def show_text(self, message):
+        self.text.config(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("end", message, "body")
+        self.text.config(state="disabled")
 
     def open_topic(self, tid):
-        topic = next((x for x in LEARNING_TOPICS if x["id"] == tid), None)
-        if topic:
-            messagebox.showinfo(topic["title"], topic["desc"])
+        if tid is None or self.store is None:
+            return
+        store, known = self.store, set(self.images)
+        self.opening = tid
+
+        def job(db):
+            article = store.article(tid)
+            image = store.image(article.image) if article.image not in known else None
+            return article, image, store.next_topic(tid)
+
+        self.run_io(job, self.show_article)
+
+    def show_article(self, result):
+        article, image, next_id = result
+        if article.id != self.opening:
+            return   # another topic was opened meanwhile
+        self.article, self.next_id = article, next_id
+        if image is not None:
+            self.images[article.image] = tk.PhotoImage(data=base64.b64encode(image).decode("ascii"))
+
+        text = self.text
+        text.config(state="normal")
+        text.delete("1.0", "end")
+        text.insert("end", article.title + "\n", "title")
+        text.insert("end", article.category + "\n", "category")
+        if article.image in self.images:
+            text.image_create("end", image=self.images[article.image])
+            text.insert("end", "\n\n")
+        for paragraph in article.paragraphs:
+            text.insert("end", paragraph + "\n", "body")
+        related = [t for t in map(self.store.topic, article.related) if t]
+        if related:
+            text.insert("end", "See also: ", "body")
+            for i, topic in enumerate(related):
+                if i:
+                    text.insert("end", ", ", "body")
+                text.insert("end", topic.title, ("body", "link", f"topic-{topic.id}"))
+        text.config(state="disabled")
+        text.yview_moveto(0)
+
+        upcoming = self.store.topic(next_id) if next_id is not None else None
+        self.next_btn.config(state="normal" if upcoming else "disabled",
+                             text=f"Next: {upcoming.title} ▶" if upcoming else "Next ▶")
+        self.update_complete_btn()
+        # decode the article the reader most likely opens next while they read this one
+        store = self.store
+        self.run_io(lambda db: store.prefetch(next_id))
+
+    def follow_link(self, event):
+        for tag in self.text.tag_names("current"):
+            if tag.startswith("topic-"):
+                self.open_topic(int(tag[len("topic-"):]))
+
+    def schedule_search(self):
+        # wait for a pause in typing instead of searching on every key
+        if self.search_after:
+            self.frame.after_cancel(self.search_after)
+        self.search_after = self.frame.after(self.search_delay_ms, self.search)
+
+    def search(self):
+        self.search_after = None
+        store, query = self.store, self.query.get()
+        if store is None:
+            return
+        if not query.strip():
+            self.show_results((query, None))
+            return
+        self.run_io(lambda db: (query, store.search(query)), self.show_results)
+
+    def show_results(self, result):
+        query, hits = result
+        if query != self.query.get():
+            return   # a newer search is on its way
+        self.list.set_items(self.store.topics if hits is None else hits)
+        self.match_label.config(text="" if hits is None else f"{len(hits)} match{'' if len(hits) == 1 else 'es'}")
+
+    def mark_complete(self):
+        if self.article is None:
+            return
+        uname, tid = self.app.username, self.article.id
+        self.run_io(lambda db: db.mark_topic_complete(uname, tid))
+        self.show_progress(self.completed | {tid})
+        self.app.invalidate("completed_topics", origin=self)
 
-    def mark_complete(self, tid):
-        cur.execute("INSERT INTO completed_topics (username, topic_id) VALUES (?, ?)", (self.app.username, tid))
-        conn.commit()
-        messagebox.showinfo("Completed", "Marked as completed!")
+    def destroy(self):
+        if self.search_after:
+            self.frame.after_cancel(self.search_after)
+        if self.store is not None:
+            store = self.store
+            self.app.io.submit(lambda db: store.close())
+        super().destroy()
 
 
 # -----------------------------
@@ -327,10 +1343,7 @@ class QuizScreen(BaseScreen):
     def __init__(self, parent, app):
         super().__init__(parent, app)
         self.app = app
-        self.current_question = 0
-        self.score = 0
-        self.questions = []
-        self.age_level = ""
+        self.quiz = None
 
         tk.Button(self.frame, text="← Back to Menu", bg="#1C2E4A", fg="white",
                   command=lambda: app.show_screen("MainMenuScreen")).pack(anchor="nw", padx=14, pady=10)
@@ -343,100 +1356,87 @@ class QuizScreen(BaseScreen):
         self.age_entry = tk.Entry(entry_frame, width=8)
         self.age_entry.pack(side="left", padx=8)
 
-        tk.Button(self.frame, text="Start Quiz", bg="#1768AC", fg="white", command=self.start_quiz).pack(pady=12)
+        self.start_btn = tk.Button(self.frame, text="Start Quiz", bg="#1768AC", fg="white", command=self.start_quiz)
+        self.start_btn.pack(pady=12)
 
         self.q_container = tk.Frame(self.frame, bg="#050A1A")
         self.q_container.pack(fill="both", expand=True, padx=20, pady=10)
 
+    def show(self):
+        # coming back to the quiz always starts a fresh one
+        self.quiz = None
+        for w in self.q_container.winfo_children():
+            w.destroy()
+        super().show()
+
     def start_quiz(self):
         age_str = self.age_entry.get().strip()
         if not age_str.isdigit():
             messagebox.showerror("Input Error", "Please enter a valid numeric age.")
             return
-        age = int(age_str)
-        if 6 <= age <= 12:
-            self.age_level = "Easy"
-        elif 13 <= age <= 20:
-            self.age_level = "Medium"
-        else:
-            self.age_level = "Hard"
-
-        self.questions = self.get_questions(self.age_level)
-        self.current_question = 0
-        self.score = 0
+        uname, level = self.app.username, services.quiz_level(int(age_str))
+        self.start_btn.config(state="disabled")
+        self.run_io(lambda db: services.start_quiz(db, uname, level),
+                    lambda questions: self.begin(level, questions), self.show_error)
+
+    def begin(self, level, questions):
+        self.start_btn.config(state="normal")
+        if not questions:
+            messagebox.showinfo("Quiz", f"There are no {level} questions in the question bank yet.")
+            return
+        self.quiz = services.QuizSession(self.app.username, level, questions)
         self.show_question()
 
-    def get_questions(self, level):
-        easy = [
-            ("Which planet is known as the Red Planet?", ["Earth", "Mars", "Venus", "Jupiter"], "Mars"),
-            ("What is the name of our galaxy?", ["Andromeda", "Milky Way", "Whirlpool", "Sombrero"], "Milky Way"),
-            ("Which star is at the center of our solar system?", ["Polaris", "Sirius", "Sun", "Alpha Centauri"], "Sun"),
-            ("How many planets are in the Solar System?", ["7", "8", "9", "10"], "8"),
-            ("Which planet is closest to the Sun?", ["Mercury", "Venus", "Earth", "Mars"], "Mercury"),
-            ("Which planet has rings?", ["Venus", "Saturn", "Earth", "Mars"], "Saturn"),
-            ("What is the Moon?", ["A planet", "A star", "A satellite", "An asteroid"], "A satellite"),
-            ("Which planet is known as the Blue Planet?", ["Neptune", "Earth", "Uranus", "Venus"], "Earth"),
-            ("What causes day and night?", ["Earth's rotation", "Earth's revolution", "Moonlight", "Clouds"], "Earth's rotation"),
-            ("What do we call a group of stars forming a pattern?", ["Cluster", "Galaxy", "Constellation", "Nebula"], "Constellation"),
-        ]
-        medium = [
-            ("Which planet has the most moons?", ["Earth", "Mars", "Saturn", "Jupiter"], "Jupiter"),
-            ("Who was the first person to walk on the Moon?", ["Yuri Gagarin", "Neil Armstrong", "Buzz Aldrin", "Michael Collins"], "Neil Armstrong"),
-            ("Which planet is famous for its Great Red Spot?", ["Mars", "Jupiter", "Neptune", "Saturn"], "Jupiter"),
-            ("What galaxy is nearest to the Milky Way?", ["Andromeda", "Whirlpool", "Sombrero", "Pinwheel"], "Andromeda"),
-            ("Which space telescope was launched in 1990?", ["Hubble", "Kepler", "James Webb", "Spitzer"], "Hubble"),
-            ("How long does Earth take to orbit the Sun?", ["24 hours", "1 month", "1 year", "10 years"], "1 year"),
-            ("Which planet spins on its side?", ["Venus", "Uranus", "Neptune", "Mars"], "Uranus"),
-            ("What is a supernova?", ["A new galaxy", "A dying star explosion", "A black hole", "A comet"], "A dying star explosion"),
-            ("Which planet is known as the Morning Star?", ["Venus", "Mars", "Mercury", "Saturn"], "Venus"),
-            ("Which planet has the shortest day?", ["Earth", "Mars", "Jupiter", "Venus"], "Jupiter"),
-        ]
-        hard = [
-            ("What is the closest black hole to Earth called?", ["Cygnus X-1", "Sagittarius A*", "V616 Monocerotis", "M87*"], "V616 Monocerotis"),
-            ("Which is the largest known star?", ["UY Scuti", "Betelgeuse", "Antares", "Sirius"], "UY Scuti"),
-            ("What is the name of the first exoplanet discovered?", ["Kepler-22b", "51 Pegasi b", "Proxima b", "Gliese 581c"], "51 Pegasi b"),
-            ("What kind of galaxy is the Milky Way?", ["Elliptical", "Spiral", "Irregular", "Lenticular"], "Spiral"),
-            ("What element fuels stars?", ["Oxygen", "Hydrogen", "Carbon", "Helium"], "Hydrogen"),
-            ("What is the event horizon?", ["Edge of a galaxy", "Boundary of a black hole", "Edge of universe", "Star explosion"], "Boundary of a black hole"),
-            ("Which planet has the largest volcano?", ["Mars", "Earth", "Venus", "Jupiter"], "Mars"),
-            ("Which NASA mission landed on Pluto?", ["Voyager 1", "Cassini", "New Horizons", "Juno"], "New Horizons"),
-            ("How old is the universe approximately?", ["1 billion years", "5 billion years", "13.8 billion years", "100 million years"], "13.8 billion years"),
-            ("What is the densest planet in the Solar System?", ["Earth", "Jupiter", "Mercury", "Neptune"], "Earth"),
-        ]
-        return {"Easy": easy, "Medium": medium, "Hard": hard}[level]
+    def show_error(self, exc):
+        self.start_btn.config(state="normal")
+        messagebox.showerror("Error", str(exc))
 
+    @TRACER.traced("widgets")
     def show_question(self):
         for w in self.q_container.winfo_children():
             w.destroy()
-        if self.current_question < len(self.questions):
-            q, options, correct = self.questions[self.current_question]
-            tk.Label(self.q_container, text=f"Question {self.current_question+1}/{len(self.questions)}",
+        quiz = self.quiz
+        if not quiz.done:
+            question = quiz.current
+            tk.Label(self.q_container, text=f"Question {quiz.position + 1}/{len(quiz.questions)}",
                      bg="#050A1A", fg="#7CC7FF", font=("Segoe UI", 16, "bold")).pack(pady=8)
-            tk.Label(self.q_container, text=q, bg="#050A1A", fg="white", wraplength=900, font=("Segoe UI", 14)).pack(pady=6)
-            for opt in options:
+            tk.Label(self.q_container, text=question.text, bg="#050A1A", fg="white", wraplength=900,
+                     font=("Segoe UI", 14)).pack(pady=6)
+            for opt in question.options:
                 tk.Button(self.q_container, text=opt, width=30, bg="#1C2E4A", fg="white",
                           command=lambda ans=opt: self.check_answer(ans)).pack(pady=6)
         else:
             self.save_result()
-            messagebox.showinfo("Quiz Completed", f"🎉 You scored {self.score} out of {len(self.questions)}")
+            messagebox.showinfo("Quiz Completed", f"🎉 You scored {quiz.score} out of {len(quiz.questions)}")
             self.app.show_screen("ProfileScreen")
 
     def check_answer(self, answer):
-        correct = self.questions[self.current_question][2]
-        if answer == correct:
-            self.score += 1
-        self.current_question += 1
+        uname = self.app.username
+        question, correct = self.quiz.answer(answer)
+        self.run_io(lambda db: db.record_answer(uname, question, correct))
         self.show_question()
 
     def save_result(self):
-        cur.execute("INSERT INTO quiz_results (username, score, total, level, time) VALUES (?, ?, ?, ?, ?)",
-                    (self.app.username, self.score, len(self.questions), self.age_level, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-        conn.commit()
+        quiz = self.quiz
+        self.run_io(lambda db: services.save_quiz(db, quiz))
+        self.app.invalidate("quiz_results")
 
 
 # -----------------------------
 # Run App
 # -----------------------------
 if __name__ == "__main__":
-    app = AstronomyApp()
+    parser = argparse.ArgumentParser(description="StarLens astronomy learning app")
+    parser.add_argument("--watchdog", type=float, metavar="MS",
+                        help="report every main-thread callback that runs longer than MS milliseconds")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print how long each startup phase takes, up to a usable login window, then quit")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="record timing spans from launch and save them to PATH as a Chrome trace on exit")
+    args = parser.parse_args()
+    profile = None
+    if args.profile_startup:
+        profile = StartupProfile(STARTED)
+        profile.add("import modules", STARTED, time.perf_counter())
+    app = AstronomyApp(watchdog_ms=args.watchdog, profile=profile, trace_path=args.trace)
     app.run()
@@ -0,0 +1,604 @@
+"""Quiz analytics across all users: leaderboards, per-level difficulty
+curves, per-question accuracy and pass streaks.
+
+Results are cached in a side database next to the app's
+(``astronomy_app.analytics.db``). The cache records the last quiz_results
+and question_history rowids it has seen. ``Analytics.refresh`` then:
+
+* reads only the results added since the last refresh, reduces them with
+  NumPy, and folds them into the cached rows of just the users they
+  belong to. Every statistic kept can be carried forward: sums, maxima,
+  streaks given where each one stood, and attempt numbers given each
+  user's count so far;
+* on the first run (or when the app database was replaced), rebuilds
+  everything. It reads every user's results as integer columns,
+  split into username shards across a process pool;
+* updates each level's totals by adding in what the changed users
+  contributed;
+* adds new answers to the per-question counts.
+
+Leaderboards rank the cached per-user rows with a RANK() window over an
+index in the requested order.
+
+    python analytics.py refresh
+    python analytics.py leaderboard --level Easy --by streak
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
+from multiprocessing import get_context
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from storage import DB_PATH
+
+PASS_PCT = 70.0          # a quiz at or above this score extends a streak
+BUCKETS = 11             # score histogram: 0-9%, 10-19%, ..., 90-99%, 100%
+CURVE_LEN = 20           # difficulty curves follow the first 20 attempts at a level
+# per (user, level) and per level: histogram, then score sum and count by attempt number
+VECTOR_LEN = BUCKETS + 2 * CURVE_LEN
+POOL_MIN_USERS = 5000    # below this, process start-up costs more than it saves
+CACHE_VERSION = 1
+
+CACHE_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    """
+    CREATE TABLE IF NOT EXISTS user_stats (
+        username TEXT PRIMARY KEY,
+        attempts INTEGER NOT NULL,
+        points INTEGER NOT NULL,
+        pct_sum REAL NOT NULL,
+        best_pct REAL NOT NULL,
+        streak INTEGER NOT NULL,
+        best_streak INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_levels (
+        username TEXT NOT NULL,
+        level TEXT NOT NULL,
+        attempts INTEGER NOT NULL,
+        points INTEGER NOT NULL,
+        pct_sum REAL NOT NULL,
+        best_pct REAL NOT NULL,
+        vector BLOB NOT NULL,
+        PRIMARY KEY (username, level)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS level_stats (
+        level TEXT PRIMARY KEY,
+        users INTEGER NOT NULL,
+        attempts INTEGER NOT NULL,
+        pct_sum REAL NOT NULL,
+        vector BLOB NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_user_points ON user_stats (points DESC, (pct_sum / attempts) DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_user_average ON user_stats ((pct_sum / attempts) DESC, attempts DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_user_streak ON user_stats (best_streak DESC, points DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_level_points ON user_levels (level, points DESC, (pct_sum / attempts) DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_level_average ON user_levels (level, (pct_sum / attempts) DESC, attempts DESC)",
+    """
+    CREATE TABLE IF NOT EXISTS question_stats (
+        question_id INTEGER PRIMARY KEY,
+        attempts INTEGER NOT NULL,
+        correct INTEGER NOT NULL
+    )
+    """,
+)
+
+SQL_STATE = "SELECT value FROM state WHERE key=?"
+SQL_SET_STATE = "INSERT INTO state (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value"
+SQL_LAST_RESULT = "SELECT COALESCE(MAX(rowid), 0) FROM app.quiz_results"
+SQL_LAST_ANSWER = "SELECT COALESCE(MAX(rowid), 0) FROM app.question_history"
+# quiz_stats gets a row per (user, level) with every result, so it lists users and levels
+# without reading quiz_results
+SQL_ALL_USERS = "SELECT DISTINCT username FROM app.quiz_stats ORDER BY username"
+SQL_LEVELS = "SELECT DISTINCT level FROM app.quiz_stats ORDER BY level"
+SQL_NEW_RESULTS = """
+    SELECT username, level, rowid, score, total FROM app.quiz_results
+    WHERE rowid > ? AND rowid <= ? AND total > 0 AND score IS NOT NULL AND level IS NOT NULL
+"""
+SQL_NEW_ANSWERS = """
+    SELECT question_id, COUNT(*), SUM(correct) FROM app.question_history
+    WHERE rowid > ? AND rowid <= ? GROUP BY question_id
+"""
+SQL_ADD_ANSWERS = """
+    INSERT INTO question_stats (question_id, attempts, correct) VALUES (?, ?, ?)
+    ON CONFLICT (question_id) DO UPDATE SET
+        attempts = attempts + excluded.attempts, correct = correct + excluded.correct
+"""
+# every result of the users in the shard table, as integers: the user's and level's
+# positions in the lists the worker was given, then rowid, score, total.
+# CROSS JOIN fixes the loop order: a few users are looked up through the username
+# index, a shard of everyone is one pass over the table in storage order.
+SQL_SHARD_RESULTS = """
+    SELECT s.id, {level_case}, r.rowid, r.score, r.total
+    FROM shard s CROSS JOIN quiz_results r ON r.username = s.username
+    WHERE r.total > 0 AND r.score IS NOT NULL
+"""
+SQL_SCAN_RESULTS = """
+    SELECT s.id, {level_case}, r.rowid, r.score, r.total
+    FROM quiz_results r CROSS JOIN shard s ON s.username = r.username
+    WHERE r.total > 0 AND r.score IS NOT NULL
+"""
+SQL_OLD_USERS = "SELECT u.* FROM dirty d JOIN user_stats u ON u.username = d.username"
+SQL_OLD_LEVELS = "SELECT l.* FROM dirty d JOIN user_levels l ON l.username = d.username"
+SQL_PUT_USER = "INSERT OR REPLACE INTO user_stats VALUES (?, ?, ?, ?, ?, ?, ?)"
+SQL_PUT_USER_LEVEL = "INSERT OR REPLACE INTO user_levels VALUES (?, ?, ?, ?, ?, ?, ?)"
+SQL_LEVEL_STATS = "SELECT level, users, attempts, pct_sum, vector FROM level_stats ORDER BY level"
+SQL_PUT_LEVEL = "INSERT OR REPLACE INTO level_stats VALUES (?, ?, ?, ?, ?)"
+
+# Leaderboard orders: two sort keys, both descending. Each has an index, so the
+# RANK() window reads the top of the board straight off it, and a user's rank is
+# one plus the users whose keys compare greater. Streaks count across levels,
+# so they have no per-level board.
+ORDERS = {
+    "points": ("points", "pct_sum / attempts"),
+    "average": ("pct_sum / attempts", "attempts"),
+    "streak": ("best_streak", "points"),
+}
+LEVEL_ORDERS = {
+    "points": ("l.points", "l.pct_sum / l.attempts"),
+    "average": ("l.pct_sum / l.attempts", "l.attempts"),
+}
+SQL_BOARD = """
+    SELECT RANK() OVER (ORDER BY {0} DESC, {1} DESC), username, attempts, points, ROUND(pct_sum / attempts, 1),
+           ROUND(best_pct, 1), streak, best_streak
+    FROM user_stats WHERE attempts >= ? ORDER BY {0} DESC, {1} DESC LIMIT ?
+"""
+SQL_LEVEL_BOARD = """
+    SELECT RANK() OVER (ORDER BY {0} DESC, {1} DESC), l.username, l.attempts, l.points,
+           ROUND(l.pct_sum / l.attempts, 1), ROUND(l.best_pct, 1), u.streak, u.best_streak
+    FROM user_levels l JOIN user_stats u ON u.username = l.username
+    WHERE l.level = ? AND l.attempts >= ? ORDER BY {0} DESC, {1} DESC LIMIT ?
+"""
+SQL_PLAYERS = "SELECT COUNT(*) FROM user_stats WHERE attempts >= ?"
+SQL_LEVEL_PLAYERS = "SELECT COUNT(*) FROM user_levels l WHERE l.level = ? AND l.attempts >= ?"
+SQL_USER_ROW = """
+    SELECT username, attempts, points, ROUND(pct_sum / attempts, 1), ROUND(best_pct, 1), streak, best_streak, {0}, {1}
+    FROM user_stats WHERE username = ? AND attempts >= ?
+"""
+SQL_LEVEL_USER_ROW = """
+    SELECT l.username, l.attempts, l.points, ROUND(l.pct_sum / l.attempts, 1), ROUND(l.best_pct, 1),
+           u.streak, u.best_streak, {0}, {1}
+    FROM user_levels l JOIN user_stats u ON u.username = l.username
+    WHERE l.level = ? AND l.username = ? AND l.attempts >= ?
+"""
+SQL_RANK = "SELECT 1 + COUNT(*) FROM user_stats WHERE attempts >= ? AND ({0}, {1}) > (?, ?)"
+SQL_LEVEL_RANK = "SELECT 1 + COUNT(*) FROM user_levels l WHERE l.level = ? AND l.attempts >= ? AND ({0}, {1}) > (?, ?)"
+SQL_QUESTION_ACCURACY = """
+    SELECT s.question_id, q.level, q.text, s.attempts, s.correct, ROUND(s.correct * 100.0 / s.attempts, 1)
+    FROM question_stats s JOIN app.questions q ON q.id = s.question_id
+    WHERE s.attempts >= ?
+    ORDER BY s.correct * 1.0 / s.attempts {direction}, s.attempts DESC LIMIT ?
+"""
+
+
+class LeaderboardRow(NamedTuple):
+    rank: int
+    username: str
+    attempts: int
+    points: int
+    average: float
+    best: float
+    streak: int
+    best_streak: int
+    players: int     # users ranked on this board
+
+
+class DifficultyCurve(NamedTuple):
+    level: str
+    users: int
+    attempts: int
+    average: float
+    pass_rate: float
+    histogram: List[int]                # quizzes per 10% score bucket, the last being 100%
+    by_attempt: List[Optional[float]]   # average score of users' 1st, 2nd, ... attempt at the level
+
+
+class QuestionAccuracy(NamedTuple):
+    question_id: int
+    level: str
+    text: str
+    attempts: int
+    correct: int
+    accuracy: float
+
+
+class RefreshReport(NamedTuple):
+    users: int        # users recomputed
+    answers: int      # new question_history rows counted
+    full: bool
+    workers: int
+    seconds: float
+
+
+def analytics_path(db_path: str) -> str:
+    return os.path.splitext(os.path.abspath(db_path))[0] + ".analytics.db"
+
+
+def _uri(path: str, mode: str) -> str:
+    return f"file:{urllib.parse.quote(os.path.abspath(path))}?mode={mode}"
+
+
+# -----------------------------
+# Per-user computation (runs in pool workers)
+# -----------------------------
+def compute_users(db_path: str, usernames: Sequence[str], levels: Sequence[str],
+                  scan: bool = False, conn: Optional[sqlite3.Connection] = None) -> Tuple[list, list]:
+    """Stats rows for ``user_stats`` and ``user_levels`` from all results of ``usernames``.
+
+    ``scan`` reads the whole table in storage order instead of user by user,
+    which is faster when ``usernames`` is (nearly) everyone. ``conn``, a
+    read-only connection to ``db_path``, is used and closed instead of a new one.
+    """
+    conn = conn or sqlite3.connect(_uri(db_path, "ro"), uri=True)
+    try:
+        conn.execute("CREATE TEMP TABLE shard (username TEXT PRIMARY KEY, id INTEGER NOT NULL) WITHOUT ROWID")
+        conn.executemany("INSERT INTO shard VALUES (?, ?)", zip(usernames, range(len(usernames))))
+        # levels missing from quiz_stats were not written by the app; they come out as -1 and are skipped
+        level_case = "CASE r.level " + "WHEN ? THEN ? " * len(levels) + "ELSE -1 END"
+        sql = (SQL_SCAN_RESULTS if scan else SQL_SHARD_RESULTS).format(level_case=level_case)
+        rows = conn.execute(sql, [v for pair in zip(levels, range(len(levels))) for v in pair]).fetchall()
+    finally:
+        conn.close()
+    # plain ints all the way: far cheaper to turn into arrays than tuples of strings
+    data = np.fromiter(chain.from_iterable(rows), np.int64, len(rows) * 5).reshape(-1, 5)
+    del rows
+    data = data[data[:, 1] >= 0]
+    data = data[np.lexsort((data[:, 2], data[:, 0]))]     # by user, oldest first
+    if not len(data):
+        return [], []
+    return reduce_results(np.asarray(usernames), np.asarray(levels), data[:, 0], data[:, 1], data[:, 3], data[:, 4])
+
+
+def reduce_results(names, level_names, user, level, score, total, streak0=None, attempts0=None) -> Tuple[list, list]:
+    """Result columns sorted by user, then age -> rows for ``user_stats`` and ``user_levels``.
+
+    ``user`` and ``level`` index into ``names`` and ``level_names``. For results
+    that follow ones already counted, ``streak0`` (per user) and ``attempts0``
+    (per user and level) say where each user's streak and attempt count stood.
+    """
+    n = len(user)
+    starts = np.flatnonzero(np.r_[True, user[1:] != user[:-1]])
+    ends = np.r_[starts[1:], n]
+    pct = score * 100.0 / total
+
+    # pass streaks: how many quizzes in a row, up to and including each one, were passed
+    idx = np.arange(n)
+    marker = np.where(pct >= PASS_PCT, -1, idx)
+    marker[starts] = np.maximum(marker[starts], starts - 1)     # a streak never carries over from another user
+    run = idx - np.maximum.accumulate(marker)
+    if streak0 is not None:
+        # ... but does from the user's own earlier results, until the first failed quiz
+        unbroken = run == idx - np.repeat(starts, ends - starts) + 1
+        run += np.where(unbroken, streak0[user], 0)
+    user_rows = list(zip(names[user[starts]].tolist(), (ends - starts).tolist(), np.add.reduceat(score, starts).tolist(),
+                         np.add.reduceat(pct, starts).tolist(), np.maximum.reduceat(pct, starts).tolist(),
+                         run[ends - 1].tolist(), np.maximum.reduceat(run, starts).tolist()))
+
+    # (user, level) groups; a stable sort keeps each group oldest first, so the
+    # position inside the group is the attempt number at that level
+    order = np.argsort(user * len(level_names) + level, kind="stable")
+    key = (user * len(level_names) + level)[order]
+    group_starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    sizes = np.diff(np.r_[group_starts, n])
+    groups = len(group_starts)
+    group = np.empty(n, np.int64)
+    group[order] = np.repeat(np.arange(groups), sizes)
+    nth = np.empty(n, np.int64)
+    nth[order] = np.arange(n) - np.repeat(group_starts, sizes) + 1
+    if attempts0 is not None:
+        nth += attempts0[user, level]
+    keys = key[group_starts]
+    best = np.full(groups, -np.inf)
+    np.maximum.at(best, group, pct)
+    vectors = np.zeros((groups, VECTOR_LEN))
+    bucket = np.clip(pct // 10, 0, BUCKETS - 1).astype(np.int64)
+    vectors[:, :BUCKETS] = np.bincount(group * BUCKETS + bucket, minlength=groups * BUCKETS).reshape(groups, BUCKETS)
+    early = nth <= CURVE_LEN
+    slot = group[early] * CURVE_LEN + nth[early] - 1
+    vectors[:, BUCKETS:BUCKETS + CURVE_LEN] = np.bincount(slot, pct[early], groups * CURVE_LEN).reshape(groups, -1)
+    vectors[:, BUCKETS + CURVE_LEN:] = np.bincount(slot, minlength=groups * CURVE_LEN).reshape(groups, -1)
+    level_rows = list(zip(names[keys // len(level_names)].tolist(), level_names[keys % len(level_names)].tolist(),
+                          np.bincount(group).tolist(), np.bincount(group, score).astype(np.int64).tolist(),
+                          np.bincount(group, pct).tolist(), best.tolist(), [v.tobytes() for v in vectors]))
+    return user_rows, level_rows
+
+
+def _shards(usernames: List[str], count: int) -> List[List[str]]:
+    size = -(-len(usernames) // count)
+    return [usernames[i:i + size] for i in range(0, len(usernames), size)]
+
+
+# -----------------------------
+# Cache
+# -----------------------------
+class Analytics:
+    def __init__(self, db_path: str = DB_PATH, cache_path: Optional[str] = None):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(_uri(cache_path or analytics_path(db_path), "rwc"), uri=True, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+            # a cache is only ever derived data: rebuild it from scratch
+            for (table,) in self.conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall():
+                self.conn.execute(f'DROP TABLE "{table}"')
+            for sql in CACHE_SCHEMA:
+                self.conn.execute(sql)
+            self.conn.execute(f"PRAGMA user_version={CACHE_VERSION}")
+        self.conn.execute("ATTACH DATABASE ? AS app", (_uri(db_path, "ro"),))
+        # what interrupt() (on another thread) must reach while a rebuild runs
+        self._interrupted = False
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._scan: Optional[sqlite3.Connection] = None
+
+    def close(self):
+        self.conn.close()
+
+    def interrupt(self):
+        """Make the running (or else the next) refresh() stop early; callable from any thread.
+
+        That refresh raises sqlite3.OperationalError and the cache keeps its
+        last committed state. Shards already running in pool workers finish
+        first; queued ones are dropped.
+        """
+        self._interrupted = True
+        pool = self._pool
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        for conn in (self.conn, self._scan):
+            try:
+                conn and conn.interrupt()
+            except sqlite3.ProgrammingError:
+                pass    # closed meanwhile: that step is over
+
+    def _check_interrupt(self):
+        if self._interrupted:
+            raise sqlite3.OperationalError("interrupted")
+
+    def _state(self, key: str) -> int:
+        row = self.conn.execute(SQL_STATE, (key,)).fetchone()
+        return row[0] if row else 0
+
+    def refresh(self, workers: Optional[int] = None) -> RefreshReport:
+        """Bring the cache up to date with the app database; returns what had to be recomputed."""
+        try:
+            return self._refresh(workers)
+        except Exception as exc:
+            if not self._interrupted:
+                raise
+            # a cancelled shard or an interrupted statement, all the same to the caller
+            raise sqlite3.OperationalError("analytics refresh interrupted") from exc
+        finally:
+            self._interrupted = False
+
+    def _refresh(self, workers: Optional[int]) -> RefreshReport:
+        self._check_interrupt()
+        start = time.perf_counter()
+        workers = workers or os.cpu_count() or 1
+        done, answers_done = self._state("results_upto"), self._state("answers_upto")
+        upto, answers_upto = self.conn.execute(SQL_LAST_RESULT).fetchone()[0], self.conn.execute(SQL_LAST_ANSWER).fetchone()[0]
+        # rowids going backwards means a different (or restored) database: start over
+        full = done == 0 or upto < done or answers_upto < answers_done
+        if full:
+            answers_done = 0
+            usernames = [u for (u,) in self.conn.execute(SQL_ALL_USERS)]
+            levels = [level for (level,) in self.conn.execute(SQL_LEVELS)]
+            if len(usernames) >= POOL_MIN_USERS and workers > 1:
+                # spawn, not fork: the app calls this from its DB thread, next to Tk
+                with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as pool:
+                    self._pool = pool
+                    try:
+                        parts = list(pool.map(compute_users, repeat(self.db_path), _shards(usernames, workers * 4),
+                                              repeat(levels)))
+                    finally:
+                        self._pool = None
+            else:
+                workers = 1
+                self._scan = sqlite3.connect(_uri(self.db_path, "ro"), uri=True, check_same_thread=False)
+                try:
+                    parts = [compute_users(self.db_path, usernames, levels, scan=True, conn=self._scan)]
+                finally:
+                    self._scan = None
+            user_rows = [row for rows, _ in parts for row in rows]
+            level_rows = added = [row for _, rows in parts for row in rows]
+            known = frozenset()
+        else:
+            workers = 1
+            usernames, user_rows, level_rows, added, known = self._new_results(done, upto)
+        answers = self.conn.execute(SQL_NEW_ANSWERS, (answers_done, answers_upto)).fetchall()
+
+        self._check_interrupt()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if full:
+                for table in ("user_stats", "user_levels", "level_stats", "question_stats"):
+                    self.conn.execute(f"DELETE FROM {table}")
+            self._store(user_rows, level_rows, added, known)
+            self.conn.executemany(SQL_ADD_ANSWERS, answers)
+            self.conn.executemany(SQL_SET_STATE, [("results_upto", upto), ("answers_upto", answers_upto)])
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return RefreshReport(len(usernames), sum(a[1] for a in answers), full, workers, time.perf_counter() - start)
+
+    def _new_results(self, done: int, upto: int) -> tuple:
+        """Fold the results in rowids (done, upto] into their users' cached rows.
+
+        Returns the users, their new user and level rows, the level rows of just
+        the new results, and the (user, level) pairs that were cached already.
+        """
+        rows = self.conn.execute(SQL_NEW_RESULTS, (done, upto)).fetchall()
+        if not rows:
+            return [], [], [], [], frozenset()
+        users, levels, rowids, scores, totals = zip(*rows)
+        names, user = np.unique(np.array(users), return_inverse=True)
+        level_names, level = np.unique(np.array(levels), return_inverse=True)
+        order = np.lexsort((np.array(rowids), user))     # by user, oldest first
+        usernames = names.tolist()
+
+        # each user's streak so far and attempts so far at each level carry on into the new results
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS dirty (username TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.conn.execute("DELETE FROM temp.dirty")
+        self.conn.executemany("INSERT INTO temp.dirty VALUES (?)", ((u,) for u in usernames))
+        old_users = {row[0]: row for row in self.conn.execute(SQL_OLD_USERS)}
+        old_levels = {(row[0], row[1]): row for row in self.conn.execute(SQL_OLD_LEVELS)}
+        user_pos = {u: i for i, u in enumerate(usernames)}
+        level_pos = {lv: i for i, lv in enumerate(level_names.tolist())}
+        streak0 = np.array([old_users[u][5] if u in old_users else 0 for u in usernames], np.int64)
+        attempts0 = np.zeros((len(names), len(level_names)), np.int64)
+        for (u, lv), row in old_levels.items():
+            if lv in level_pos:
+                attempts0[user_pos[u], level_pos[lv]] = row[2]
+        user_rows, level_rows = reduce_results(names, level_names, user[order], level[order],
+                                               np.array(scores, np.int64)[order], np.array(totals, np.int64)[order],
+                                               streak0, attempts0)
+
+        merged_users = []
+        for u, attempts, points, pct_sum, best, streak, best_streak in user_rows:
+            old = old_users.get(u)
+            if old is not None:
+                attempts, points, pct_sum = attempts + old[1], points + old[2], pct_sum + old[3]
+                best, best_streak = max(best, old[4]), max(best_streak, old[6])
+            merged_users.append((u, attempts, points, pct_sum, best, streak, best_streak))
+        merged_levels = []
+        for u, lv, attempts, points, pct_sum, best, vector in level_rows:
+            old = old_levels.get((u, lv))
+            if old is not None:
+                attempts, points, pct_sum, best = attempts + old[2], points + old[3], pct_sum + old[4], max(best, old[5])
+                vector = (np.frombuffer(vector) + np.frombuffer(old[6])).tobytes()
+            merged_levels.append((u, lv, attempts, points, pct_sum, best, vector))
+        return usernames, merged_users, merged_levels, level_rows, frozenset(old_levels)
+
+    def _store(self, user_rows: list, level_rows: list, added: list, known: FrozenSet[Tuple[str, str]]):
+        """Write users' rows, and add ``added`` (level rows of newly counted results) to the level totals.
+
+        ``known`` are the (user, level) pairs the totals already count as users.
+        """
+        self.conn.executemany(SQL_PUT_USER, user_rows)
+        self.conn.executemany(SQL_PUT_USER_LEVEL, level_rows)
+        totals: Dict[str, list] = {}     # level -> [users, attempts, pct_sum, vector]
+        for level, users, attempts, pct_sum, vector in self.conn.execute(SQL_LEVEL_STATS):
+            totals[level] = [users, attempts, pct_sum, np.frombuffer(vector).copy()]
+        for username, level, attempts, _, pct_sum, _, vector in added:
+            total = totals.setdefault(level, [0, 0, 0.0, np.zeros(VECTOR_LEN)])
+            total[0] += (username, level) not in known
+            total[1] += attempts
+            total[2] += pct_sum
+            total[3] += np.frombuffer(vector)
+        self.conn.executemany(SQL_PUT_LEVEL, [(level, users, attempts, pct_sum, vector.tobytes())
+                                              for level, (users, attempts, pct_sum, vector) in totals.items()])
+
+    # -----------------------------
+    # Queries (read the cache as of the last refresh)
+    # -----------------------------
+    def _order(self, by: str, level: Optional[str]) -> Tuple[str, str]:
+        if level is None:
+            return ORDERS[by]
+        if by not in LEVEL_ORDERS:
+            raise ValueError(f"no per-level leaderboard by {by}")
+        return LEVEL_ORDERS[by]
+
+    def leaderboard(self, by: str = "points", level: Optional[str] = None, limit: int = 20,
+                    min_attempts: int = 1) -> List[LeaderboardRow]:
+        order = self._order(by, level)
+        if level is None:
+            players = self.conn.execute(SQL_PLAYERS, (min_attempts,)).fetchone()[0]
+            rows = self.conn.execute(SQL_BOARD.format(*order), (min_attempts, limit))
+        else:
+            players = self.conn.execute(SQL_LEVEL_PLAYERS, (level, min_attempts)).fetchone()[0]
+            rows = self.conn.execute(SQL_LEVEL_BOARD.format(*order), (level, min_attempts, limit))
+        return [LeaderboardRow(*row, players) for row in rows]
+
+    def rank_of(self, username: str, by: str = "points", level: Optional[str] = None,
+                min_attempts: int = 1) -> Optional[LeaderboardRow]:
+        """``username``'s row on the board, None if they are not on it."""
+        order = self._order(by, level)
+        if level is None:
+            row = self.conn.execute(SQL_USER_ROW.format(*order), (username, min_attempts)).fetchone()
+            if row is None:
+                return None
+            rank = self.conn.execute(SQL_RANK.format(*order), (min_attempts,) + row[-2:]).fetchone()[0]
+            players = self.conn.execute(SQL_PLAYERS, (min_attempts,)).fetchone()[0]
+        else:
+            row = self.conn.execute(SQL_LEVEL_USER_ROW.format(*order), (level, username, min_attempts)).fetchone()
+            if row is None:
+                return None
+            rank = self.conn.execute(SQL_LEVEL_RANK.format(*order), (level, min_attempts) + row[-2:]).fetchone()[0]
+            players = self.conn.execute(SQL_LEVEL_PLAYERS, (level, min_attempts)).fetchone()[0]
+        return LeaderboardRow(rank, *row[:-2], players)
+
+    def difficulty_curves(self) -> List[DifficultyCurve]:
+        curves = []
+        for level, users, attempts, pct_sum, vector in self.conn.execute(SQL_LEVEL_STATS):
+            if not attempts:
+                continue
+            vector = np.frombuffer(vector)
+            histogram = np.rint(vector[:BUCKETS]).astype(np.int64)
+            sums, counts = vector[BUCKETS:BUCKETS + CURVE_LEN], np.rint(vector[BUCKETS + CURVE_LEN:])
+            by_attempt = [round(s / c, 1) if c else None for s, c in zip(sums.tolist(), counts.tolist())]
+            passed = int(histogram[int(PASS_PCT // 10):].sum())
+            curves.append(DifficultyCurve(level, users, attempts, round(pct_sum / attempts, 1),
+                                          round(passed * 100.0 / attempts, 1), histogram.tolist(), by_attempt))
+        return curves
+
+    def question_accuracy(self, hardest: bool = True, limit: int = 10, min_attempts: int = 5) -> List[QuestionAccuracy]:
+        sql = SQL_QUESTION_ACCURACY.format(direction="ASC" if hardest else "DESC")
+        return [QuestionAccuracy(*row) for row in self.conn.execute(sql, (min_attempts, limit))]
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="StarLens quiz analytics across all users.")
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    refresh = sub.add_parser("refresh", help="update the analytics cache")
+    refresh.add_argument("--workers", type=int, help="processes for large recomputes (default: one per CPU)")
+    board = sub.add_parser("leaderboard", help="refresh, then print a leaderboard")
+    board.add_argument("--by", choices=sorted(ORDERS), default="points")
+    board.add_argument("--level")
+    board.add_argument("--limit", type=int, default=20)
+    sub.add_parser("curves", help="refresh, then print the difficulty curve of each level")
+    questions = sub.add_parser("questions", help="refresh, then print the hardest (or easiest) questions")
+    questions.add_argument("--easiest", action="store_true")
+    questions.add_argument("--limit", type=int, default=10)
+
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.db):
+        parser.exit(1, f"error: no database at {args.db}\n")
+    analytics = Analytics(args.db)
+    try:
+        report = analytics.refresh(getattr(args, "workers", None))
+        print(f"recomputed {report.users:,} users{' (full rebuild)' if report.full else ''}, "
+              f"counted {report.answers:,} answers in {report.seconds:.2f}s", file=sys.stderr)
+        if args.command == "leaderboard":
+            for row in analytics.leaderboard(args.by, args.level, args.limit):
+                print(f"{row.rank:>4}  {row.username:<20}{row.points:>8} pts {row.average:>6.1f}% avg "
+                      f"{row.attempts:>5} quizzes  streak {row.streak} (best {row.best_streak})")
+        elif args.command == "curves":
+            for curve in analytics.difficulty_curves():
+                points = " ".join("  -  " if s is None else f"{s:5.1f}" for s in curve.by_attempt[:10])
+                print(f"{curve.level:<7} {curve.attempts:>10,} quizzes  avg {curve.average:5.1f}%  "
+                      f"pass {curve.pass_rate:5.1f}%  by attempt: {points}")
+        elif args.command == "questions":
+            for q in analytics.question_accuracy(hardest=not args.easiest, limit=args.limit):
+                print(f"{q.accuracy:5.1f}% of {q.attempts:>6,}  [{q.level}] {q.text}")
+    finally:
+        analytics.close()
+
+
+if __name__ == "__main__":
+    main()
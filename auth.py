@@ -0,0 +1,137 @@
+"""Password hashing and login sessions (standard library only).
+
+Passwords are stored as self-describing strings, so the cost can be
+raised later and old hashes are upgraded on the next successful login::
+
+    scrypt$16384$8$1$<salt>$<key>
+    pbkdf2_sha256$600000$<salt>$<key>
+
+Derivation is deliberately slow (tens of milliseconds); callers run it on
+the DB worker thread, never on the Tk main loop. A successful login can
+hand out a random session token; the database keeps only its SHA-256, so
+a leaked database does not leak usable tokens.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+from typing import Optional, Tuple
+
+SCRYPT_N = 2 ** 14        # ~16 MB and ~30-60 ms per derivation on a typical desktop
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = 600_000
+SALT_BYTES = 16
+KEY_BYTES = 32
+SESSION_DAYS = 30
+SCHEMES = ("scrypt", "pbkdf2_sha256")
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+class PasswordHasher:
+    def __init__(self, scheme: Optional[str] = None, scrypt_n: int = SCRYPT_N, scrypt_r: int = SCRYPT_R,
+                 scrypt_p: int = SCRYPT_P, pbkdf2_iterations: int = PBKDF2_ITERATIONS):
+        # hashlib.scrypt needs OpenSSL 1.1+; fall back to PBKDF2 where it is missing
+        self.scheme = scheme or ("scrypt" if hasattr(hashlib, "scrypt") else "pbkdf2_sha256")
+        if self.scheme not in SCHEMES:
+            raise ValueError(f"unknown password scheme: {self.scheme}")
+        self.scrypt_params = (scrypt_n, scrypt_r, scrypt_p)
+        self.pbkdf2_iterations = pbkdf2_iterations
+        self._dummy = None
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(SALT_BYTES)
+        if self.scheme == "scrypt":
+            n, r, p = self.scrypt_params
+            key = self._scrypt(password, salt, n, r, p)
+            return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(key)}"
+        key = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, self.pbkdf2_iterations, KEY_BYTES)
+        return f"pbkdf2_sha256${self.pbkdf2_iterations}${_b64(salt)}${_b64(key)}"
+
+    @staticmethod
+    def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r * p + (1 << 20), dklen=KEY_BYTES)
+
+    def verify(self, password: str, stored: Optional[str]) -> bool:
+        """Constant-time check of ``password`` against a stored hash (or None for an unknown user)."""
+        if stored is None:
+            # unknown user: do the same work so timing doesn't reveal which usernames exist
+            if self._dummy is None:
+                self._dummy = self.hash(secrets.token_hex(8))
+            self.verify(password, self._dummy)
+            return False
+        scheme, _, rest = stored.partition("$")
+        try:
+            if scheme == "scrypt":
+                n, r, p, salt, key = rest.split("$")
+                derived = self._scrypt(password, _unb64(salt), int(n), int(r), int(p))
+            elif scheme == "pbkdf2_sha256":
+                iterations, salt, key = rest.split("$")
+                derived = hashlib.pbkdf2_hmac("sha256", password.encode(), _unb64(salt), int(iterations), KEY_BYTES)
+            else:
+                return False
+        except ValueError:
+            return False
+        return hmac.compare_digest(derived, _unb64(key))
+
+    def needs_rehash(self, stored: str) -> bool:
+        if self.scheme == "scrypt":
+            return not stored.startswith("scrypt${}${}${}$".format(*self.scrypt_params))
+        return not stored.startswith(f"pbkdf2_sha256${self.pbkdf2_iterations}$")
+
+
+def is_hashed(stored: str) -> bool:
+    return stored.split("$", 1)[0] in SCHEMES and stored.count("$") >= 3
+
+
+# -----------------------------
+# Sessions
+# -----------------------------
+def new_token() -> Tuple[str, str]:
+    """A fresh session token and the digest to store for it."""
+    token = secrets.token_urlsafe(32)
+    return token, token_digest(token)
+
+
+def token_digest(token: str) -> str:
+    # tokens are 256 random bits, so a plain hash is enough (no salt or stretching needed)
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def session_path(db_path: str) -> str:
+    return os.path.splitext(os.path.abspath(db_path))[0] + ".session"
+
+
+def read_session(path: str) -> Optional[Tuple[str, str]]:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+        return data["username"], data["token"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_session(path: str, username: str, token: str):
+    # owner-only, created with the right mode rather than chmod-ed afterwards
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        json.dump({"username": username, "token": token}, fh)
+
+
+def clear_session(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
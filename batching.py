@@ -0,0 +1,35 @@
+"""Batching for the streaming importers (schedule_io, question_bank).
+
+Rows are validated lazily and written one ``executemany`` transaction per
+chunk, so only one chunk is ever held in memory; ``ErrorLog`` keeps the
+rejected lines' messages to a fixed number as well.
+"""
+from __future__ import annotations
+
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+MAX_ERRORS = 20     # problems kept for the report; the rest are only counted
+
+
+class ErrorLog:
+    """The first ``limit`` problems found in a file, and how many there were in all."""
+
+    def __init__(self, limit: int = MAX_ERRORS):
+        self.limit = limit
+        self.count = 0
+        self.messages: List[str] = []
+
+    def add(self, message: str):
+        self.count += 1
+        if len(self.messages) < self.limit:
+            self.messages.append(message)
+
+
+def chunked(rows: Iterable, size: int) -> Iterator[list]:
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,119 @@
+"""Quiz analytics over a large quiz_results table.
+
+Seeds ``--rows`` quiz results (10 million by default) from ``--users``
+users plus question_history answers. It then times:
+
+* a leaderboard computed ad hoc with GROUP BY over quiz_results;
+* a full analytics refresh with one process, and with ``--workers``;
+* an incremental refresh after ``--new`` more results arrive;
+* the queries the leaderboard screen makes against the cache.
+
+    python benchmarks/bench_analytics.py --rows 10000000 --workers 8
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analytics  # noqa: E402
+import storage  # noqa: E402
+from storage import Database  # noqa: E402
+
+LEVELS = np.array(["Easy", "Medium", "Hard"])
+AD_HOC_LEADERBOARD = """
+    SELECT username, SUM(score), AVG(score * 100.0 / total) FROM quiz_results WHERE total > 0
+    GROUP BY username ORDER BY 2 DESC, 3 DESC LIMIT 20
+"""
+
+
+def median_ms(fn, runs=5):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)[len(samples) // 2] * 1000
+
+
+def results(rng, count, users):
+    # skewed activity: a few keen users take most quizzes, as in a real class
+    who = np.minimum(rng.zipf(1.3, count), users) - 1
+    skill = np.linspace(0.3, 0.9, users)[rng.permutation(users)]
+    scores = rng.binomial(10, skill[who])
+    levels = LEVELS[rng.integers(0, 3, count)]
+    return zip((f"user{u:06d}" for u in who.tolist()), scores.tolist(), levels.tolist())
+
+
+def seed(path, args, rng):
+    Database(path).close()     # schema
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    # loading then indexing is several times faster than keeping the index up to date row by row
+    conn.execute("DROP INDEX idx_quiz_results_username")
+    for done in range(0, args.rows, 1_000_000):
+        batch = results(rng, min(1_000_000, args.rows - done), args.users)
+        conn.executemany("INSERT INTO quiz_results VALUES (?, ?, 10, ?, '2026-10-17 21:00')", batch)
+    conn.execute("CREATE INDEX idx_quiz_results_username ON quiz_results (username)")
+    conn.execute(storage.SQL_BACKFILL_STATS)     # what add_quiz_result keeps up to date
+    questions = rng.integers(1, 5000, args.answers)
+    correct = rng.random(args.answers) < 0.2 + questions / 6250
+    conn.executemany("INSERT INTO question_history VALUES ('user', ?, ?, '')", zip(questions.tolist(), correct.tolist()))
+    conn.executemany("INSERT OR IGNORE INTO questions (id, level, ord, text, options, answer) VALUES (?, 'Easy', ?, ?, '[]', '')",
+                     ((i, i, f"Question {i}") for i in range(1, 5000)))
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--answers", type=int, default=2_000_000, help="question_history rows")
+    parser.add_argument("--new", type=int, default=10_000, help="results added before the incremental refresh")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    tmp = tempfile.mkdtemp(prefix="starlens-bench-")
+    path = os.path.join(tmp, "analytics.db")
+    start = time.perf_counter()
+    seed(path, args, rng)
+    print(f"seeded {args.rows:,} results, {args.answers:,} answers in {time.perf_counter() - start:.0f}s "
+          f"({os.path.getsize(path) / 2 ** 20:.0f} MB)")
+
+    conn = sqlite3.connect(path)
+    print(f"ad hoc GROUP BY leaderboard: {median_ms(lambda: conn.execute(AD_HOC_LEADERBOARD).fetchall(), 1) / 1000:.1f} s")
+
+    for workers in sorted({1, args.workers}):
+        cache = analytics.Analytics(path, os.path.join(tmp, f"cache{workers}.db"))
+        report = cache.refresh(workers)
+        print(f"full refresh, {report.workers} worker(s): {report.seconds:.1f} s for {report.users:,} users")
+
+    db = Database(path)
+    for username, score, level in results(rng, args.new, args.users):
+        db.add_quiz_result(username, score, 10, level)
+    db.close()
+    report = cache.refresh(args.workers)
+    print(f"incremental refresh after {args.new:,} new results: {report.seconds * 1000:.0f} ms "
+          f"for {report.users:,} users")
+    print(f"refresh with nothing new: {median_ms(lambda: cache.refresh(args.workers)):.2f} ms")
+
+    print(f"leaderboard top 20: {median_ms(lambda: cache.leaderboard()):.1f} ms, "
+          f"by level: {median_ms(lambda: cache.leaderboard(level='Hard')):.1f} ms, "
+          f"one user's rank: {median_ms(lambda: cache.rank_of('user000500')):.1f} ms")
+    print(f"difficulty curves: {median_ms(cache.difficulty_curves):.2f} ms, "
+          f"hardest questions: {median_ms(cache.question_accuracy):.2f} ms")
+    cache.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Cost of the instrumentation in instrument.py, with tracing off and on.
+
+Times a traced function against the plain function, ``TRACER.span``, and
+a database workload (logins skipped: profile reads, schedule reads and
+writes, quiz answers) on the bare cursor versus the TracedCursor, then
+writes the spans of the traced run as a Chrome trace.
+
+    python benchmarks/bench_instrument.py --calls 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import question_bank  # noqa: E402
+import services  # noqa: E402
+from instrument import TRACER, trace_cursor  # noqa: E402
+from storage import Database  # noqa: E402
+
+
+def per_call_ns(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def work():
+    return None
+
+
+def in_span():
+    with TRACER.span("span", "bench"):
+        pass
+
+
+def db_workload(db, users, rounds, rng):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        user = f"user{rng.randrange(users)}"
+        services.profile(db, user)
+        db.schedules(user)
+        db.add_schedule(user, "2026-10-17 22:00", "M42")
+        for question in services.start_quiz(db, user, "Easy"):
+            db.record_answer(user, question, rng.random() < 0.5)
+        db.flush()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    parser.add_argument("--rounds", type=int, default=2000, help="simulated visits per database run")
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+    tmp = tempfile.mkdtemp(prefix="starlens-bench-")
+
+    traced = TRACER.traced("bench")(work)
+    plain = per_call_ns(work, args.calls)
+    print(f"plain call: {plain:.0f} ns")
+    for enabled in (False, True):
+        TRACER.enabled = enabled
+        TRACER.clear()
+        print(f"tracing {'on ' if enabled else 'off'}: traced call +{per_call_ns(traced, args.calls) - plain:6.0f} ns, "
+              f"span {per_call_ns(in_span, args.calls):6.0f} ns")
+
+    db = Database(os.path.join(tmp, "bench.db"))
+    question_bank.ensure_builtin(db)
+    for i in range(args.users):
+        db.cur.execute("INSERT INTO users (username, password) VALUES (?, '')", (f"user{i}",))
+    for enabled in (False, True, False):
+        TRACER.enabled = enabled
+        TRACER.clear()
+        trace_cursor(db, enabled)
+        ms = db_workload(db, args.users, args.rounds, random.Random(5))
+        print(f"db visit, tracing {'on ' if enabled else 'off'}: {ms:.3f} ms"
+              + (f" ({len(TRACER.spans):,} spans)" if enabled else ""))
+        if enabled:
+            top = TRACER.stats()[:5]
+            path = os.path.join(tmp, "trace.json")
+            print(f"  trace of {TRACER.dump(path):,} spans written to {path}; busiest statements:")
+            for s in top:
+                print(f"  {s.count:>7} x {s.total_ms / s.count:7.4f} ms  {s.name}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Learning archive: pack size, open time, article latency and offline search.
+
+Packs ``--articles`` synthetic long-form articles (about 1,500 words
+each), then times opening the archive, decoding an article cold and from
+the LRU, a reading session that follows next_topic with and without
+prefetch, and full-text queries next to a scan that inflates every
+article and searches its text.
+
+    python benchmarks/bench_learning.py --articles 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import content_store  # noqa: E402
+
+CATEGORIES = ["Stars", "Galaxies", "Nebulae", "Solar System", "Observing", "Exploration"]
+
+
+def make_articles(count, rng, words_per_article=1500):
+    # zipf-ish vocabulary so common words are common, like real prose
+    vocab = [f"w{i}" for i in range(20_000)] + ["nebula", "galaxy", "supernova", "orbit", "telescope", "comet"]
+    weights = [1 / (i + 1) for i in range(len(vocab))]
+    articles = []
+    for i in range(count):
+        words = rng.choices(vocab, weights, k=words_per_article)
+        paragraphs = [" ".join(words[k:k + 150]) for k in range(0, len(words), 150)]
+        articles.append({"id": i + 1, "title": f"Topic {i + 1} {rng.choice(vocab[:2000])}",
+                         "category": rng.choice(CATEGORIES), "summary": " ".join(words[:12]),
+                         "image": rng.choice(["star", "galaxy", None]), "paragraphs": paragraphs,
+                         "related": rng.sample(range(1, count + 1), 3)})
+    return articles
+
+
+def percentiles(samples):
+    samples = sorted(s * 1000 for s in samples)
+    return samples[len(samples) // 2], samples[max(0, int(len(samples) * 0.99) - 1)]
+
+
+def scan_search(store, word):
+    return [t for t in store.topics if word in " ".join(store.article(t.id).paragraphs).split()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--session", type=int, default=50, help="articles read in the simulated session")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    tmp = tempfile.mkdtemp(prefix="starlens-bench-")
+    path = os.path.join(tmp, "learning.slpack")
+    articles = make_articles(args.articles, rng)
+    raw = sum(len(" ".join(a["paragraphs"])) for a in articles)
+    images = {kind: content_store.render_image(kind) for kind in ("star", "galaxy")}
+
+    start = time.perf_counter()
+    content_store.build(path, articles, images)
+    print(f"packed {args.articles:,} articles ({raw / 2 ** 20:.1f} MB of text) in {time.perf_counter() - start:.1f}s "
+          f"-> {os.path.getsize(path) / 2 ** 20:.1f} MB archive")
+
+    start = time.perf_counter()
+    store = content_store.ContentStore(path)
+    print(f"open (header + id index): {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    ids = [t.id for t in store.topics]
+    cold, warm = [], []
+    for tid in rng.sample(ids, min(200, len(ids))):
+        start = time.perf_counter()
+        store.article(tid)
+        cold.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        store.article(tid)
+        warm.append(time.perf_counter() - start)
+    print("article cold: p50 {:.3f} ms, p99 {:.3f} ms".format(*percentiles(cold)),
+          "| LRU hit: p50 {:.4f} ms".format(percentiles(warm)[0]))
+
+    for prefetch in (False, True):
+        store = content_store.ContentStore(path)
+        tid, waits = rng.choice(ids), []
+        for _ in range(args.session):
+            start = time.perf_counter()
+            store.article(tid)
+            waits.append(time.perf_counter() - start)
+            tid = store.next_topic(tid)
+            if prefetch:
+                store.prefetch(tid)   # the app does this on the worker while the reader reads
+        print(f"reading session, prefetch {'on ' if prefetch else 'off'}: "
+              "open p50 {:.4f} ms, p99 {:.3f} ms".format(*percentiles(waits)))
+
+    store = content_store.ContentStore(path)
+    start = time.perf_counter()
+    store.search("nebula")
+    print(f"first search (loads the index): {(time.perf_counter() - start) * 1000:.0f} ms")
+    queries = [" ".join(rng.choice(["nebula", "galaxy", "orbit", "telescope", "comet", "w12", "w345", "supern"])
+                        for _ in range(rng.randint(1, 3))) for _ in range(args.queries)]
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        store.search(query)
+        samples.append(time.perf_counter() - start)
+    print("search: p50 {:.2f} ms, p99 {:.2f} ms".format(*percentiles(samples)))
+
+    samples = []
+    for word in ("nebula", "comet", "w345"):
+        start = time.perf_counter()
+        scan_search(store, word)
+        samples.append(time.perf_counter() - start)
+    print("scan of every article: p50 {:.0f} ms".format(percentiles(samples)[0]))
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
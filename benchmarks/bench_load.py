@@ -0,0 +1,269 @@
+"""Load simulation: thousands of users driving the app's code paths without a display.
+
+Seeds a database with ``--users`` accounts, quiz history, schedules and a
+synthetic question bank, then replays ``--visits`` app sessions through
+``services`` and the same Database calls the screens make: log in (or
+resume a remembered login), open the profile, take a quiz, list/add/edit
+schedules, mark learning topics complete, log out. Writes that the app
+defers are flushed after each visit, as the DB worker would.
+
+Reports p50/p99 per operation and the database size per table. ``--json``
+saves the results; ``--compare`` diffs them against an earlier run and
+exits with status 1 if an operation's p99 regressed beyond ``--tolerance``.
+
+    python benchmarks/bench_load.py --users 2000 --visits 5000 --json load.json
+    python benchmarks/bench_load.py --compare load.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import auth  # noqa: E402
+import question_bank  # noqa: E402
+import services  # noqa: E402
+from storage import Database  # noqa: E402
+
+OBJECTS = ["Jupiter", "Saturn", "Mars", "Venus", "M42", "M31", "Pleiades", "Vega", "Sirius", "Betelgeuse"]
+TAGS = ["planets", "moons", "stars", "galaxies", "missions", "black-holes", "telescopes", "constellations"]
+NOISE_FLOOR_MS = 0.05    # p99 changes smaller than this are timer noise, never a regression
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def time(self, name, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.samples[name].append(time.perf_counter() - start)
+        return result
+
+
+def percentile(sorted_ms, q):
+    return sorted_ms[min(len(sorted_ms) - 1, int(q * len(sorted_ms)))]
+
+
+def summarize(samples):
+    ops = {}
+    for name, values in sorted(samples.items()):
+        ms = sorted(v * 1000 for v in values)
+        ops[name] = {"count": len(ms), "p50_ms": round(percentile(ms, 0.5), 4), "p99_ms": round(percentile(ms, 0.99), 4),
+                     "max_ms": round(ms[-1], 4), "mean_ms": round(sum(ms) / len(ms), 4)}
+    return ops
+
+
+def git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def db_sizes(path):
+    conn = sqlite3.connect(path)
+    try:
+        tables = {name: {"rows": conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]}
+                  for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        try:
+            for name, size in conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"):
+                tables.setdefault(name, {})["bytes"] = size     # indexes appear under their own names
+        except sqlite3.OperationalError:
+            pass    # SQLite built without the dbstat table: row counts only
+        page_size, pages = conn.execute("PRAGMA page_size").fetchone()[0], conn.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        conn.close()
+    wal = path + "-wal"
+    return {"file_bytes": os.path.getsize(path), "wal_bytes": os.path.getsize(wal) if os.path.exists(wal) else 0,
+            "page_size": page_size, "pages": pages, "tables": tables}
+
+
+# -----------------------------
+# Seeding
+# -----------------------------
+def write_pack(path, count, rng):
+    with open(path, "w", encoding="utf-8") as fh:
+        for i in range(count):
+            options = [f"option {i}-{k}" for k in range(4)]
+            fh.write(json.dumps({"level": question_bank.LEVELS[i % 3], "question": f"Synthetic question #{i}?",
+                                 "options": options, "answer": rng.choice(options),
+                                 "tags": rng.sample(TAGS, rng.randint(1, 2)), "difficulty": rng.random()}) + "\n")
+
+
+def seed(db, args, rng, tmp):
+    pack = os.path.join(tmp, "questions.jsonl")
+    write_pack(pack, args.questions, rng)
+    question_bank.ensure_builtin(db)
+    question_bank.load_pack(db, pack)
+    for i in range(args.users):
+        db.create_user(f"user{i}", f"password{i}")
+        for _ in range(rng.randint(0, 2 * args.results)):
+            total = 10
+            db.add_quiz_result(f"user{i}", rng.randint(0, total), total, rng.choice(question_bank.LEVELS),
+                               f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 21:00")
+    db.flush()
+    db.add_schedules((f"user{rng.randrange(args.users)}", f"2026-10-{rng.randint(1, 28):02d} 22:00", rng.choice(OBJECTS))
+                     for _ in range(args.users * args.schedules))
+
+
+# -----------------------------
+# Visits
+# -----------------------------
+def visit(db, rec, rng, username, password, session_file):
+    resumed = rng.random() < 0.6 and rec.time("resume_session", services.resume_session, db, session_file) == username
+    if not resumed:
+        rec.time("login", services.login, db, username, password, rng.random() < 0.5, session_file)
+
+    if rng.random() < 0.5:
+        rec.time("profile", services.profile, db, username)
+    if rng.random() < 0.4:
+        level = services.quiz_level(rng.randint(6, 40))
+        questions = rec.time("quiz_start", services.start_quiz, db, username, level)
+        quiz = services.QuizSession(username, level, questions)
+        while not quiz.done:
+            question, correct = quiz.answer(rng.choice(quiz.current.options))
+            rec.time("quiz_answer", db.record_answer, username, question, correct)
+        rec.time("quiz_save", services.save_quiz, db, quiz)
+        rec.time("profile", services.profile, db, username)     # the app shows the profile after a quiz
+    if rng.random() < 0.35:
+        entries = rec.time("schedule_list", db.schedules, username)
+        if rng.random() < 0.5:
+            rec.time("schedule_add", db.add_schedule, username, f"2026-10-{rng.randint(1, 28):02d} 23:00",
+                     rng.choice(OBJECTS))
+        if entries and rng.random() < 0.4:
+            entry = rng.choice(entries)
+            rec.time("schedule_edit", db.update_schedule, username, entry.id, entry.time, rng.choice(OBJECTS))
+    if rng.random() < 0.25:
+        rec.time("learning_progress", db.completed_topics, username)
+        rec.time("learning_complete", db.mark_topic_complete, username, rng.choice([1, 2, 3, 4, 101, 1004]))
+    if rng.random() < 0.1:
+        rec.time("logout", services.forget_session, db, session_file)
+    if db.pending:
+        rec.time("flush", db.flush)
+
+
+def run_client(path, hasher, args, visits, seed_, tmp, rec):
+    rng = random.Random(seed_)
+    db = Database(path, hasher=hasher)
+    try:
+        for _ in range(visits):
+            i = rng.randrange(args.users)
+            visit(db, rec, rng, f"user{i}", f"password{i}", os.path.join(tmp, f"user{i}.session"))
+        db.flush()
+    finally:
+        db.close()
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+def print_report(result):
+    print(f"{'operation':<20}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, op in result["ops"].items():
+        print(f"{name:<20}{op['count']:>8}{op['p50_ms']:>10.3f}{op['p99_ms']:>10.3f}{op['max_ms']:>10.2f}")
+    db = result["db"]
+    print(f"database: {db['file_bytes'] / 2 ** 20:.1f} MB (+{db['wal_bytes'] / 2 ** 20:.1f} MB WAL)")
+    for name, table in sorted(db["tables"].items(), key=lambda t: -t[1].get("bytes", 0)):
+        size = f"{table['bytes'] / 1024:10.0f} KB" if "bytes" in table else ""
+        rows = f"{table['rows']:>10,} rows" if "rows" in table else " " * 15
+        print(f"  {name:<36}{rows}{size}")
+
+
+def compare(result, baseline, tolerance):
+    print(f"\ncompared with {baseline.get('version') or 'baseline'} ({baseline.get('started', '?')}):")
+    regressions = []
+    for name, op in result["ops"].items():
+        old = baseline.get("ops", {}).get(name)
+        if old is None:
+            print(f"  {name:<20} new")
+            continue
+        change = op["p99_ms"] / old["p99_ms"] - 1 if old["p99_ms"] else 0.0
+        regressed = change > tolerance and op["p99_ms"] - old["p99_ms"] > NOISE_FLOOR_MS
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:<20} p50 {old['p50_ms']:8.3f} -> {op['p50_ms']:8.3f}   p99 {old['p99_ms']:8.3f} -> "
+              f"{op['p99_ms']:8.3f} ({change:+.0%}){'  REGRESSION' if regressed else ''}")
+    old_size, new_size = baseline.get("db", {}).get("file_bytes"), result["db"]["file_bytes"]
+    if old_size:
+        print(f"  database size {old_size / 2 ** 20:.1f} MB -> {new_size / 2 ** 20:.1f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--visits", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=1, help="app instances sharing the database file")
+    parser.add_argument("--results", type=int, default=10, help="average seeded quiz results per user")
+    parser.add_argument("--schedules", type=int, default=5, help="average seeded schedule entries per user")
+    parser.add_argument("--questions", type=int, default=3000, help="synthetic questions added to the bank")
+    parser.add_argument("--scrypt-n", type=int, default=2 ** 10,
+                        help=f"password hashing cost (the app uses {auth.SCRYPT_N}; lower keeps seeding quick)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="JSON from an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p99 growth")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tmp = tempfile.mkdtemp(prefix="starlens-bench-")
+    path = os.path.join(tmp, "load.db")
+    hasher = auth.PasswordHasher("scrypt", scrypt_n=args.scrypt_n) if hasattr(auth.hashlib, "scrypt") else None
+
+    start = time.perf_counter()
+    db = Database(path, hasher=hasher)
+    seed(db, args, rng, tmp)
+    db.close()
+    seed_s = time.perf_counter() - start
+    print(f"seeded {args.users:,} users, {args.questions:,} questions in {seed_s:.1f}s")
+
+    recorders = [Recorder() for _ in range(args.clients)]
+    share = [args.visits // args.clients + (i < args.visits % args.clients) for i in range(args.clients)]
+    threads = [threading.Thread(target=run_client, args=(path, hasher, args, share[i], args.seed * 1000 + i, tmp, rec))
+               for i, rec in enumerate(recorders)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    run_s = time.perf_counter() - start
+
+    samples = defaultdict(list)
+    for rec in recorders:
+        for name, values in rec.samples.items():
+            samples[name].extend(values)
+    params = {k: v for k, v in vars(args).items() if k not in ("json", "compare", "tolerance")}
+    result = {"benchmark": "load", "version": git_version(), "started": datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "params": params,
+              "seed_s": round(seed_s, 2), "run_s": round(run_s, 2),
+              "visits_per_s": round(args.visits / run_s, 1), "ops": summarize(samples), "db": db_sizes(path)}
+    print(f"{args.visits:,} visits from {args.clients} client(s) in {run_s:.1f}s ({result['visits_per_s']:,} visits/s)")
+    print_report(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, indent=2)
+        print(f"results written to {args.json}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            regressions = compare(result, json.load(fh), args.tolerance)
+        if regressions:
+            print(f"p99 regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Login latency and main-thread responsiveness with hashed passwords.
+
+For a few cost settings, times Database.check_login (key derivation +
+lookup) and the remembered-session path, then measures how late a 5 ms
+"UI tick" on the main thread runs while logins happen on a worker thread
+(as the app does) versus inline on the main thread. Finally times the
+batch migration of plaintext rows.
+
+    python benchmarks/bench_login.py --logins 10 --users 300
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import auth  # noqa: E402
+from storage import Database  # noqa: E402
+
+COSTS = [
+    ("scrypt n=2^13", dict(scheme="scrypt", scrypt_n=2 ** 13)),
+    ("scrypt n=2^14 (default)", dict(scheme="scrypt", scrypt_n=2 ** 14)),
+    ("scrypt n=2^15", dict(scheme="scrypt", scrypt_n=2 ** 15)),
+    ("pbkdf2 600k", dict(scheme="pbkdf2_sha256", pbkdf2_iterations=600_000)),
+]
+
+
+def median_ms(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000
+
+
+def ui_lateness(work, inline, tick=0.005):
+    """Worst delay of a periodic main-thread tick while ``work`` runs inline or on a worker thread."""
+    worst = 0.0
+    done = threading.Event()
+    if inline:
+        deadline = time.perf_counter() + tick
+        for job in work:
+            job()
+            worst = max(worst, time.perf_counter() - deadline)
+            deadline = time.perf_counter() + tick
+        return worst * 1000
+    pool = ThreadPoolExecutor(max_workers=1)
+    future = pool.submit(lambda: [job() for job in work])
+    future.add_done_callback(lambda _: done.set())
+    while not done.is_set():
+        deadline = time.perf_counter() + tick
+        time.sleep(tick)
+        worst = max(worst, time.perf_counter() - deadline)
+    pool.shutdown()
+    return worst * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=10)
+    parser.add_argument("--users", type=int, default=300, help="plaintext rows to migrate")
+    args = parser.parse_args()
+    tmp = tempfile.mkdtemp(prefix="starlens-bench-")
+
+    for label, params in COSTS:
+        db = Database(os.path.join(tmp, f"{label.split()[0]}-{len(os.listdir(tmp))}.db"),
+                      hasher=auth.PasswordHasher(**params))
+        db.create_user("alice", "correct horse")
+        samples = []
+        for _ in range(args.logins):
+            start = time.perf_counter()
+            db.check_login("alice", "correct horse")
+            samples.append(time.perf_counter() - start)
+        token = db.create_session("alice")
+        resume = []
+        for _ in range(args.logins):
+            start = time.perf_counter()
+            db.session_user(token)
+            resume.append(time.perf_counter() - start)
+        work = [lambda: db.check_login("alice", "correct horse")] * 3
+        inline = ui_lateness(work, inline=True)
+        db.close()
+        # sqlite connections are per thread: the worker opens its own, like DbWorker does
+        local = threading.local()
+
+        def worker_login():
+            if not hasattr(local, "db"):
+                local.db = Database(db.path, hasher=auth.PasswordHasher(**params))
+            local.db.check_login("alice", "correct horse")
+
+        threaded = ui_lateness([worker_login] * 3, inline=False)
+        print(f"{label:<24} login {median_ms(samples):6.1f} ms | session resume {median_ms(resume):.3f} ms | "
+              f"UI tick late by {threaded:5.1f} ms on worker, {inline:6.1f} ms inline")
+
+    path = os.path.join(tmp, "migrate.db")
+    Database(path).close()
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO users (username, password) VALUES (?, ?)",
+                     [(f"user{i}", f"password{i}") for i in range(args.users)])
+    conn.commit()
+    conn.close()
+    db = Database(path)
+    start = time.perf_counter()
+    batches = worst = 0
+    while True:
+        t = time.perf_counter()
+        if not db.migrate_passwords():
+            break
+        batches += 1
+        worst = max(worst, time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    print(f"migrated {args.users} plaintext passwords in {elapsed:.1f}s ({batches} batches, "
+          f"longest batch {worst * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Navigation latency of AstronomyApp.show_screen with and without the screen cache.
+
+Drives show_screen programmatically and times each switch up to the point
+where Tk has processed the resulting geometry and redraw work. Needs a
+display (use xvfb-run on a headless machine).
+
+    python benchmarks/bench_navigation.py --rounds 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from StarLens import AstronomyApp  # noqa: E402
+
+ROUTE = ["LearningScreen", "MainMenuScreen", "ProfileScreen", "MainMenuScreen",
+         "ScheduleScreen", "MainMenuScreen", "QuizScreen", "MainMenuScreen"]
+
+
+def measure(cache_size, rounds, db_path):
+    app = AstronomyApp(db_path=db_path, cache_size=cache_size)
+    app.set_user("bench")
+    app.show_screen("MainMenuScreen")
+    app.root.update()
+    samples = []
+    for _ in range(rounds):
+        for name in ROUTE:
+            start = time.perf_counter()
+            app.show_screen(name)
+            app.root.update_idletasks()
+            samples.append(time.perf_counter() - start)
+            app.root.update()  # deliver DB results outside the timed region
+    app.close()
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.99)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="starlens-bench-"), "bench.db")
+    for label, cache_size in (("rebuild", 0), ("cached", 4)):
+        p50, p99 = measure(cache_size, args.rounds, db_path)
+        print(f"{label:>8}: show_screen p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Profile load time against a large quiz_results table.
+
+Seeds a throwaway database with ``--rows`` quiz results (1M by default),
+then times the profile queries used by ProfileScreen next to the old
+full-history scan.
+
+    python benchmarks/bench_profile.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage import SQL_BACKFILL_STATS, Database  # noqa: E402
+
+
+def seed(db, rows, users, heavy_share):
+    cur = db.cur
+    rng = random.Random(42)
+    levels = ["Easy", "Medium", "Hard"]
+    names = [f"user{i}" for i in range(users)]
+    batch = []
+    for i in range(rows):
+        # one "heavy" user owns a large share of the table
+        uname = "heavy" if rng.random() < heavy_share else rng.choice(names)
+        batch.append((uname, rng.randint(0, 10), 10, rng.choice(levels), f"2024-01-01 00:{i % 60:02d}:00"))
+        if len(batch) == 50000:
+            cur.executemany("INSERT INTO quiz_results (username, score, total, level, time) VALUES (?, ?, ?, ?, ?)", batch)
+            batch.clear()
+    if batch:
+        cur.executemany("INSERT INTO quiz_results (username, score, total, level, time) VALUES (?, ?, ?, ?, ?)", batch)
+    cur.execute("DELETE FROM quiz_stats")
+    cur.execute(SQL_BACKFILL_STATS)
+
+
+def legacy_profile(cur, username):
+    cur.execute("SELECT score,total,level,time FROM quiz_results NOT INDEXED WHERE username=?", (username,))
+    data = cur.fetchall()
+    total_quizzes = len(data)
+    avg = round(sum(d[0]/d[1] for d in data)/total_quizzes*100, 1) if total_quizzes else 0
+    best = max((d[0]/d[1])*100 for d in data) if data else 0
+    return total_quizzes, avg, best, data[-10:]
+
+
+def timeit(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--heavy-share", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="starlens-bench-"), "bench.db")
+    db = Database(path)
+
+    start = time.perf_counter()
+    with db.transaction():
+        seed(db, args.rows, args.users, args.heavy_share)
+    print(f"seeded {args.rows:,} rows in {time.perf_counter() - start:.1f}s ({path})")
+
+    def profile_load(uname):
+        db.profile_stats(uname)
+        db.recent_results(uname)
+
+    for uname in ("heavy", "user0"):
+        new = timeit(lambda: profile_load(uname), args.repeat)
+        old = timeit(lambda: legacy_profile(db.cur, uname), max(1, args.repeat // 5))
+        attempts = db.profile_stats(uname).attempts
+        print(f"{uname:>6} ({attempts:,} attempts): profile load {new:.3f} ms, full scan {old:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
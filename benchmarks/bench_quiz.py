@@ -0,0 +1,97 @@
+"""Quiz-start latency against a large question bank.
+
+Loads ``--questions`` synthetic questions (100k by default) through the
+pack loader, gives one user a long answer history, then times
+question_bank.start_quiz next to the scan-based query it replaces
+(``NOT IN`` history + ``ORDER BY RANDOM()``).
+
+    python benchmarks/bench_quiz.py --questions 100000 --history 20000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import question_bank  # noqa: E402
+from storage import Database  # noqa: E402
+
+TAGS = ["planets", "moons", "stars", "galaxies", "missions", "black-holes", "exoplanets", "cosmology",
+        "telescopes", "constellations", "comets", "nebulae"]
+
+SQL_SCAN_PICK = """
+    SELECT id, text, options, answer FROM questions
+    WHERE level=? AND id NOT IN (SELECT question_id FROM question_history WHERE username=?)
+    ORDER BY RANDOM() LIMIT ?
+"""
+
+
+def write_pack(path, count, rng):
+    with open(path, "w", encoding="utf-8") as fh:
+        for i in range(count):
+            options = [f"option {i}-{k}" for k in range(4)]
+            fh.write(json.dumps({"level": question_bank.LEVELS[i % 3], "question": f"Synthetic question #{i}?",
+                                 "options": options, "answer": rng.choice(options),
+                                 "tags": rng.sample(TAGS, rng.randint(1, 3)), "difficulty": rng.random()}) + "\n")
+
+
+def percentiles(samples):
+    samples = sorted(s * 1000 for s in samples)
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=100_000)
+    parser.add_argument("--history", type=int, default=20_000, help="answers already given by the test user")
+    parser.add_argument("--quizzes", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    tmp = tempfile.mkdtemp(prefix="starlens-bench-")
+    pack = os.path.join(tmp, "synthetic.jsonl")
+    write_pack(pack, args.questions, rng)
+    db = Database(os.path.join(tmp, "bench.db"))
+
+    start = time.perf_counter()
+    report = question_bank.load_pack(db, pack)
+    elapsed = time.perf_counter() - start
+    print(f"loaded {report.loaded:,} questions in {elapsed:.1f}s ({report.loaded / elapsed:,.0f}/s)")
+
+    # answer history: weak on two tags so the adaptive part has something to do
+    start = time.perf_counter()
+    for _ in range(args.history // 10):
+        for question in question_bank.pick_questions(db, "student", "Medium", rng=rng):
+            weak = {"black-holes", "cosmology"} & set(question.tags)
+            db.record_answer("student", question, rng.random() < (0.3 if weak else 0.8))
+    db.flush()
+    print(f"answered {args.history:,} questions in {time.perf_counter() - start:.1f}s; "
+          f"weakest tags: {', '.join(db.weak_tags('student'))}")
+
+    samples = []
+    for _ in range(args.quizzes):
+        start = time.perf_counter()
+        questions = question_bank.start_quiz(db, "student", "Medium")
+        samples.append(time.perf_counter() - start)
+        for question in questions:
+            db.record_answer("student", question, True)
+    p50, p99 = percentiles(samples)
+    print(f"start_quiz: p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+
+    samples = []
+    for _ in range(max(1, args.quizzes // 20)):
+        start = time.perf_counter()
+        db._read(SQL_SCAN_PICK, ("Medium", "student", question_bank.QUIZ_LENGTH)).fetchall()
+        samples.append(time.perf_counter() - start)
+    p50, p99 = percentiles(samples)
+    print(f"scan + ORDER BY RANDOM(): p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Rows per second for streaming schedule import/export.
+
+Writes a synthetic night plan for many users as CSV, imports it, exports
+it as CSV and iCalendar, then imports the .ics file into a fresh database.
+
+    python benchmarks/bench_schedule_io.py --rows 200000
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import schedule_io  # noqa: E402
+from storage import Database  # noqa: E402
+
+TARGETS = ["Moon", "Venus", "Mars", "Jupiter", "Saturn", "Orion Nebula", "Andromeda Galaxy",
+           "Pleiades", "Ring Nebula", "Hercules Cluster", "Sirius", "Vega", "Betelgeuse"]
+
+
+def make_csv(path, rows, users):
+    rng = random.Random(7)
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(("username", "time", "object"))
+        for i in range(rows):
+            writer.writerow((f"observer{rng.randrange(users)}",
+                             f"2025-03-{1 + i % 28:02d} {18 + i % 6}:{i % 60:02d}",
+                             rng.choice(TARGETS)))
+
+
+def report(label, count, elapsed):
+    print(f"{label:>12}: {count:,} rows in {elapsed:.2f}s ({count / elapsed:,.0f} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--chunk-size", type=int, default=schedule_io.CHUNK_SIZE)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="starlens-bench-")
+    src = os.path.join(workdir, "plan.csv")
+    make_csv(src, args.rows, args.users)
+
+    db = Database(os.path.join(workdir, "bench.db"))
+    start = time.perf_counter()
+    result = schedule_io.import_schedules(db, src, chunk_size=args.chunk_size)
+    report("import csv", result.imported, time.perf_counter() - start)
+
+    for fmt in ("csv", "ics"):
+        start = time.perf_counter()
+        count = schedule_io.export_schedules(db, os.path.join(workdir, f"export.{fmt}"))
+        report(f"export {fmt}", count, time.perf_counter() - start)
+    db.close()
+
+    db = Database(os.path.join(workdir, "reimport.db"))
+    start = time.perf_counter()
+    result = schedule_io.import_schedules(db, os.path.join(workdir, "export.ics"), chunk_size=args.chunk_size)
+    report("import ics", result.imported, time.perf_counter() - start)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Catalog-wide sky evaluation for a full night at 1-minute resolution.
+
+Times SkyEngine.positions + events for the bundled catalog over a
+24 h grid, then for synthetic catalogs padded with extra fixed stars to
+show how the vectorized path scales.
+
+    python benchmarks/bench_sky.py --lat 51.48 --lon 0.0
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import sky  # noqa: E402
+
+
+def padded_catalog(base, extra, rng):
+    fixed = ~np.isnan(base.ra)
+    # synthetic stars go in front of the solar-system bodies, which must stay last
+    ra = np.concatenate([base.ra[fixed], rng.uniform(0, 360, extra), base.ra[~fixed]])
+    dec = np.concatenate([base.dec[fixed], np.degrees(np.arcsin(rng.uniform(-1, 1, extra))), base.dec[~fixed]])
+    mag = np.concatenate([base.mag[fixed], rng.uniform(3, 9, extra), base.mag[~fixed]])
+    pick = lambda seq, fill: ([x for x, f in zip(seq, fixed) if f] + [fill(i) for i in range(extra)]
+                              + [x for x, f in zip(seq, fixed) if not f])
+    return sky.Catalog(pick(base.names, lambda i: f"S{i}"), pick(base.aliases, lambda i: ""),
+                       pick(base.kinds, lambda i: "star"), ra, dec, mag)
+
+
+def check_parsing():
+    evening = date(2024, 5, 1)
+    utc = datetime(2024, 5, 1, 21, 30, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    cases = {
+        "2024-05-01 21:30": datetime(2024, 5, 1, 21, 30),
+        "Evening (7 PM)": datetime(2024, 5, 1, 19, 0),
+        "01:15": datetime(2024, 5, 2, 1, 15),
+        "2024-05-01 21:30 UTC": utc,     # schedule_io's form of an .ics DTSTART in UTC
+        "2024-05-01T21:30:00Z": utc,
+    }
+    for text, expected in cases.items():
+        got = sky.parse_schedule_time(text, evening)
+        assert got == expected, f"parse_schedule_time({text!r}) = {got}, expected {expected}"
+
+
+def bench(engine, observer, jd, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        alt, _ = engine.positions(observer, jd)
+        engine.events(observer, jd, alt)
+        samples.append(time.perf_counter() - start)
+    return min(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lat", type=float, default=51.48)
+    parser.add_argument("--lon", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    check_parsing()
+
+    observer = sky.Observer(args.lat, args.lon)
+    jd = sky.time_grid(datetime.combine(date.today(), datetime.min.time()).replace(hour=12), 24, 1)
+    base = sky.load_catalog()
+    rng = np.random.default_rng(1)
+
+    for extra in (0, 1000, 5000):
+        engine = sky.SkyEngine(padded_catalog(base, extra, rng) if extra else base)
+        ms = bench(engine, observer, jd, args.repeat)
+        print(f"{len(engine.catalog):>6} objects x {jd.size} minutes: positions + rise/transit/set in {ms:.1f} ms")
+
+    start = time.perf_counter()
+    sky.default_engine().suggest(observer, date.today())
+    print(f"suggest() for tonight: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Sky-map frame preparation for a large star field, without Tk.
+
+Runs SkyMap.prepare over a few hundred 30 fps frames for a synthetic
+field and reports the time per frame and how many canvas items each
+frame actually touches, next to a naive frame that recomputes alt/az
+with sky.altaz and redraws every visible star.
+
+    python benchmarks/bench_skymap.py --stars 100000 --speed 600
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import sky  # noqa: E402
+import skymap  # noqa: E402
+import star_catalog  # noqa: E402
+
+
+def naive_frame(ra, dec, mag, jd, observer, proj, max_mag):
+    bright = mag <= max_mag
+    alt, az = sky.altaz(ra[bright], dec[bright], jd, observer)
+    x, y = skymap.project_altaz(alt, az, proj)
+    return int(np.count_nonzero(alt > 0))   # every visible star gets a coords() call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stars", type=int, default=100_000)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--speed", type=float, default=600, help="simulated seconds per real second")
+    parser.add_argument("--max-mag", type=float, default=99.0, help="cull stars fainter than this")
+    parser.add_argument("--lat", type=float, default=51.48)
+    parser.add_argument("--lon", type=float, default=0.0)
+    args = parser.parse_args()
+
+    engine = sky.default_engine()
+    observer = sky.Observer(args.lat, args.lon)
+    jd0 = sky.julian_date(datetime.now())
+    ra, dec, mag = star_catalog.synthetic_stars(args.stars, seed=1, mag_range=(-1.5, 9.0))
+    ra, dec = ra.astype(np.float64), dec.astype(np.float64)
+
+    start = time.perf_counter()
+    field = skymap.StarField(ra, dec, mag, jd0)
+    print(f"field of {len(field):,} stars precomputed in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    m = skymap.SkyMap(field, engine, observer, ["Jupiter", "Saturn", "M42"], max_mag=args.max_mag)
+    m.resize(1100, 700)
+    step = args.speed / 30 / 86400
+    first = m.prepare(jd0)
+    print(f"first frame: {len(first.stars.place_slots):,} items placed, {first.visible:,} stars visible")
+
+    samples, touched = [], []
+    for i in range(1, args.frames + 1):
+        start = time.perf_counter()
+        frame = m.prepare(jd0 + i * step)
+        samples.append(time.perf_counter() - start)
+        s = frame.stars
+        touched.append(len(s.place_slots) + len(s.hide_slots) + len(s.unhide_slots) + len(s.restyle_slots))
+    ms = np.array(samples) * 1000
+    print(f"incremental: {ms.mean():.2f} ms/frame (p50 {np.percentile(ms, 50):.2f}, p99 {np.percentile(ms, 99):.2f}), "
+          f"{np.mean(touched):,.0f} items touched/frame, pool {m.slots.pool:,} items")
+
+    samples, touched = [], []
+    for i in range(1, args.frames + 1):
+        start = time.perf_counter()
+        touched.append(naive_frame(ra, dec, mag, jd0 + i * step, observer, m.proj, args.max_mag))
+        samples.append(time.perf_counter() - start)
+    ms = np.array(samples) * 1000
+    print(f"naive:       {ms.mean():.2f} ms/frame (p50 {np.percentile(ms, 50):.2f}, p99 {np.percentile(ms, 99):.2f}), "
+          f"{np.mean(touched):,.0f} items touched/frame")
+
+
+if __name__ == "__main__":
+    main()
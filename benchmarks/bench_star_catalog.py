@@ -0,0 +1,64 @@
+"""Build and query latency for the memory-mapped star catalog.
+
+Generates a synthetic catalog (2M stars by default), then times random
+cone searches at several radii and magnitude limits against a brute-force
+scan of the same memory-mapped records.
+
+    python benchmarks/bench_star_catalog.py --stars 5000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import star_catalog  # noqa: E402
+
+
+def brute_force(stars, ra, dec, radius, max_mag):
+    r_ra, r_dec = np.radians(stars["ra"].astype(np.float64)), np.radians(stars["dec"].astype(np.float64))
+    cos_d = (np.sin(np.radians(dec)) * np.sin(r_dec)
+             + np.cos(np.radians(dec)) * np.cos(r_dec) * np.cos(r_ra - np.radians(ra)))
+    return np.count_nonzero((cos_d >= np.cos(np.radians(radius))) & (stars["mag"] <= max_mag))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stars", type=int, default=2_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="starlens-bench-"), "stars.slcat")
+    start = time.perf_counter()
+    star_catalog.build(path, *star_catalog.synthetic_stars(args.stars))
+    print(f"built {args.stars:,} stars in {time.perf_counter() - start:.2f}s "
+          f"({os.path.getsize(path) / 1e6:.1f} MB)")
+
+    start = time.perf_counter()
+    catalog = star_catalog.StarCatalog(path)
+    print(f"open (header only): {(time.perf_counter() - start) * 1e6:.0f} us")
+
+    rng = np.random.default_rng(5)
+    for radius, max_mag in ((1, 99), (5, 10), (5, 99), (20, 8), (60, 6)):
+        centres = zip(rng.uniform(0, 360, args.queries), np.degrees(np.arcsin(rng.uniform(-1, 1, args.queries))))
+        samples, found = [], 0
+        for ra, dec in centres:
+            start = time.perf_counter()
+            found += len(catalog.cone(ra, dec, radius, max_mag))
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+        start = time.perf_counter()
+        brute_force(catalog.stars, ra, dec, radius, max_mag)
+        scan = (time.perf_counter() - start) * 1000
+        print(f"r={radius:>2} deg mag<={max_mag:>2}: p50 {samples[len(samples) // 2] * 1000:.2f} ms, "
+              f"p99 {samples[int(len(samples) * 0.99)] * 1000:.2f} ms, "
+              f"{found / args.queries:,.0f} stars/query (full scan {scan:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
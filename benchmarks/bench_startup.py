@@ -0,0 +1,98 @@
+"""Startup costs that can be measured without a display.
+
+Times ``import StarLens`` in fresh interpreters, then opening the database
+when it is new, when it predates schema versioning, and when it is already
+at the current version, next to running every CREATE ... IF NOT EXISTS on
+each open as the app used to. For the full picture on a desktop, run
+``python StarLens.py --profile-startup``.
+
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import storage  # noqa: E402
+from storage import Database  # noqa: E402
+
+LEGACY_SCHEMA = """
+    CREATE TABLE users (username TEXT PRIMARY KEY, password TEXT NOT NULL);
+    CREATE TABLE quiz_results (username TEXT, score INTEGER, total INTEGER, level TEXT, time TEXT);
+    CREATE TABLE completed_topics (username TEXT, topic_id INTEGER);
+    CREATE TABLE schedules (username TEXT, time TEXT, object TEXT);
+"""
+
+
+def median_ms(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000
+
+
+def import_time(runs):
+    code = "import time; t = time.perf_counter(); import StarLens; print(time.perf_counter() - t)"
+    return median_ms([float(subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True,
+                                           text=True, check=True).stdout) for _ in range(runs)])
+
+
+def open_unversioned(path):
+    # what every open did before user_version: all DDL in one transaction
+    db = Database(path)
+    start = time.perf_counter()
+    with db.transaction():
+        for sql in storage.MIGRATIONS[0]:
+            db.cur.execute(sql)
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=20_000, help="quiz results in the legacy database")
+    args = parser.parse_args()
+    tmp = tempfile.mkdtemp(prefix="starlens-bench-")
+
+    print(f"import StarLens: {import_time(args.runs):.1f} ms (median of {args.runs} interpreters)")
+
+    samples = []
+    for i in range(args.runs):
+        start = time.perf_counter()
+        Database(os.path.join(tmp, f"new{i}.db")).close()
+        samples.append(time.perf_counter() - start)
+    print(f"open new database (create schema):   {median_ms(samples):6.2f} ms")
+
+    samples = []
+    for i in range(args.runs):
+        path = os.path.join(tmp, f"legacy{i}.db")
+        conn = sqlite3.connect(path)
+        conn.executescript(LEGACY_SCHEMA)
+        conn.executemany("INSERT INTO quiz_results VALUES (?, ?, 10, 'Easy', '')",
+                         [(f"user{n % 500}", n % 11) for n in range(args.rows)])
+        conn.executemany("INSERT INTO completed_topics VALUES (?, ?)", [(f"user{n % 500}", n % 4) for n in range(4000)])
+        conn.commit()
+        conn.close()
+        start = time.perf_counter()
+        Database(path).close()
+        samples.append(time.perf_counter() - start)
+    print(f"open unversioned database (migrate): {median_ms(samples):6.2f} ms")
+
+    path = os.path.join(tmp, "new0.db")
+    samples = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        Database(path).close()
+        samples.append(time.perf_counter() - start)
+    print(f"open current database:               {median_ms(samples):6.2f} ms")
+    print(f"  all DDL on every open, as before:  +{median_ms([open_unversioned(path) for _ in range(args.runs)]):5.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
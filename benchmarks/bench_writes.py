@@ -0,0 +1,42 @@
+"""Cost of committing every write versus the write-behind queue.
+
+    python benchmarks/bench_writes.py --writes 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage import Database  # noqa: E402
+
+
+def run(db, writes, flush_each):
+    start = time.perf_counter()
+    for i in range(writes):
+        db.add_quiz_result(f"user{i % 50}", i % 11, 10, "Easy")
+        if flush_each:
+            db.flush()
+    db.flush()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="starlens-bench-")
+    for label, flush_each in (("commit per write", True), ("write-behind", False)):
+        db = Database(os.path.join(workdir, f"{label.replace(' ', '_')}.db"), batch_size=args.batch_size)
+        elapsed = run(db, args.writes, flush_each)
+        db.close()
+        print(f"{label:>16}: {args.writes / elapsed:,.0f} results/s ({elapsed * 1000 / args.writes:.3f} ms each)")
+
+
+if __name__ == "__main__":
+    main()
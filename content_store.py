@@ -0,0 +1,610 @@
+"""Offline learning articles in one compressed archive, read one article at a time.
+
+File layout (``.slpack``)::
+
+    magic "SLPACK\\x01\\0" | u4 header length | JSON header
+    index: (u4 id, u8 offset, u4 length)[count], sorted by id
+    blobs: zlib(JSON article) each, PNG images, search index
+
+The search index is three zlib blobs: the sorted term list (JSON), u4
+postings (term start offsets, then flat ``id, tf`` pairs sorted by id)
+and u4 ``id, length`` pairs for BM25 length normalisation.
+
+The header holds only what the topic list needs (id, title, category,
+summary). Opening an archive reads the header and the fixed-size index;
+article bodies are inflated on first use and kept in a small LRU, and the
+full-text index (term -> postings) is built when the archive is packed
+and loaded on the first search.
+
+Sources are the hand-written topics in ``data/learning`` (``key: value``
+header lines, a blank line, then paragraphs) plus articles generated from
+the bundled sky catalog and the planet facts below. Catalog articles get
+ids ``1000 + row``, so new catalog rows go at the end of the file.
+
+    python content_store.py build
+    python content_store.py search "red giant"
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import csv
+import glob
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PACK_PATH = os.path.join(ROOT, "data", "learning.slpack")
+SOURCE_DIR = os.path.join(ROOT, "data", "learning")
+CATALOG_PATH = os.path.join(ROOT, "data", "sky_catalog.csv")
+MAGIC = b"SLPACK\x01\x00"
+INDEX_ENTRY = struct.Struct("<IQI")
+CACHE_SIZE = 32
+CATALOG_ID_BASE = 1000
+PLANET_ID_BASE = 101
+TITLE_WEIGHT = 3          # a title word counts like three body words
+MAX_EXPANSIONS = 40       # index terms a trailing prefix may expand to
+BM25_K1, BM25_B = 1.2, 0.75
+
+WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("a an and are as at be by for from has have in is it its of on or that the this to "
+                      "was were which with".split())
+
+
+class TopicInfo(NamedTuple):
+    id: int
+    title: str
+    category: str
+    summary: str
+
+
+class Article(NamedTuple):
+    id: int
+    title: str
+    category: str
+    image: Optional[str]
+    paragraphs: List[str]
+    related: List[int]
+
+
+def tokenize(text: str) -> List[str]:
+    return [w for w in WORD.findall(text.lower()) if w not in STOPWORDS]
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+class ContentStore:
+    """Lazy reader for a ``.slpack`` archive.
+
+    ``topics`` is immutable and safe to read anywhere; article, image and
+    search calls touch the file and the caches, so the app makes them only
+    on the DB worker thread.
+    """
+
+    def __init__(self, path: str, cache_size: int = CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+        with open(path, "rb") as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a StarLens learning archive")
+            (length,) = struct.unpack("<I", fh.read(4))
+            self.header = json.loads(fh.read(length))
+            table = fh.read(INDEX_ENTRY.size * self.header["count"])
+        self.topics = [TopicInfo(*t) for t in self.header["topics"]]
+        self._order = {t.id: i for i, t in enumerate(self.topics)}
+        self._data = len(MAGIC) + 4 + length + len(table)
+        self._index = {id_: (offset, size) for id_, offset, size in INDEX_ENTRY.iter_unpack(table)}
+        self._map = None
+        self._cache: "OrderedDict[int, Article]" = OrderedDict()
+        self._terms: Optional[Dict[str, int]] = None
+        self._vocab: List[str] = []
+        self._starts = array("I")
+        self._postings = array("I")
+        self._lengths: Dict[int, int] = {}
+        self._avg_len = 1.0
+
+    def __len__(self):
+        return len(self.topics)
+
+    def _blob(self, offset: int, size: int) -> bytes:
+        if self._map is None:
+            with open(self.path, "rb") as fh:
+                self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        start = self._data + offset
+        return self._map[start:start + size]
+
+    def topic(self, topic_id: int) -> Optional[TopicInfo]:
+        i = self._order.get(topic_id)
+        return None if i is None else self.topics[i]
+
+    def article(self, topic_id: int) -> Article:
+        article = self._cache.get(topic_id)
+        if article is not None:
+            self._cache.move_to_end(topic_id)
+            return article
+        offset, size = self._index[topic_id]
+        article = Article(**json.loads(zlib.decompress(self._blob(offset, size))))
+        self._cache[topic_id] = article
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return article
+
+    def prefetch(self, topic_id: Optional[int]) -> bool:
+        """Decode an article into the cache ahead of time; True if it was not cached yet."""
+        if topic_id is None or topic_id in self._cache or topic_id not in self._index:
+            return False
+        self.article(topic_id)
+        return True
+
+    def next_topic(self, topic_id: int) -> Optional[int]:
+        """The topic a reader most likely opens after ``topic_id``: its first related one, else the next in order."""
+        for related in self.article(topic_id).related:
+            if related in self._order:
+                return related
+        i = self._order[topic_id] + 1
+        return self.topics[i].id if i < len(self.topics) else None
+
+    def image(self, name: Optional[str]) -> Optional[bytes]:
+        where = self.header["images"].get(name) if name else None
+        return self._blob(*where) if where else None
+
+    def _u4(self, where: List[int]) -> array:
+        values = array("I", zlib.decompress(self._blob(*where)))
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def _load_search(self):
+        where = self.header["search"]
+        self._vocab = json.loads(zlib.decompress(self._blob(*where["terms"])))
+        postings = self._u4(where["postings"])
+        self._starts, self._postings = postings[:len(self._vocab) + 1], postings[len(self._vocab) + 1:]
+        lengths = self._u4(where["lengths"])
+        self._lengths = dict(zip(lengths[::2], lengths[1::2]))
+        self._avg_len = sum(self._lengths.values()) / max(1, len(self._lengths))
+        self._terms = {term: i for i, term in enumerate(self._vocab)}
+
+    def _expand(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self._vocab, prefix)
+        found = []
+        for term in self._vocab[start:start + MAX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            found.append(term)
+        return found
+
+    def search(self, query: str, limit: int = 100) -> List[TopicInfo]:
+        """Topics matching every word of ``query`` (the last one as a prefix), best BM25 score first."""
+        words = tokenize(query)
+        if not words:
+            return []
+        if self._terms is None:
+            self._load_search()
+        docs = len(self._lengths)
+        scores: Optional[Dict[int, float]] = None
+        for i, word in enumerate(words):
+            terms = self._expand(word) if i == len(words) - 1 else [word] if word in self._terms else []
+            part: Dict[int, float] = {}
+            for term in terms:
+                t = self._terms[term]
+                postings = self._postings[2 * self._starts[t]:2 * self._starts[t + 1]]
+                df = len(postings) // 2
+                idf = math.log(1 + (docs - df + 0.5) / (df + 0.5))
+                for doc, tf in zip(postings[::2], postings[1::2]):
+                    norm = 1 - BM25_B + BM25_B * self._lengths[doc] / self._avg_len
+                    score = idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+                    # a prefix matching several forms of a word counts once, by its best form
+                    if score > part.get(doc, 0.0):
+                        part[doc] = score
+            scores = part if scores is None else {d: s + part[d] for d, s in scores.items() if d in part}
+            if not scores:
+                return []
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [self.topics[self._order[doc]] for doc, _ in best]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+# -----------------------------
+# Packing
+# -----------------------------
+def search_index(articles: Iterable[dict]) -> Tuple[bytes, bytes, bytes]:
+    """The packed term list, postings and document lengths (see the module docstring)."""
+    postings: Dict[str, Dict[int, int]] = {}
+    lengths = array("I")
+    for a in articles:
+        counts: Dict[str, int] = {}
+        for word in tokenize(a["title"]):
+            counts[word] = counts.get(word, 0) + TITLE_WEIGHT
+        for word in tokenize(" ".join([a["category"], a["summary"]] + a["paragraphs"])):
+            counts[word] = counts.get(word, 0) + 1
+        for word, tf in counts.items():
+            postings.setdefault(word, {})[a["id"]] = tf
+        lengths.extend((a["id"], sum(counts.values())))
+    vocab = sorted(postings)
+    starts, flat = array("I", [0]), array("I")
+    for word in vocab:
+        docs = postings[word]
+        for doc in sorted(docs):
+            flat.extend((doc, docs[doc]))
+        starts.append(len(flat) // 2)
+    if sys.byteorder == "big":
+        for values in (starts, flat, lengths):
+            values.byteswap()
+    return json.dumps(vocab).encode(), starts.tobytes() + flat.tobytes(), lengths.tobytes()
+
+
+def build(path: str, articles: List[dict], images: Dict[str, bytes]) -> int:
+    """Write an archive; ``articles`` are dicts with the Article fields plus ``summary``."""
+    articles = sorted(articles, key=lambda a: a["id"])
+    blobs, table, image_table = [], [], {}
+    offset = 0
+    for a in articles:
+        record = {field: a[field] for field in Article._fields}
+        blob = zlib.compress(json.dumps(record, ensure_ascii=False).encode(), 9)
+        table.append(INDEX_ENTRY.pack(a["id"], offset, len(blob)))
+        blobs.append(blob)
+        offset += len(blob)
+    for name, data in sorted(images.items()):
+        image_table[name] = [offset, len(data)]
+        blobs.append(data)
+        offset += len(data)
+    search = {}
+    for name, data in zip(("terms", "postings", "lengths"), search_index(articles)):
+        data = zlib.compress(data, 6)
+        search[name] = [offset, len(data)]
+        blobs.append(data)
+        offset += len(data)
+
+    header = {"version": 1, "count": len(articles), "images": image_table, "search": search,
+              "topics": [[a["id"], a["title"], a["category"], a["summary"]] for a in articles]}
+    blob = json.dumps(header, ensure_ascii=False).encode()
+    # the app may open the archive while it is being rebuilt: write aside, then swap
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(MAGIC + struct.pack("<I", len(blob)) + blob)
+        fh.write(b"".join(table))
+        for data in blobs:
+            fh.write(data)
+    os.replace(tmp, path)
+    return len(articles)
+
+
+def read_topic(path: str) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        head, _, body = fh.read().partition("\n\n")
+    fields = dict(line.split(":", 1) for line in head.splitlines() if ":" in line)
+    fields = {k.strip(): v.strip() for k, v in fields.items()}
+    try:
+        return {"id": int(fields["id"]), "title": fields["title"], "category": fields.get("category", "General"),
+                "summary": fields.get("summary", ""), "image": fields.get("image") or None,
+                "related": [t.strip() for t in fields.get("related", "").split(",") if t.strip()],
+                "paragraphs": [" ".join(p.split()) for p in body.split("\n\n") if p.strip()]}
+    except (KeyError, ValueError) as exc:
+        raise ValueError(f"{path}: bad topic header ({exc})") from None
+
+
+# -----------------------------
+# Generated articles
+# -----------------------------
+CONSTELLATION_NAMES = {
+    "And": "Andromeda", "Aql": "Aquila", "Ari": "Aries", "Aur": "Auriga", "Boo": "Boötes", "CMa": "Canis Major",
+    "CMi": "Canis Minor", "Car": "Carina", "Cas": "Cassiopeia", "Cen": "Centaurus", "Cep": "Cepheus",
+    "Cet": "Cetus", "Cru": "Crux", "Cyg": "Cygnus", "Dra": "Draco", "Eri": "Eridanus", "Gem": "Gemini",
+    "Gru": "Grus", "Hya": "Hydra", "Leo": "Leo", "Lib": "Libra", "Lyr": "Lyra", "Oph": "Ophiuchus",
+    "Ori": "Orion", "Pav": "Pavo", "Peg": "Pegasus", "Per": "Perseus", "PsA": "Piscis Austrinus",
+    "Sco": "Scorpius", "Ser": "Serpens", "Sgr": "Sagittarius", "Tau": "Taurus", "TrA": "Triangulum Australe",
+    "UMa": "Ursa Major", "UMi": "Ursa Minor", "Vir": "Virgo",
+}
+MONTHS = ("January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+          "November", "December")
+DEEP_SKY = {
+    "galaxy": ("Galaxies", "galaxy",
+               "A galaxy is a separate island of stars, gas and dust far beyond the Milky Way. Its light has "
+               "travelled for millions of years to reach us, so we see it as it was long before humans existed."),
+    "nebula": ("Nebulae", "nebula",
+               "A nebula is a cloud of gas and dust. Some glow because hot young stars inside them ionise the gas; "
+               "others are the expanding shells thrown off by dying stars."),
+    "cluster": ("Star Clusters", "cluster",
+                "A star cluster is a family of stars born from the same cloud. Open clusters hold a few hundred "
+                "young stars loosely bound together; globular clusters are dense balls of hundreds of thousands of "
+                "very old stars orbiting the centre of the galaxy."),
+}
+# Messier objects whose catalog name does not say what they are
+MESSIER_TYPES = {"M32": "galaxy", "M78": "nebula", "M87": "galaxy"}
+PLANETS = [
+    # name, diameter km, distance AU, orbital period, day length, moons, note
+    ("Mercury", 4879, 0.39, "88 days", "59 Earth days", 0,
+     "The smallest planet and the closest to the Sun, Mercury has almost no atmosphere, so its surface swings "
+     "from 430 °C by day to −180 °C at night. It never strays far from the Sun in our sky and is best caught "
+     "low in twilight."),
+    ("Venus", 12104, 0.72, "225 days", "243 Earth days, spinning backwards", 0,
+     "Wrapped in thick clouds of sulphuric acid over a carbon-dioxide atmosphere, Venus is the hottest planet, "
+     "at about 465 °C. It is the brilliant 'morning star' or 'evening star', and shows phases like the Moon "
+     "through a small telescope."),
+    ("Earth", 12742, 1.00, "365.25 days", "24 hours", 1,
+     "The only world known to host life, Earth has liquid water oceans covering 71% of its surface and an "
+     "atmosphere of nitrogen and oxygen. Its large Moon steadies the tilt of its axis, which gives us our seasons."),
+    ("Mars", 6779, 1.52, "687 days", "24 hours 37 minutes", 2,
+     "The red planet owes its colour to iron oxide dust. Mars has the largest volcano in the solar system, "
+     "Olympus Mons, and a canyon, Valles Marineris, as long as the United States. Dry riverbeds show that water "
+     "once flowed on its surface."),
+    ("Jupiter", 139820, 5.20, "11.9 years", "9 hours 56 minutes", 95,
+     "The largest planet, Jupiter is more than twice as massive as all the others combined. Its Great Red Spot "
+     "is a storm larger than the Earth, and its four big moons — Io, Europa, Ganymede and Callisto — are "
+     "visible in binoculars as points of light lined up beside the planet."),
+    ("Saturn", 116460, 9.58, "29.5 years", "10 hours 33 minutes", 146,
+     "Saturn's rings are made of countless pieces of ice and rock, from grains of dust to boulders, yet they are "
+     "mostly less than a kilometre thick. Even a small telescope shows them. Its moon Titan has a thick "
+     "atmosphere and lakes of liquid methane."),
+    ("Uranus", 50724, 19.2, "84 years", "17 hours 14 minutes", 28,
+     "Uranus rolls around the Sun on its side, its axis tilted by 98 degrees, so each pole gets 42 years of "
+     "daylight followed by 42 years of night. It was the first planet discovered with a telescope, by William "
+     "Herschel in 1781."),
+    ("Neptune", 49244, 30.1, "165 years", "16 hours 6 minutes", 16,
+     "Neptune was found in 1846 where mathematicians predicted it from wobbles in the orbit of Uranus. It has "
+     "the fastest winds in the solar system, over 2,000 km/h, and its largest moon Triton orbits backwards, "
+     "probably a captured dwarf planet."),
+]
+
+
+def _separation(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    ra1, dec1, ra2, dec2 = map(math.radians, (a[0] * 15, a[1], b[0] * 15, b[1]))
+    cos_d = math.sin(dec1) * math.sin(dec2) + math.cos(dec1) * math.cos(dec2) * math.cos(ra1 - ra2)
+    return math.degrees(math.acos(max(-1.0, min(1.0, cos_d))))
+
+
+def _brightness(mag: float) -> str:
+    if mag < 1:
+        return "one of the brightest objects in the night sky"
+    if mag < 2.5:
+        return "easy to see with the naked eye, even from a city"
+    if mag < 4:
+        return "visible to the naked eye from a suburban sky"
+    if mag < 6:
+        return "a naked-eye object only from a dark site"
+    return "beyond the naked eye: it needs binoculars or a small telescope"
+
+
+def catalog_articles(path: str = CATALOG_PATH) -> List[dict]:
+    from sky import parse_sexagesimal   # only the build needs it; opening the store must not pull in numpy
+
+    with open(path, encoding="utf-8") as fh:
+        rows = list(csv.DictReader(line for line in fh if not line.startswith("#")))
+    coords = [(parse_sexagesimal(r["ra"]), parse_sexagesimal(r["dec"])) for r in rows]
+    star_mags = sorted(float(r["mag"]) for r in rows if r["kind"] == "star")
+    articles = []
+    for i, row in enumerate(rows):
+        name, alias, mag = row["name"], row["alias"], float(row["mag"])
+        ra, dec = coords[i]
+        if row["kind"] == "star":
+            constellation = CONSTELLATION_NAMES.get(alias.split()[-1], alias.split()[-1])
+            category, image = "Stars", "star"
+            intro = (f"{name}, catalogued as {alias}, is a star in the constellation {constellation}. "
+                     f"At magnitude {mag:.2f} it is {_brightness(mag)}, and it ranks number "
+                     f"{star_mags.index(mag) + 1} of the {len(star_mags)} stars in the StarLens catalogue.")
+            kind_text = []
+        else:
+            kind = MESSIER_TYPES.get(name) or MESSIER_TYPES.get(alias) or next(
+                (k for k in DEEP_SKY if k in name.lower()), "cluster")
+            category, image, kind_text = DEEP_SKY[kind]
+            intro = (f"{name} ({alias}) is a {image} in Charles Messier's 18th-century catalogue of fuzzy objects "
+                     f"that comet hunters should not mistake for comets. With a total magnitude of {mag:.1f} it is "
+                     f"{_brightness(mag)}.")
+            also = (f"It is also listed as {alias} in the New General Catalogue." if alias.startswith("NGC")
+                    else f"Observers usually call it simply {alias}.")
+            kind_text = [kind_text, also]
+        # transits around 9 pm local time when the Sun is ~9 h of RA behind it
+        month = MONTHS[round(2.7 + (ra - 9) / 2) % 12]
+        position = (f"It lies at right ascension {int(ra)}h {int(ra % 1 * 60):02d}m and declination "
+                    f"{'+' if dec >= 0 else '−'}{abs(int(dec))}° {int(abs(dec) % 1 * 60):02d}′, and is highest in "
+                    f"the evening sky around {month}.")
+        if dec >= 0:
+            reach = f"It can be seen from anywhere north of latitude {90 - dec:.0f}° S"
+            polar = f"; north of latitude {90 - dec:.0f}° N it never sets." if dec > 0 else "."
+        else:
+            reach = f"It can be seen from anywhere south of latitude {90 + dec:.0f}° N"
+            polar = f"; south of latitude {90 + dec:.0f}° S it never sets."
+        near = sorted((_separation(coords[i], coords[j]), j) for j in range(len(rows)) if j != i)[:3]
+        nearby = "Nearby in the sky: " + ", ".join(f"{rows[j]['name']} ({sep:.0f}°)" for sep, j in near) + "."
+        articles.append({"id": CATALOG_ID_BASE + i, "title": name, "category": category, "image": image,
+                         "summary": f"{alias}, magnitude {mag:.1f}" if row["kind"] == "star" else f"{alias}, {image}",
+                         "paragraphs": [intro] + kind_text + [position, reach + polar, nearby],
+                         "related": [CATALOG_ID_BASE + j for _, j in near]})
+    return articles
+
+
+def planet_articles() -> List[dict]:
+    articles = []
+    for i, (name, diameter, distance, year, day, moons, note) in enumerate(PLANETS):
+        neighbours = [PLANET_ID_BASE + j for j in (i + 1, i - 1) if 0 <= j < len(PLANETS)]
+        facts = (f"{name} is planet number {i + 1} from the Sun, orbiting at an average distance of {distance} "
+                 f"AU ({distance * 149.6:.0f} million km). It is {diameter:,} km across — "
+                 f"{diameter / 12742:.2f} times the Earth — takes {year} to go round the Sun, and a day there "
+                 f"lasts {day}.")
+        moon_text = {0: f"{name} has no moons.", 1: f"{name} has one moon."}.get(moons, f"{name} has {moons} known moons.")
+        articles.append({"id": PLANET_ID_BASE + i, "title": name, "category": "Solar System", "image": "planet",
+                         "summary": f"Planet {i + 1}: {note.split('.')[0]}.",
+                         "paragraphs": [note, facts, moon_text], "related": neighbours})
+    return articles
+
+
+# -----------------------------
+# Images
+# -----------------------------
+def png(width: int, height: int, pixels: bytearray) -> bytes:
+    """Encode 8-bit RGB rows as PNG, which Tk 8.6 PhotoImage reads natively."""
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+    stride = width * 3
+    raw = b"".join(b"\0" + bytes(pixels[y * stride:(y + 1) * stride]) for y in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 9)) + chunk(b"IEND", b""))
+
+
+# deterministic scatter for the cluster picture, denser towards the middle
+CLUSTER_STARS = [(math.sin(k * 12.9898) * 0.8 * (k % 7 + 3) / 9, math.sin(k * 78.233) * 0.8 * (k % 5 + 4) / 8)
+                 for k in range(40)]
+
+
+def _shade(kind: str, x: float, y: float) -> Tuple[float, float, float]:
+    """Colour of an illustration at (x, y) in [-1, 1]^2."""
+    r2 = x * x + y * y
+    if kind == "planet":
+        if r2 > 0.64:
+            return 0.0, 0.0, 0.0
+        band = 0.75 + 0.25 * math.sin(y * 18)
+        light = max(0.15, 1 - ((x + 0.35) ** 2 + (y + 0.35) ** 2) * 0.6)
+        return 0.85 * band * light, 0.62 * band * light, 0.38 * band * light
+    if kind == "moon":
+        if r2 > 0.64:
+            return 0.0, 0.0, 0.0
+        crater = sum(0.25 for cx, cy, cr in ((-0.2, -0.3, 0.15), (0.3, 0.1, 0.2), (-0.1, 0.4, 0.1))
+                     if (x - cx) ** 2 + (y - cy) ** 2 < cr * cr)
+        g = 0.8 - crater - 0.3 * max(0.0, x)
+        return g, g, g * 0.95
+    if kind == "galaxy":
+        angle = math.atan2(y, x * 0.5)
+        rr = math.sqrt((x * 0.5) ** 2 + y * y * 4) + 1e-6
+        arms = 0.5 + 0.5 * math.cos(2 * angle - 6 * math.log(rr))
+        g = math.exp(-rr * 6) + 0.5 * arms * math.exp(-rr * 3)
+        return min(1.0, g * 1.1), min(1.0, g), min(1.0, g * 1.3)
+    if kind == "nebula":
+        g1 = math.exp(-((x + 0.3) ** 2 + (y - 0.1) ** 2) * 5)
+        g2 = math.exp(-((x - 0.35) ** 2 + (y + 0.2) ** 2) * 7)
+        return min(1.0, g1 * 0.9 + g2 * 0.2), min(1.0, g2 * 0.6), min(1.0, g1 * 0.5 + g2 * 0.9)
+    if kind == "cluster":
+        g = 0.0
+        for sx, sy in CLUSTER_STARS:
+            d2 = (x - sx) ** 2 + (y - sy) ** 2
+            if d2 < 0.004:
+                g += math.exp(-d2 * 2500)
+        return min(1.0, g * 0.8), min(1.0, g * 0.9), min(1.0, g)
+    # star: glow with diffraction spikes
+    g = math.exp(-r2 * 30) + 0.3 * math.exp(-abs(x) * 40 - y * y * 3) + 0.3 * math.exp(-abs(y) * 40 - x * x * 3)
+    return min(1.0, g), min(1.0, g * 0.95), min(1.0, g * 0.8)
+
+
+def render_image(kind: str, width: int = 200, height: int = 140) -> bytes:
+    pixels = bytearray(width * height * 3)
+    scale = 2 / height
+    i = 0
+    for py in range(height):
+        y = py * scale - 1
+        for px in range(width):
+            for c in _shade(kind, (px - width / 2) * scale, y):
+                pixels[i] = int(255 * c)
+                i += 1
+    return png(width, height, pixels)
+
+
+# -----------------------------
+# Bundled archive
+# -----------------------------
+def default_sources(source_dir: str = SOURCE_DIR, catalog_path: str = CATALOG_PATH) -> List[str]:
+    return sorted(glob.glob(os.path.join(source_dir, "*.txt"))) + [catalog_path, os.path.abspath(__file__)]
+
+
+def build_default(path: str = PACK_PATH, source_dir: str = SOURCE_DIR, catalog_path: str = CATALOG_PATH) -> int:
+    articles = [read_topic(p) for p in sorted(glob.glob(os.path.join(source_dir, "*.txt")))]
+    articles += planet_articles() + catalog_articles(catalog_path)
+    ids = {}
+    for a in articles:
+        if a["id"] in ids:
+            raise ValueError(f"duplicate article id {a['id']}: {a['title']} and {ids[a['id']]}")
+        ids[a["id"]] = a["title"]
+    by_title = {a["title"]: a["id"] for a in articles}
+    for a in articles:
+        unknown = [r for r in a["related"] if isinstance(r, str) and r not in by_title]
+        if unknown:
+            raise ValueError(f"{a['title']}: unknown related topics {', '.join(unknown)}")
+        a["related"] = [by_title[r] if isinstance(r, str) else r for r in a["related"]]
+    images = {kind: render_image(kind) for kind in {a["image"] for a in articles if a["image"]}}
+    return build(path, articles, images)
+
+
+def user_cache_dir() -> str:
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(r"~\AppData\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "StarLens")
+
+
+def is_current(path: str) -> bool:
+    try:
+        built = os.path.getmtime(path)
+    except OSError:
+        return False
+    return all(os.path.getmtime(p) <= built for p in default_sources())
+
+
+def open_store(path: str = PACK_PATH) -> ContentStore:
+    """Open the bundled archive, packing it first if it is missing or older than its sources.
+
+    Packaging runs ``content_store.py build`` so installs ship a current
+    archive. Where ``data/`` is read-only and the archive is stale anyway,
+    it is packed into the user cache directory instead.
+    """
+    if path != PACK_PATH or is_current(path):
+        return ContentStore(path)
+    if not os.access(os.path.dirname(path), os.W_OK):
+        path = os.path.join(user_cache_dir(), os.path.basename(PACK_PATH))
+        if is_current(path):
+            return ContentStore(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    build_default(path)
+    return ContentStore(path)
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack and query the StarLens learning archive.")
+    parser.add_argument("--pack", default=PACK_PATH, help="archive file (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="pack data/learning and the sky catalog into the archive")
+    search = sub.add_parser("search", help="full-text search")
+    search.add_argument("query")
+    show = sub.add_parser("show", help="print one article")
+    show.add_argument("id", type=int)
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "build":
+            count = build_default(args.pack)
+            print(f"packed {count} articles into {args.pack} ({os.path.getsize(args.pack) / 1024:.0f} KB)")
+            return
+        store = open_store(args.pack)
+        if args.command == "search":
+            for topic in store.search(args.query, limit=20):
+                print(f"{topic.id:>6}  {topic.title:<28} {topic.category}")
+        elif store.topic(args.id) is None:
+            parser.exit(1, f"error: no article with id {args.id} in {store.path}\n")
+        else:
+            article = store.article(args.id)
+            print(article.title, f"[{article.category}]", "", *article.paragraphs, sep="\n")
+        store.close()
+    except (OSError, ValueError) as exc:
+        parser.exit(1, f"error: {exc}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""Hot-path spans: where a slow screen spends its time.
+
+``TRACER`` keeps the most recent spans (name, category, thread, start,
+duration) in a ring buffer. Sources of spans:
+
+* functions decorated with ``TRACER.traced``, such as show_screen and
+  screen builds;
+* blocks wrapped in ``TRACER.span``;
+* the DB worker's jobs;
+* every statement run on ``Database.cur``, while ``trace_cursor`` has
+  swapped in a timing proxy.
+
+``dump`` writes the buffer as Chrome trace JSON (open it in
+chrome://tracing or ui.perfetto.dev). ``Overlay`` shows the busiest spans
+of the last few seconds over the app window.
+
+While the tracer is disabled, a traced function costs one attribute check
+and ``span`` returns a shared no-op context. The cursor proxy is only
+installed while tracing, so SQL runs on the bare sqlite3 cursor.
+"""
+from __future__ import annotations
+
+import functools
+import json
+import os
+import re
+import threading
+import time
+import tkinter as tk
+from collections import defaultdict, deque
+from contextlib import nullcontext
+from typing import Dict, List, NamedTuple, Optional
+
+_NULL = nullcontext()
+BUCKET_S = 0.25     # time slice of the running per-span totals behind stats(seconds)
+
+
+class SpanStats(NamedTuple):
+    category: str
+    name: str
+    count: int
+    total_ms: float
+    max_ms: float
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.add(self.name, self.category, self.start, time.perf_counter(), self.args)
+
+
+class Tracer:
+    def __init__(self, capacity: int = 50_000, history_s: float = 60.0):
+        self.enabled = False
+        self.origin = time.perf_counter()
+        # deque appends are atomic, so the DB thread and the Tk thread share it without a lock
+        self.spans = deque(maxlen=capacity)
+        # (slice, {(category, name): [count, total, max]}) per BUCKET_S of span end times, newest
+        # last: the overlay merges a few of these instead of scanning the whole buffer
+        self._buckets = deque(maxlen=int(history_s / BUCKET_S) + 1)
+        self._slot = -1
+        self._totals: Dict[tuple, list] = {}
+
+    def add(self, name: str, category: str, start: float, end: float, args: Optional[dict] = None):
+        duration = end - start
+        self.spans.append((name, category, start, duration, threading.current_thread().name, args))
+        # no lock (it would add ~0.4 µs to every span): the GIL makes each step atomic, and the rare
+        # race between the Tk and DB threads costs at most a miscounted span in the overlay
+        slot = int(end / BUCKET_S)
+        if slot > self._slot:
+            self._slot = slot
+            self._totals = {}
+            self._buckets.append((slot, self._totals))
+        totals = self._totals
+        agg = totals.get((category, name))
+        if agg is None:
+            totals[category, name] = [1, duration, duration]
+        else:
+            agg[0] += 1
+            agg[1] += duration
+            if duration > agg[2]:
+                agg[2] = duration
+
+    def span(self, name: str, category: str = "app", **args):
+        if not self.enabled:
+            return _NULL
+        return _Span(self, name, category, args or None)
+
+    def traced(self, category: str = "app", name: Optional[str] = None):
+        """Decorator: record a span for each call while the tracer is enabled."""
+        def wrap(fn):
+            label = name or fn.__qualname__
+
+            @functools.wraps(fn)
+            def call(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.add(label, category, start, time.perf_counter())
+            return call
+        return wrap
+
+    def clear(self):
+        self.spans.clear()
+        self._buckets.clear()
+        self._slot = -1
+
+    def stats(self, seconds: Optional[float] = None) -> List[SpanStats]:
+        """Spans grouped by name, busiest first.
+
+        ``seconds`` limits them to those that ended in about that many recent
+        seconds (rounded out to BUCKET_S, at most ``history_s``) and reads the
+        running totals; without it the whole buffer is scanned.
+        """
+        if seconds is None:
+            groups: Dict[tuple, list] = defaultdict(list)
+            for name, category, _, duration, _, _ in self.spans.copy():
+                groups[category, name].append(duration)
+            totals = {key: [len(d), sum(d), max(d)] for key, d in groups.items()}
+        else:
+            first = int((time.perf_counter() - seconds) / BUCKET_S)
+            totals = {}
+            # copies, since the other thread may add a bucket or a key meanwhile
+            for slot, bucket in reversed(self._buckets.copy()):
+                if slot < first:
+                    break
+                for key, (count, total, longest) in bucket.copy().items():
+                    agg = totals.get(key)
+                    if agg is None:
+                        totals[key] = [count, total, longest]
+                    else:
+                        agg[0] += count
+                        agg[1] += total
+                        agg[2] = max(agg[2], longest)
+        stats = [SpanStats(category, name, count, total * 1000, longest * 1000)
+                 for (category, name), (count, total, longest) in totals.items()]
+        return sorted(stats, key=lambda s: -s.total_ms)
+
+    def dump(self, path: str) -> int:
+        """Write the buffer as a Chrome trace; returns the number of spans written."""
+        spans = self.spans.copy()
+        pid = os.getpid()
+        tids: Dict[str, int] = {}
+        events = []
+        for name, category, start, duration, thread, args in spans:
+            tid = tids.setdefault(thread, len(tids) + 1)
+            event = {"name": name, "cat": category, "ph": "X", "pid": pid, "tid": tid,
+                     "ts": round((start - self.origin) * 1e6, 1), "dur": round(duration * 1e6, 1)}
+            if args:
+                event["args"] = args
+            events.append(event)
+        events += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}}
+                   for thread, tid in tids.items()]
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fh)
+        os.replace(tmp, path)
+        return len(spans)
+
+
+TRACER = Tracer()
+
+
+# -----------------------------
+# SQL
+# -----------------------------
+_SPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=512)
+def _statement(sql: str) -> str:
+    # the SQL_* constants are few, so cache their one-line form
+    sql = _SPACE.sub(" ", sql).strip()
+    return sql if len(sql) <= 80 else sql[:77] + "..."
+
+
+class TracedCursor:
+    """Times execute calls on a sqlite3 cursor; everything else is passed through.
+
+    A span covers the execute call only, which for a SELECT is the first
+    step. Rows fetched afterwards are not included.
+    """
+
+    def __init__(self, cursor, tracer: Tracer = TRACER):
+        self.cursor = cursor
+        self.tracer = tracer
+
+    def _timed(self, method, sql, *args):
+        start = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            self.tracer.add(_statement(sql), "sql", start, time.perf_counter())
+
+    def execute(self, sql, params=()):
+        return self._timed(self.cursor.execute, sql, params)
+
+    def executemany(self, sql, rows):
+        return self._timed(self.cursor.executemany, sql, rows)
+
+    def executescript(self, script):
+        return self._timed(self.cursor.executescript, script)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+
+def trace_cursor(db, on: bool = True, tracer: Tracer = TRACER):
+    """Swap ``db.cur`` for a TracedCursor, or back. Call it on the thread that owns ``db``."""
+    traced = isinstance(db.cur, TracedCursor)
+    if on and not traced:
+        db.cur = TracedCursor(db.cur, tracer)
+    elif traced and not on:
+        db.cur = db.cur.cursor
+
+
+# -----------------------------
+# Overlay
+# -----------------------------
+class Overlay:
+    """Live table of the busiest spans in the last ``window_s`` seconds, drawn over the app."""
+
+    def __init__(self, root, tracer: Tracer = TRACER, window_s: float = 5.0, refresh_ms: int = 500, rows: int = 14):
+        self.root = root
+        self.tracer = tracer
+        self.window_s = window_s
+        self.refresh_ms = refresh_ms
+        self.rows = rows
+        self.note = ""
+        self.label = None
+        self._after_id = None
+
+    @property
+    def visible(self) -> bool:
+        return self.label is not None
+
+    def show(self):
+        if self.label is None:
+            self.label = tk.Label(self.root, font=("Courier", 9), justify="left", anchor="nw",
+                                  bg="#000000", fg="#7CFC00", padx=8, pady=6)
+            self.label.place(relx=1.0, x=-8, y=8, anchor="ne")
+            self.update()
+
+    def hide(self):
+        if self.label is not None:
+            self.root.after_cancel(self._after_id)
+            self.label.destroy()
+            self.label = None
+
+    def update(self):
+        stats = self.tracer.stats(self.window_s)
+        lines = [f"last {self.window_s:.0f}s{'' if self.tracer.enabled else ' (tracing off)'}    count   total ms     max ms"]
+        for s in stats[:self.rows]:
+            name = f"{s.category}: {s.name}"
+            lines.append(f"{name[:40]:<40}{s.count:>7}{s.total_ms:>11.1f}{s.max_ms:>11.2f}")
+        if not stats:
+            lines.append("no spans yet")
+        if self.note:
+            lines.append(self.note)
+        self.label.config(text="\n".join(lines))
+        self.label.lift()
+        self._after_id = self.root.after(self.refresh_ms, self.update)
@@ -0,0 +1,216 @@
+"""Quiz question bank: question packs and adaptive, non-repeating selection.
+
+Questions live in SQLite (see ``storage``) and are numbered densely per
+level, so "the k-th question of a level" is a primary-key lookup. Each
+user walks their own pseudo-random permutation of a level,
+``ord = (step * k + shift) % size``, stored as a four-integer cursor:
+a pick is O(log n) and never scans the bank. Part of every quiz comes
+from the user's weakest tags (worst answer rate), drawn at random from
+the same dense numbering kept per tag.
+
+Packs are JSON Lines, one question per line::
+
+    {"level": "Easy", "question": "...", "options": ["A", "B", "C", "D"],
+     "answer": "B", "tags": ["planets"], "difficulty": 0.2}
+
+    python question_bank.py load packs/solar_system.jsonl
+    python question_bank.py stats
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import math
+import os
+import random
+import sys
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from batching import ErrorLog, chunked
+from storage import DB_PATH, Database, Question, QuizCursor
+
+PACK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "questions")
+LEVELS = ("Easy", "Medium", "Hard")
+QUIZ_LENGTH = 10
+WEAK_SHARE = 0.3         # fraction of a quiz drawn from the user's weakest tags
+MAX_SKIPS = 16           # already-answered questions skipped per pick before we accept a repeat
+CHUNK_SIZE = 5000
+
+
+class LoadReport(NamedTuple):
+    loaded: int
+    skipped: int         # duplicates and invalid lines
+    errors: List[str]    # the first batching.MAX_ERRORS problems
+    invalid: int         # lines rejected by validate(), including those not in errors
+
+
+# -----------------------------
+# Packs
+# -----------------------------
+def read_pack(path: str) -> Iterator[Tuple[int, dict]]:
+    with open(path, encoding="utf-8-sig") as fh:
+        for number, line in enumerate(fh, 1):
+            line = line.strip()
+            if line and not line.startswith("#"):
+                try:
+                    yield number, json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield number, {"_error": f"invalid JSON ({exc.msg})"}
+
+
+def validate(records: Iterable[Tuple[int, dict]], errors: ErrorLog, source: Optional[str] = None):
+    for line, item in records:
+        options = item.get("options")
+        tags = item.get("tags") or []
+        difficulty = item.get("difficulty", 0.5)
+        problem = item.get("_error")
+        if problem is None:
+            if item.get("level") not in LEVELS:
+                problem = f"level must be one of {', '.join(LEVELS)}"
+            elif not str(item.get("question") or "").strip():
+                problem = "missing question"
+            elif not isinstance(options, list) or len(options) < 2:
+                problem = "needs at least two options"
+            elif item.get("answer") not in options:
+                problem = "answer is not one of the options"
+            elif not isinstance(tags, list) or any("," in str(t) for t in tags):
+                problem = "tags must be a list of names without commas"
+            elif isinstance(difficulty, bool) or not isinstance(difficulty, (int, float)) or not 0 <= difficulty <= 1:
+                problem = "difficulty must be a number from 0 to 1"
+        if problem:
+            errors.add(f"line {line}: {problem}")
+            continue
+        yield (item["level"], item["question"].strip(), [str(o) for o in options], str(item["answer"]),
+               [str(t).strip().lower() for t in tags if str(t).strip()], float(difficulty), source)
+
+
+def pack_source(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def load_pack(db: Database, path: str, chunk_size: int = CHUNK_SIZE) -> LoadReport:
+    errors = ErrorLog()
+    source = pack_source(path)
+    loaded = seen = 0
+    for chunk in chunked(validate(read_pack(path), errors, source), chunk_size):
+        seen += len(chunk)
+        loaded += db.add_questions(chunk)
+    return LoadReport(loaded, seen - loaded + errors.count, errors.messages, errors.count)
+
+
+def ensure_builtin(db: Database):
+    """Load the bundled packs that are not in the bank yet.
+
+    Packs are recognised by name (the ``source`` of their questions), so a
+    release adds questions to existing databases by shipping a new pack file.
+    """
+    for path in sorted(glob.glob(os.path.join(PACK_DIR, "*.jsonl"))):
+        if not db.has_source(pack_source(path)):
+            load_pack(db, path)
+
+
+# -----------------------------
+# Selection
+# -----------------------------
+def new_cursor(size: int, rng: random.Random) -> QuizCursor:
+    # any step coprime with size makes k -> (step * k + shift) % size a permutation of 0..size-1
+    step = 1
+    if size > 2:
+        step = rng.randrange(1, size)
+        while math.gcd(step, size) != 1:
+            step = rng.randrange(1, size)
+    return QuizCursor(size, step, rng.randrange(size) if size else 0, 0)
+
+
+def _from_cursor(db: Database, username: str, level: str, cursor: QuizCursor, rng: random.Random,
+                 taken: dict) -> Tuple[Question, QuizCursor]:
+    for _ in range(MAX_SKIPS):
+        if cursor.position >= cursor.size:
+            cursor = new_cursor(cursor.size, rng)     # went through the whole level: new order
+        ord_ = (cursor.step * cursor.position + cursor.shift) % cursor.size
+        cursor = cursor._replace(position=cursor.position + 1)
+        question = db.question_at(level, ord_)
+        if question.id not in taken and not db.has_answered(username, question.id):
+            break
+    return question, cursor
+
+
+def _from_tag(db: Database, username: str, level: str, tag: str, rng: random.Random,
+              taken: dict) -> Optional[Question]:
+    count = db.tag_question_count(tag, level)
+    for _ in range(min(count, MAX_SKIPS // 2)):
+        question = db.tag_question_at(tag, level, rng.randrange(count))
+        if question.id not in taken and not db.has_answered(username, question.id):
+            return question
+    return None
+
+
+def pick_questions(db: Database, username: str, level: str, count: int = QUIZ_LENGTH,
+                   weak_share: float = WEAK_SHARE, rng: Optional[random.Random] = None) -> List[Question]:
+    rng = rng or random.Random()
+    size = db.question_count(level)
+    if not size:
+        return []
+    count = min(count, size)
+    taken: dict = {}
+
+    weak = db.weak_tags(username)
+    for i in range(round(count * weak_share) if weak else 0):
+        question = _from_tag(db, username, level, weak[i % len(weak)], rng, taken)
+        if question:
+            taken[question.id] = question
+
+    cursor = db.quiz_cursor(username, level)
+    if cursor is None or cursor.size != size:
+        cursor = new_cursor(size, rng)   # first quiz, or the bank grew; history still prevents repeats
+    while len(taken) < count:
+        question, cursor = _from_cursor(db, username, level, cursor, rng, taken)
+        taken.setdefault(question.id, question)
+    db.set_quiz_cursor(username, level, cursor)
+
+    questions = list(taken.values())
+    rng.shuffle(questions)
+    return questions
+
+
+def start_quiz(db: Database, username: str, level: str) -> List[Question]:
+    ensure_builtin(db)
+    return pick_questions(db, username, level)
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the StarLens quiz question bank.")
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    load = sub.add_parser("load", help="add the questions of one or more .jsonl packs")
+    load.add_argument("paths", nargs="+")
+    load.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    sub.add_parser("stats", help="questions per level")
+
+    args = parser.parse_args(argv)
+    db = Database(args.db)
+    try:
+        if args.command == "load":
+            ensure_builtin(db)
+            for path in args.paths:
+                report = load_pack(db, path, args.chunk_size)
+                print(f"{path}: loaded {report.loaded} questions, skipped {report.skipped}")
+                for error in report.errors:
+                    print(f"  {error}", file=sys.stderr)
+                if report.invalid > len(report.errors):
+                    print(f"  ... and {report.invalid - len(report.errors)} more", file=sys.stderr)
+        else:
+            for level in LEVELS:
+                print(f"{level:<7} {db.question_count(level):>8,}")
+    except OSError as exc:
+        parser.exit(1, f"error: {exc}\n")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Bulk import/export of observation schedules as CSV or iCalendar (.ics).
+
+Files are read and written as streams: parsing, validation and chunking
+are chained generators and rows go into ``schedules`` with one
+``executemany`` transaction per chunk, so memory use does not grow with
+the size of the night plan.
+
+    python schedule_io.py import plans.csv --user alice
+    python schedule_io.py export night.ics [--user alice]
+
+CSV files need ``time`` and ``object`` columns and may carry a
+``username`` column. iCalendar events use SUMMARY as the object and
+DTSTART (or our own X-STARLENS-TIME) as the time.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from batching import ErrorLog, chunked
+from storage import DB_PATH, Database
+
+CHUNK_SIZE = 5000
+MAX_FIELD_LEN = 200
+
+Record = Tuple[int, Optional[str], str, str]   # (line, username, time, object)
+
+
+class ImportReport(NamedTuple):
+    imported: int
+    skipped: int
+    errors: List[str]
+
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".ics", ".ical", ".ifb"):
+        return "ics"
+    if ext == ".csv":
+        return "csv"
+    raise ValueError(f"Unsupported file type: {path} (expected .csv or .ics)")
+
+
+# -----------------------------
+# Readers
+# -----------------------------
+def read_csv(path: str) -> Iterator[Record]:
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        reader = csv.DictReader(fh)
+        try:
+            fields = {f.strip().lower() for f in reader.fieldnames or ()}
+            if not {"time", "object"} <= fields:
+                raise ValueError("CSV needs a header with 'time' and 'object' columns")
+            for row in reader:
+                row = {(k or "").strip().lower(): v for k, v in row.items()}
+                yield reader.line_num, row.get("username"), row.get("time") or "", row.get("object") or ""
+        except csv.Error as exc:
+            # e.g. a stray quote in a quoted field; chunks before it are already imported
+            raise ValueError(f"line {reader.reader.line_num}: {exc}") from exc
+
+
+def unfold_lines(fh) -> Iterator[Tuple[int, str]]:
+    # RFC 5545 3.1: a line starting with a space or tab continues the previous one
+    current, start = None, 0
+    for number, line in enumerate(fh, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield start, current
+        current, start = line, number
+    if current is not None:
+        yield start, current
+
+
+def unescape_text(value: str) -> str:
+    out, chars = [], iter(value)
+    for ch in chars:
+        if ch == "\\":
+            nxt = next(chars, "")
+            out.append("\n" if nxt in "nN" else nxt)
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def format_dtstart(value: str) -> str:
+    utc = value.endswith("Z")
+    value = value.rstrip("Z")
+    for fmt, out in (("%Y%m%dT%H%M%S", "%Y-%m-%d %H:%M"), ("%Y%m%d", "%Y-%m-%d")):
+        try:
+            text = datetime.strptime(value, fmt).strftime(out)
+        except ValueError:
+            continue
+        return text + " UTC" if utc else text
+    return value
+
+
+def read_ics(path: str) -> Iterator[Record]:
+    with open(path, encoding="utf-8-sig") as fh:
+        event = None
+        for number, line in unfold_lines(fh):
+            name, _, value = line.partition(":")
+            name = name.split(";", 1)[0].upper()
+            if name == "BEGIN" and value.upper() == "VEVENT":
+                event = {"line": number}
+            elif name == "END" and value.upper() == "VEVENT" and event is not None:
+                when = event.get("X-STARLENS-TIME") or format_dtstart(event.get("DTSTART", ""))
+                yield event["line"], event.get("X-STARLENS-USER"), when, event.get("SUMMARY", "")
+                event = None
+            elif event is not None and name in ("SUMMARY", "DTSTART", "X-STARLENS-TIME", "X-STARLENS-USER"):
+                event[name] = unescape_text(value) if name != "DTSTART" else value
+
+
+READERS = {"csv": read_csv, "ics": read_ics}
+
+
+# -----------------------------
+# Pipeline
+# -----------------------------
+def validate(records: Iterable[Record], default_user: Optional[str], errors: ErrorLog,
+             force_user: bool = False) -> Iterator[Tuple[str, str, str]]:
+    for line, username, when, obj in records:
+        username = default_user if force_user or not (username or "").strip() else username.strip()
+        when, obj = when.strip(), obj.strip()
+        problem = None
+        if not username:
+            problem = "no username (pass --user)"
+        elif not when or not obj:
+            problem = "missing time or object"
+        elif max(len(username), len(when), len(obj)) > MAX_FIELD_LEN:
+            problem = f"field longer than {MAX_FIELD_LEN} characters"
+        if problem:
+            errors.add(f"line {line}: {problem}")
+            continue
+        yield username, when, obj
+
+
+def import_schedules(db: Database, path: str, default_user: Optional[str] = None, force_user: bool = False,
+                     fmt: Optional[str] = None, chunk_size: int = CHUNK_SIZE) -> ImportReport:
+    errors = ErrorLog()
+    records = READERS[fmt or detect_format(path)](path)
+    imported = 0
+    for chunk in chunked(validate(records, default_user, errors, force_user), chunk_size):
+        imported += db.add_schedules(chunk)
+    return ImportReport(imported, errors.count, errors.messages)
+
+
+# -----------------------------
+# Writers
+# -----------------------------
+def write_csv(rows: Iterable[Tuple[int, str, str, str]], fh) -> int:
+    writer = csv.writer(fh)
+    writer.writerow(("username", "time", "object"))
+    count = 0
+    for _, username, when, obj in rows:
+        writer.writerow((username, when, obj))
+        count += 1
+    return count
+
+
+def escape_text(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold_line(line: str) -> str:
+    # RFC 5545 3.1: lines longer than 75 octets are split with CRLF + space
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts, limit = [], 75
+    while data:
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:   # don't split a UTF-8 sequence
+            cut -= 1
+        parts.append(data[:cut].decode("utf-8"))
+        data, limit = data[cut:], 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def parse_clock(when: str) -> Optional[str]:
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M"):
+        try:
+            return datetime.strptime(when, fmt).strftime("%Y%m%dT%H%M%S")
+        except ValueError:
+            pass
+    return None
+
+
+def write_ics(rows: Iterable[Tuple[int, str, str, str]], fh) -> int:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    fh.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//StarLens//Observation Schedule//EN\r\n")
+    count = 0
+    for rowid, username, when, obj in rows:
+        lines = ["BEGIN:VEVENT", f"UID:schedule-{rowid}@starlens", f"DTSTAMP:{stamp}"]
+        dtstart = parse_clock(when)
+        if dtstart:
+            lines.append(f"DTSTART:{dtstart}")
+        lines += [f"SUMMARY:{escape_text(obj)}",
+                  f"X-STARLENS-TIME:{escape_text(when)}",
+                  f"X-STARLENS-USER:{escape_text(username)}",
+                  "END:VEVENT"]
+        fh.write("".join(fold_line(line) for line in lines))
+        count += 1
+    fh.write("END:VCALENDAR\r\n")
+    return count
+
+
+def export_schedules(db: Database, path: str, username: Optional[str] = None, fmt: Optional[str] = None) -> int:
+    fmt = fmt or detect_format(path)
+    rows = db.iter_schedules(username)
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        return write_ics(rows, fh) if fmt == "ics" else write_csv(rows, fh)
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import or export StarLens observation schedules.")
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="load schedules from a .csv or .ics file")
+    imp.add_argument("path")
+    imp.add_argument("--user", help="username for rows without one")
+    imp.add_argument("--force-user", action="store_true", help="assign every row to --user")
+    imp.add_argument("--format", choices=sorted(READERS))
+    imp.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    exp = sub.add_parser("export", help="write schedules to a .csv or .ics file")
+    exp.add_argument("path")
+    exp.add_argument("--user", help="only export this user's schedule")
+    exp.add_argument("--format", choices=sorted(READERS))
+
+    args = parser.parse_args(argv)
+    if args.command == "import" and args.force_user and not args.user:
+        parser.error("--force-user needs --user")
+
+    db = Database(args.db)
+    try:
+        if args.command == "import":
+            report = import_schedules(db, args.path, args.user, args.force_user, args.format, args.chunk_size)
+            print(f"imported {report.imported} rows, skipped {report.skipped}")
+            for error in report.errors:
+                print(f"  {error}", file=sys.stderr)
+            if report.skipped > len(report.errors):
+                print(f"  ... and {report.skipped - len(report.errors)} more", file=sys.stderr)
+        else:
+            count = export_schedules(db, args.path, args.user, args.format)
+            print(f"exported {count} rows to {args.path}")
+    except (OSError, ValueError, csv.Error) as exc:
+        parser.exit(1, f"error: {exc}\n")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
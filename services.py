@@ -0,0 +1,93 @@
+"""Screen actions without Tk.
+
+The screens in StarLens.py collect input, pass one of these functions to
+``run_io`` and draw what comes back; nothing here touches a widget, so
+``benchmarks/bench_load.py`` can drive the app's own code paths without a
+display. Functions that take ``db`` run on the DB worker thread.
+"""
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+import auth
+from storage import Database, ProfileStats, Question, QuizResult
+
+QUIZ_LEVELS = ((6, 12, "Easy"), (13, 20, "Medium"))
+
+
+# -----------------------------
+# Accounts
+# -----------------------------
+def login(db: Database, username: str, password: str, remember: bool = False,
+          session_file: Optional[str] = None) -> bool:
+    # password derivation is slow on purpose; never call this on the Tk thread
+    if not db.check_login(username, password):
+        return False
+    if remember and session_file:
+        auth.write_session(session_file, username, db.create_session(username))
+    return True
+
+
+def resume_session(db: Database, session_file: str) -> Optional[str]:
+    """The user of a still-valid remembered login, or None."""
+    saved = auth.read_session(session_file)
+    if saved is None:
+        return None
+    username, token = saved
+    return username if db.session_user(token) == username else None
+
+
+def forget_session(db: Database, session_file: str):
+    saved = auth.read_session(session_file)
+    if saved:
+        db.delete_session(saved[1])
+    auth.clear_session(session_file)
+
+
+def profile(db: Database, username: str) -> Tuple[ProfileStats, List[QuizResult]]:
+    return db.profile_stats(username), db.recent_results(username)
+
+
+# -----------------------------
+# Quiz
+# -----------------------------
+def quiz_level(age: int) -> str:
+    for low, high, level in QUIZ_LEVELS:
+        if low <= age <= high:
+            return level
+    return "Hard"
+
+
+def start_quiz(db: Database, username: str, level: str) -> List[Question]:
+    import question_bank    # first quiz only; keeps the bank off the startup path
+    return question_bank.start_quiz(db, username, level)
+
+
+class QuizSession:
+    """A quiz in progress. Lives on the Tk thread; the writes it implies go through ``db`` jobs."""
+
+    def __init__(self, username: str, level: str, questions: List[Question]):
+        self.username = username
+        self.level = level
+        self.questions = questions
+        self.position = 0
+        self.score = 0
+
+    @property
+    def current(self) -> Optional[Question]:
+        return self.questions[self.position] if self.position < len(self.questions) else None
+
+    @property
+    def done(self) -> bool:
+        return self.position >= len(self.questions)
+
+    def answer(self, choice: str) -> Tuple[Question, bool]:
+        question = self.questions[self.position]
+        correct = choice == question.answer
+        self.score += correct
+        self.position += 1
+        return question, correct
+
+
+def save_quiz(db: Database, quiz: QuizSession):
+    db.add_quiz_result(quiz.username, quiz.score, len(quiz.questions), quiz.level)
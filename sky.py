@@ -0,0 +1,401 @@
+"""Local sky computations for the observation planner (no network needed).
+
+Everything is evaluated with NumPy over whole catalogs and time grids at
+once: positions come out as ``(objects, times)`` arrays and rise, transit
+and set times are found from sign changes along the time axis.
+
+Accuracy is a few arcminutes for stars and planets (J2000 catalog plus
+linear precession, JPL mean orbital elements) and a few tenths of a
+degree for the Moon, which is plenty for deciding what is up tonight.
+"""
+from __future__ import annotations
+
+import csv
+import os
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sky_catalog.csv")
+
+J2000 = 2451545.0
+OBLIQUITY = np.radians(23.43928)
+
+# altitude of the object's centre at rise/set: refraction, plus the disc for Sun and Moon
+H0_STAR = -0.5667
+H0_SUN = -0.8333
+H0_MOON = 0.125
+DARK_SUN_ALT = -12.0   # nautical twilight is dark enough for most targets
+
+# JPL "Keplerian elements for approximate positions of the major planets", 1800-2050 AD:
+# a [AU], e, I [deg], L [deg], long. perihelion [deg], long. asc. node [deg]; value and rate per century
+PLANET_ELEMENTS = {
+    "Mercury": ((0.38709927, 0.20563593, 7.00497902, 252.25032350, 77.45779628, 48.33076593),
+                (0.00000037, 0.00001906, -0.00594749, 149472.67411175, 0.16047689, -0.12534081)),
+    "Venus": ((0.72333566, 0.00677672, 3.39467605, 181.97909950, 131.60246718, 76.67984255),
+              (0.00000390, -0.00004107, -0.00078890, 58517.81538729, 0.00268329, -0.27769418)),
+    "Earth": ((1.00000261, 0.01671123, -0.00001531, 100.46457166, 102.93768193, 0.0),
+              (0.00000562, -0.00004392, -0.01294668, 35999.37244981, 0.32327364, 0.0)),
+    "Mars": ((1.52371034, 0.09339410, 1.84969142, -4.55343205, -23.94362959, 49.55953891),
+             (0.00001847, 0.00007882, -0.00813131, 19140.30268499, 0.44441088, -0.29257343)),
+    "Jupiter": ((5.20288700, 0.04838624, 1.30439695, 34.39644051, 14.72847983, 100.47390909),
+                (-0.00011607, -0.00013253, -0.00183714, 3034.74612775, 0.21252668, 0.20469106)),
+    "Saturn": ((9.53667594, 0.05386179, 2.48599187, 49.95424423, 92.59887831, 113.66242448),
+               (-0.00125060, -0.00050991, 0.00193609, 1222.49362201, -0.41897216, -0.28867794)),
+    "Uranus": ((19.18916464, 0.04725744, 0.77263783, 313.23810451, 170.95427630, 74.01692503),
+               (-0.00196176, -0.00004397, -0.00242939, 428.48202785, 0.40805281, 0.04240589)),
+    "Neptune": ((30.06992276, 0.00859048, 1.77004347, -55.12002969, 44.96476227, 131.78422574),
+                (0.00026291, 0.00005105, 0.00035372, 218.45945325, -0.32241464, -0.00508664)),
+}
+PLANETS = [p for p in PLANET_ELEMENTS if p != "Earth"]
+# typical apparent magnitudes; good enough to rank targets
+PLANET_MAGS = {"Mercury": 0.0, "Venus": -4.2, "Mars": 0.5, "Jupiter": -2.3,
+               "Saturn": 0.6, "Uranus": 5.7, "Neptune": 7.8}
+
+
+class Observer(NamedTuple):
+    latitude: float    # degrees, north positive
+    longitude: float   # degrees, east positive
+
+
+class Catalog(NamedTuple):
+    names: List[str]
+    aliases: List[str]
+    kinds: List[str]
+    ra: np.ndarray     # J2000 degrees; NaN for bodies computed per time step
+    dec: np.ndarray
+    mag: np.ndarray
+
+    def __len__(self):
+        return len(self.names)
+
+
+class Events(NamedTuple):
+    # Julian dates per object, NaN when the event does not happen inside the grid
+    rise: np.ndarray
+    transit: np.ndarray
+    set: np.ndarray
+    max_alt: np.ndarray
+
+
+class Suggestion(NamedTuple):
+    name: str
+    kind: str
+    mag: float
+    when: datetime     # local time of best altitude
+    altitude: float
+    azimuth: float
+
+
+class Visibility(NamedTuple):
+    name: str
+    when: datetime
+    altitude: float
+    azimuth: float
+    sun_altitude: float
+
+    @property
+    def up(self):
+        return self.altitude > 0
+
+    @property
+    def dark(self):
+        return self.sun_altitude < DARK_SUN_ALT
+
+
+# -----------------------------
+# Catalog
+# -----------------------------
+def parse_sexagesimal(text: str) -> float:
+    sign = -1.0 if text.strip().startswith("-") else 1.0
+    parts = [abs(float(p)) for p in text.strip().lstrip("+-").split(":")]
+    return sign * (parts[0] + parts[1] / 60 + (parts[2] if len(parts) > 2 else 0) / 3600)
+
+
+def load_catalog(path: str = CATALOG_PATH) -> Catalog:
+    names, aliases, kinds, ra, dec, mag = [], [], [], [], [], []
+    with open(path, newline="", encoding="utf-8") as fh:
+        for row in csv.DictReader(line for line in fh if not line.startswith("#")):
+            names.append(row["name"])
+            aliases.append(row["alias"])
+            kinds.append(row["kind"])
+            ra.append(parse_sexagesimal(row["ra"]) * 15)
+            dec.append(parse_sexagesimal(row["dec"]))
+            mag.append(float(row["mag"]))
+    # solar-system bodies go last; their coordinates change with time
+    for body, kind, m in [(p, "planet", PLANET_MAGS[p]) for p in PLANETS] + [("Moon", "moon", -12.7), ("Sun", "sun", -26.7)]:
+        names.append(body)
+        aliases.append("")
+        kinds.append(kind)
+        ra.append(np.nan)
+        dec.append(np.nan)
+        mag.append(m)
+    return Catalog(names, aliases, kinds, np.array(ra), np.array(dec), np.array(mag))
+
+
+# -----------------------------
+# Time
+# -----------------------------
+def julian_date(when: datetime) -> float:
+    if when.tzinfo is None:
+        when = when.astimezone()    # naive datetimes are local time
+    utc = when.astimezone(timezone.utc)
+    return (utc - datetime(2000, 1, 1, 12, tzinfo=timezone.utc)).total_seconds() / 86400 + J2000
+
+
+def from_julian_date(jd: float) -> datetime:
+    return (datetime(2000, 1, 1, 12, tzinfo=timezone.utc) + timedelta(days=float(jd) - J2000)).astimezone()
+
+
+def time_grid(start: datetime, hours: float = 24, step_minutes: float = 1) -> np.ndarray:
+    steps = int(round(hours * 60 / step_minutes)) + 1
+    return julian_date(start) + np.arange(steps) * (step_minutes / 1440)
+
+
+def gmst_degrees(jd: np.ndarray) -> np.ndarray:
+    return (280.46061837 + 360.98564736629 * (jd - J2000)) % 360
+
+
+# -----------------------------
+# Positions
+# -----------------------------
+def precess(ra: np.ndarray, dec: np.ndarray, jd: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """J2000 -> mean equator of date with the linear (annual rate) approximation."""
+    years = (jd - J2000) / 365.25
+    ra_r, dec_r = np.radians(ra), np.radians(dec)
+    d_ra = (3.07496 + 1.33621 * np.sin(ra_r) * np.tan(dec_r)) * years * 15 / 3600
+    d_dec = 20.0431 * np.cos(ra_r) * years / 3600
+    return ra + d_ra, dec + d_dec
+
+
+def _ecliptic_to_radec(x, y, z):
+    ye = np.cos(OBLIQUITY) * y - np.sin(OBLIQUITY) * z
+    ze = np.sin(OBLIQUITY) * y + np.cos(OBLIQUITY) * z
+    return np.degrees(np.arctan2(ye, x)) % 360, np.degrees(np.arctan2(ze, np.hypot(x, ye)))
+
+
+def heliocentric(jd: np.ndarray) -> np.ndarray:
+    """Heliocentric ecliptic xyz (AU), shape (3, planets incl. Earth, times)."""
+    names = list(PLANET_ELEMENTS)
+    base = np.array([PLANET_ELEMENTS[n][0] for n in names])[:, :, None]
+    rate = np.array([PLANET_ELEMENTS[n][1] for n in names])[:, :, None]
+    el = base + rate * ((jd - J2000) / 36525)[None, None, :]
+    a, e = el[:, 0], el[:, 1]
+    inc, mean_lon, peri, node = (np.radians(el[:, i]) for i in range(2, 6))
+    mean_anom = np.remainder(mean_lon - peri + np.pi, 2 * np.pi) - np.pi
+    ecc_anom = mean_anom + e * np.sin(mean_anom)
+    for _ in range(6):   # Newton steps for Kepler's equation
+        ecc_anom -= (ecc_anom - e * np.sin(ecc_anom) - mean_anom) / (1 - e * np.cos(ecc_anom))
+    xp = a * (np.cos(ecc_anom) - e)
+    yp = a * np.sqrt(1 - e * e) * np.sin(ecc_anom)
+    w = peri - node
+    cw, sw, cn, sn, ci, si = np.cos(w), np.sin(w), np.cos(node), np.sin(node), np.cos(inc), np.sin(inc)
+    x = (cw * cn - sw * sn * ci) * xp + (-sw * cn - cw * sn * ci) * yp
+    y = (cw * sn + sw * cn * ci) * xp + (-sw * sn + cw * cn * ci) * yp
+    z = (sw * si) * xp + (cw * si) * yp
+    return np.stack([x, y, z])
+
+
+def planets_radec(jd: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Geocentric J2000 RA/Dec for PLANETS followed by the Sun, shape (len(PLANETS) + 1, times)."""
+    xyz = heliocentric(jd)
+    earth = list(PLANET_ELEMENTS).index("Earth")
+    geo = np.delete(xyz, earth, axis=1) - xyz[:, earth:earth + 1]
+    geo = np.concatenate([geo, -xyz[:, earth:earth + 1]], axis=1)   # the Sun
+    return _ecliptic_to_radec(*geo)
+
+
+def moon_radec(jd: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Low-precision lunar position (main periodic terms), equinox of date."""
+    d = jd - J2000
+    L = np.radians(218.316 + 13.176396 * d)
+    M = np.radians(134.963 + 13.064993 * d)
+    F = np.radians(93.272 + 13.229350 * d)
+    D = np.radians(297.850 + 12.190749 * d)
+    Ms = np.radians(357.529 + 0.98560028 * d)
+    lon = L + np.radians(6.289 * np.sin(M) + 1.274 * np.sin(2 * D - M) + 0.658 * np.sin(2 * D)
+                         + 0.214 * np.sin(2 * M) - 0.186 * np.sin(Ms) - 0.114 * np.sin(2 * F))
+    lat = np.radians(5.128 * np.sin(F) + 0.281 * np.sin(M + F) + 0.278 * np.sin(M - F)
+                     + 0.173 * np.sin(2 * D - F))
+    x, y, z = np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)
+    return _ecliptic_to_radec(x, y, z)
+
+
+def radec_grid(catalog: Catalog, jd: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Apparent-ish RA/Dec of every catalog object at every time, shape (objects, times)."""
+    fixed = ~np.isnan(catalog.ra)
+    ra = np.empty((len(catalog), jd.size))
+    dec = np.empty_like(ra)
+    ra[fixed], dec[fixed] = precess(catalog.ra[fixed, None], catalog.dec[fixed, None], jd[None, :])
+    p_ra, p_dec = precess(*planets_radec(jd), jd[None, :])
+    m_ra, m_dec = moon_radec(jd)
+    index = {name: i for i, name in enumerate(catalog.names)}
+    for row, body in enumerate(PLANETS + ["Sun"]):
+        ra[index[body]], dec[index[body]] = p_ra[row], p_dec[row]
+    ra[index["Moon"]], dec[index["Moon"]] = m_ra, m_dec
+    return ra, dec
+
+
+def altaz(ra: np.ndarray, dec: np.ndarray, jd: np.ndarray, observer: Observer) -> Tuple[np.ndarray, np.ndarray]:
+    """Altitude and azimuth (degrees, azimuth from north through east); broadcasts over any shape."""
+    lat = np.radians(observer.latitude)
+    ha = np.radians(gmst_degrees(jd) + observer.longitude - ra)
+    dec = np.radians(dec)
+    sin_alt = np.sin(lat) * np.sin(dec) + np.cos(lat) * np.cos(dec) * np.cos(ha)
+    alt = np.degrees(np.arcsin(np.clip(sin_alt, -1, 1)))
+    az = np.degrees(np.arctan2(-np.cos(dec) * np.sin(ha),
+                               np.sin(dec) * np.cos(lat) - np.cos(dec) * np.sin(lat) * np.cos(ha))) % 360
+    return alt, az
+
+
+# -----------------------------
+# Engine
+# -----------------------------
+class SkyEngine:
+    def __init__(self, catalog: Optional[Catalog] = None):
+        self.catalog = catalog or load_catalog()
+        self.index = {}
+        for i, (name, alias) in enumerate(zip(self.catalog.names, self.catalog.aliases)):
+            self.index[name.lower()] = i
+            if alias:
+                self.index[alias.lower()] = i
+        self.sun = self.index["sun"]
+        self.moon = self.index["moon"]
+        self.h0 = np.full(len(self.catalog), H0_STAR)
+        self.h0[self.sun] = H0_SUN
+        self.h0[self.moon] = H0_MOON
+        # longest names first so overlapping matches go to the more specific name
+        self._match_order = sorted(self.index, key=len, reverse=True)
+
+    def positions(self, observer: Observer, jd: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        alt, az = altaz(*radec_grid(self.catalog, jd), jd[None, :], observer)
+        # the Moon is close enough for parallax to matter (~1 degree at the horizon)
+        alt[self.moon] -= 0.95 * np.cos(np.radians(alt[self.moon]))
+        return alt, az
+
+    def events(self, observer: Observer, jd: np.ndarray, alt: Optional[np.ndarray] = None) -> Events:
+        if alt is None:
+            alt, _ = self.positions(observer, jd)
+        h = alt - self.h0[:, None]
+        above = h > 0
+        rise = self._first_crossing(jd, h, ~above[:, :-1] & above[:, 1:])
+        set_ = self._first_crossing(jd, h, above[:, :-1] & ~above[:, 1:])
+        peak = np.argmax(alt, axis=1)
+        rows = np.arange(len(alt))
+        # a maximum at the edge of the grid is not a meridian transit
+        inner = (peak > 0) & (peak < jd.size - 1)
+        transit = np.where(inner, jd[peak], np.nan)
+        return Events(rise, transit, set_, alt[rows, peak])
+
+    @staticmethod
+    def _first_crossing(jd, h, mask):
+        has = mask.any(axis=1)
+        i = np.argmax(mask, axis=1)
+        rows = np.arange(len(h))
+        h0, h1 = h[rows, i], h[rows, i + 1]
+        frac = h0 / np.where(h0 == h1, 1, h0 - h1)    # linear interpolation to h == 0
+        return np.where(has, jd[i] + frac * (jd[1] - jd[0]), np.nan)
+
+    def night(self, observer: Observer, evening: date, step_minutes: float = 1):
+        """Time grid (JD) covering the dark part of the night starting on ``evening``."""
+        jd = time_grid(datetime.combine(evening, time(12)), 24, step_minutes)
+        sun_ra, sun_dec = planets_radec(jd)
+        sun_alt, _ = altaz(sun_ra[-1], sun_dec[-1], jd, observer)
+        return jd[sun_alt < DARK_SUN_ALT]
+
+    def suggest(self, observer: Observer, evening: date, limit: int = 8, min_alt: float = 25,
+                max_mag: float = 6.5) -> List[Suggestion]:
+        jd = self.night(observer, evening)
+        if jd.size == 0:
+            return []   # midsummer at high latitude: it never gets dark
+        alt, az = self.positions(observer, jd)
+        best = np.argmax(alt, axis=1)
+        rows = np.arange(len(alt))
+        peak = alt[rows, best]
+        mag = self.catalog.mag
+        kinds = np.array(self.catalog.kinds)
+        ok = (peak >= min_alt) & (mag <= max_mag) & (kinds != "sun")
+        # favour high and bright targets, and give deep-sky objects and planets a nudge over stars
+        score = peak / 90 - 0.12 * mag + np.where(kinds == "star", 0, 0.5)
+        picks = [i for i in np.argsort(-score) if ok[i]][:limit]
+        out = [Suggestion(self.catalog.names[i], self.catalog.kinds[i], float(mag[i]),
+                          from_julian_date(jd[best[i]]), float(peak[i]), float(az[i, best[i]]))
+               for i in picks]
+        return sorted(out, key=lambda s: s.when)
+
+    def find(self, text: str) -> List[int]:
+        """Catalog objects named in free text, e.g. "Jupiter and Saturn" or "M42 (Orion)"."""
+        text = text.lower()
+        found, taken = [], []
+        for key in self._match_order:
+            for m in re.finditer(r"(?<![\w])" + re.escape(key) + r"(?![\w])", text):
+                if any(a < m.end() and m.start() < b for a, b in taken):
+                    continue
+                taken.append(m.span())
+                if self.index[key] not in found:
+                    found.append(self.index[key])
+        return found
+
+    def check(self, observer: Observer, text: str, when: datetime) -> List[Visibility]:
+        objects = self.find(text)
+        if not objects:
+            return []
+        jd = np.array([julian_date(when)])
+        alt, az = self.positions(observer, jd)
+        return [Visibility(self.catalog.names[i], when, float(alt[i, 0]), float(az[i, 0]), float(alt[self.sun, 0]))
+                for i in objects]
+
+
+@lru_cache(maxsize=1)
+def default_engine() -> SkyEngine:
+    return SkyEngine()
+
+
+# -----------------------------
+# Schedule time strings
+# -----------------------------
+_CLOCK = re.compile(r"(\d{1,2})(?:[:.](\d{2}))?\s*([ap])\.?\s*m\b", re.I)
+_24H = re.compile(r"\b(\d{1,2}):(\d{2})\b")
+_UTC = re.compile(r"(?:(?<=\d)Z|\s*(?:UTC|GMT))$", re.I)    # as written by schedule_io for DTSTART...Z
+
+
+def parse_schedule_time(text: str, evening: Optional[date] = None) -> Optional[datetime]:
+    """Turn a schedule time like "Evening (7 PM)", "21:30" or "2025-03-01 21:30" into a local datetime.
+
+    Clock times without a date belong to the night starting on ``evening``
+    (today by default): anything before noon is taken as the next morning.
+    Times ending in "UTC" or "Z" are converted to local time.
+    """
+    text = text.strip()
+    utc = _UTC.search(text)
+    if utc:
+        text = text[:utc.start()]
+    when = _parse_naive(text, evening)
+    if when is not None and utc:
+        when = when.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    return when
+
+
+def _parse_naive(text: str, evening: Optional[date]) -> Optional[datetime]:
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    m = _CLOCK.search(text)
+    if m:
+        hour = int(m.group(1)) % 12 + (12 if m.group(3).lower() == "p" else 0)
+        minute = int(m.group(2) or 0)
+    else:
+        m = _24H.search(text)
+        if not m:
+            return None
+        hour, minute = int(m.group(1)), int(m.group(2))
+    if hour > 23 or minute > 59:
+        return None
+    evening = evening or date.today()
+    day = evening + timedelta(days=1) if hour < 12 else evening
+    return datetime.combine(day, time(hour, minute))
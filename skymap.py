@@ -0,0 +1,305 @@
+"""Frame preparation for the animated sky map (no Tk in here).
+
+``SkyMap.prepare(jd)`` turns a moment in time into the smallest set of
+canvas changes: which stars rise into or drop out of view and which ones
+moved at least ``move_threshold`` pixels since they were last drawn.
+Stars keep their canvas item between frames and items released by stars
+that set are handed to stars that rise, so nothing is deleted and
+recreated; stars that did not move are not touched, so Tk only repaints
+the regions around the items that did.
+
+The projection is stereographic from the zenith with the horizon as a
+circle. All trigonometry on RA/Dec happens once at load time; a frame is
+a few multiply-adds per star.
+"""
+from __future__ import annotations
+
+import os
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+import sky
+
+STAR_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "stars.slcat")
+
+# stick figures between stars of the bundled catalog (data/sky_catalog.csv)
+CONSTELLATIONS = {
+    "Orion": [("Betelgeuse", "Bellatrix"), ("Bellatrix", "Mintaka"), ("Mintaka", "Alnilam"),
+              ("Alnilam", "Alnitak"), ("Alnitak", "Betelgeuse"), ("Alnitak", "Saiph"), ("Mintaka", "Rigel")],
+    "Ursa Major": [("Dubhe", "Merak"), ("Merak", "Phecda"), ("Phecda", "Megrez"), ("Megrez", "Dubhe"),
+                   ("Megrez", "Alioth"), ("Alioth", "Mizar"), ("Mizar", "Alkaid")],
+    "Cassiopeia": [("Caph", "Schedar"), ("Schedar", "Navi"), ("Navi", "Ruchbah"), ("Ruchbah", "Segin")],
+    "Cygnus": [("Deneb", "Sadr"), ("Sadr", "Albireo"), ("Fawaris", "Sadr"), ("Sadr", "Aljanah")],
+    "Lyra": [("Vega", "Sheliak"), ("Sheliak", "Sulafat"), ("Sulafat", "Vega")],
+    "Leo": [("Regulus", "Algieba"), ("Algieba", "Zosma"), ("Zosma", "Denebola"), ("Denebola", "Regulus")],
+    "Pegasus": [("Alpheratz", "Scheat"), ("Scheat", "Markab"), ("Markab", "Algenib"), ("Algenib", "Alpheratz"),
+                ("Markab", "Enif")],
+    "Gemini": [("Castor", "Pollux")],
+    "Crux": [("Acrux", "Gacrux")],
+    "Summer Triangle": [("Vega", "Deneb"), ("Deneb", "Altair"), ("Altair", "Vega")],
+}
+
+
+class Projection(NamedTuple):
+    width: float
+    height: float
+    radius: float
+
+    @property
+    def cx(self):
+        return self.width / 2
+
+    @property
+    def cy(self):
+        return self.height / 2
+
+
+class StarDiff(NamedTuple):
+    new_items: int              # items to append to the pool before applying the rest
+    place_slots: np.ndarray     # items that need coords(): risen or moved
+    place_boxes: np.ndarray     # (n, 4) oval bounding boxes for place_slots
+    restyle_slots: np.ndarray   # items now showing a different star
+    restyle_stars: np.ndarray   # field index of that star (for its colour)
+    hide_slots: np.ndarray
+    unhide_slots: np.ndarray
+
+
+class OverlayDiff(NamedTuple):
+    place: np.ndarray           # indices whose coordinates changed while visible
+    show: np.ndarray
+    hide: np.ndarray
+
+
+class Frame(NamedTuple):
+    stars: StarDiff
+    lines: np.ndarray           # (n_lines, 4) x0, y0, x1, y1
+    line_diff: OverlayDiff
+    targets: np.ndarray         # (n_targets, 2) x, y
+    target_diff: OverlayDiff
+    visible: int                # stars currently on screen
+
+
+# -----------------------------
+# Star field
+# -----------------------------
+class StarField:
+    """Fixed stars as unit vectors, precomputed in float32."""
+
+    def __init__(self, ra: np.ndarray, dec: np.ndarray, mag: np.ndarray, jd: Optional[float] = None,
+                 limit: float = np.inf):
+        self.limit = limit      # magnitude the source was cut at; fainter stars were never loaded
+        ra = np.asarray(ra, np.float64)
+        dec = np.asarray(dec, np.float64)
+        if jd is not None:   # precess once; the drift over a session is far below a pixel
+            ra, dec = sky.precess(ra, dec, jd)
+        ra_r, dec_r = np.radians(ra), np.radians(dec)
+        self.a = (np.cos(dec_r) * np.cos(ra_r)).astype(np.float32)
+        self.b = (np.cos(dec_r) * np.sin(ra_r)).astype(np.float32)
+        self.sin_dec = np.sin(dec_r).astype(np.float32)
+        self.mag = np.asarray(mag, np.float32)
+        self.size = np.clip(3.4 - 0.42 * self.mag, 0.7, 4.0).astype(np.float32)
+        self._shade = np.clip(255 - (self.mag + 1.5) * 17, 80, 255).astype(np.int64)
+
+    def __len__(self):
+        return len(self.mag)
+
+    def color(self, star: int) -> str:
+        v = int(self._shade[star])
+        return f"#{v:02x}{v:02x}{min(255, v + 24):02x}"
+
+    @classmethod
+    def from_sky_catalog(cls, catalog: sky.Catalog, jd: Optional[float] = None) -> "StarField":
+        stars = np.array([kind == "star" for kind in catalog.kinds])
+        return cls(catalog.ra[stars], catalog.dec[stars], catalog.mag[stars], jd)
+
+    @classmethod
+    def from_star_catalog(cls, path: str, max_mag: float, jd: Optional[float] = None) -> "StarField":
+        import star_catalog
+        stars = star_catalog.StarCatalog(path).brighter_than(max_mag)
+        return cls(stars["ra"], stars["dec"], stars["mag"], jd, limit=max_mag)
+
+
+def load_field(engine: sky.SkyEngine, jd: float, max_mag: float, path: str = STAR_CATALOG_PATH) -> StarField:
+    """Stars from data/stars.slcat when it exists, else the bright stars of the bundled catalog."""
+    if os.path.exists(path):
+        return StarField.from_star_catalog(path, max_mag, jd)
+    return StarField.from_sky_catalog(engine.catalog, jd)
+
+
+def project_field(a, b, sin_dec, jd: float, observer: sky.Observer, proj: Projection):
+    """Screen x, y and sin(altitude) for unit vectors (a, b, sin_dec) = (cos d cos ra, cos d sin ra, sin d)."""
+    lst = np.radians(sky.gmst_degrees(jd) + observer.longitude)
+    lat = np.radians(observer.latitude)
+    cl, sl = np.float32(np.cos(lst)), np.float32(np.sin(lst))
+    sin_lat, cos_lat = np.float32(np.sin(lat)), np.float32(np.cos(lat))
+    cos_h = cl * a + sl * b          # cos(dec) cos(hour angle)
+    sin_h = sl * a - cl * b          # cos(dec) sin(hour angle)
+    up = sin_lat * sin_dec + cos_lat * cos_h
+    north = cos_lat * sin_dec - sin_lat * cos_h
+    scale = np.float32(proj.radius) / np.maximum(1 + up, np.float32(1e-3))
+    # looking up at the sky: north at the top, east (-sin_h) on the left
+    return proj.cx - sin_h * scale, proj.cy - north * scale, up
+
+
+def project_altaz(alt: np.ndarray, az: np.ndarray, proj: Projection) -> Tuple[np.ndarray, np.ndarray]:
+    r = proj.radius * np.tan(np.radians(90 - alt) / 2)
+    az = np.radians(az)
+    return proj.cx - r * np.sin(az), proj.cy - r * np.cos(az)
+
+
+# -----------------------------
+# Item bookkeeping
+# -----------------------------
+class SlotTable:
+    """Stable star -> canvas item assignment with reuse of released items."""
+
+    def __init__(self, n: int, move_threshold: float):
+        self.slot_of = np.full(n, -1, np.int64)
+        self.drawn = np.zeros((0, 2), np.float32)
+        self.free = np.zeros(0, np.int64)        # hidden items waiting for a star
+        self.stale = np.zeros(0, np.int64)       # freed by reset() but still shown
+        self.pool = 0
+        self.move_threshold = move_threshold
+
+    def reset(self, n: int):
+        """Start over with a new star set, keeping the item pool."""
+        shown = self.slot_of[self.slot_of >= 0]
+        self.stale = np.concatenate([self.stale, shown])
+        self.free = np.concatenate([shown, self.free])
+        self.slot_of = np.full(n, -1, np.int64)
+
+    def update(self, visible: np.ndarray, x: np.ndarray, y: np.ndarray):
+        """Returns (new_items, entering, enter_slots, moved, move_slots, hide_slots, unhide_slots)."""
+        stale, self.stale = self.stale, self.stale[:0]
+        was = self.slot_of >= 0
+        leaving = np.flatnonzero(was & ~visible)
+        entering = np.flatnonzero(visible & ~was)
+        staying = np.flatnonzero(was & visible)
+
+        released = self.slot_of[leaving]
+        self.slot_of[leaving] = -1
+        # items released this frame go first: they are still shown, so no hide/unhide round trip
+        k = len(entering)
+        reused = released[:k]
+        revived = self.free[:k - len(reused)]
+        self.free = np.concatenate([self.free[len(revived):], released[k:]])
+        new = np.arange(self.pool, self.pool + k - len(reused) - len(revived), dtype=np.int64)
+        self.pool += len(new)
+        if len(new):
+            self.drawn = np.concatenate([self.drawn, np.zeros((len(new), 2), np.float32)])
+        enter_slots = np.concatenate([reused, revived, new])
+        self.slot_of[entering] = enter_slots
+
+        stay_slots = self.slot_of[staying]
+        drift = np.maximum(np.abs(x[staying] - self.drawn[stay_slots, 0]),
+                           np.abs(y[staying] - self.drawn[stay_slots, 1]))
+        moving = drift >= self.move_threshold
+        moved, move_slots = staying[moving], stay_slots[moving]
+
+        self.drawn[enter_slots, 0], self.drawn[enter_slots, 1] = x[entering], y[entering]
+        self.drawn[move_slots, 0], self.drawn[move_slots, 1] = x[moved], y[moved]
+        hide = np.concatenate([released[k:], np.setdiff1d(stale, revived)])
+        return len(new), entering, enter_slots, moved, move_slots, hide, np.setdiff1d(revived, stale)
+
+
+class OverlayTable:
+    """Last drawn coordinates and visibility of a small fixed set of items (lines, markers)."""
+
+    def __init__(self, move_threshold: float):
+        self.move_threshold = move_threshold
+        self.reset()
+
+    def reset(self):
+        self.drawn = None
+        self.shown = None
+
+    def update(self, coords: np.ndarray, visible: np.ndarray) -> OverlayDiff:
+        if self.drawn is None or self.drawn.shape != coords.shape:
+            self.drawn = np.full(coords.shape, np.nan, np.float32)
+            self.shown = np.zeros(len(coords), bool)
+        # NaN (never drawn) compares False, so those count as moved
+        still = np.abs(coords - self.drawn).max(axis=1, initial=0) < self.move_threshold
+        place = np.flatnonzero(visible & ~still)
+        self.drawn[place] = coords[place]
+        show = np.flatnonzero(visible & ~self.shown)
+        hide = np.flatnonzero(~visible & self.shown)
+        self.shown = visible.copy()
+        return OverlayDiff(place, show, hide)
+
+
+# -----------------------------
+# Sky map
+# -----------------------------
+class SkyMap:
+    def __init__(self, field: StarField, engine: sky.SkyEngine, observer: sky.Observer,
+                 targets: List[str] = (), max_mag: float = 6.5, move_threshold: float = 0.5):
+        self.field = field
+        self.engine = engine
+        self.observer = observer
+        self.move_threshold = move_threshold
+        self.proj = Projection(1, 1, 1)
+        index = engine.index
+        self.line_pairs = np.array([(index[a.lower()], index[b.lower()])
+                                    for pairs in CONSTELLATIONS.values() for a, b in pairs], np.int64)
+        self.lines = OverlayTable(move_threshold)
+        self.markers = OverlayTable(move_threshold)
+        self.slots: Optional[SlotTable] = None
+        self.set_targets(targets)
+        self.set_max_mag(max_mag)
+
+    def set_targets(self, texts: List[str]):
+        """Catalog objects named in the given schedule entries, e.g. ["Jupiter", "M42 (Orion)"]."""
+        ids: List[int] = []
+        for text in texts:
+            ids += [i for i in self.engine.find(text) if i not in ids]
+        self.target_ids = np.array(ids, np.int64)
+        self.target_names = [self.engine.catalog.names[i] for i in ids]
+        self.markers.reset()
+
+    def set_max_mag(self, max_mag: float):
+        # too-faint stars are culled before any per-frame work; item bookkeeping restarts
+        self.max_mag = max_mag
+        self.bright = np.flatnonzero(self.field.mag <= max_mag)
+        if self.slots is None:
+            self.slots = SlotTable(len(self.bright), self.move_threshold)
+        else:
+            self.slots.reset(len(self.bright))
+
+    def set_field(self, field: StarField, max_mag: float):
+        # e.g. the same catalog cut at a fainter limit
+        self.field = field
+        self.set_max_mag(max_mag)
+
+    def resize(self, width: int, height: int) -> bool:
+        proj = Projection(width, height, max(10, min(width, height) / 2 - 24))
+        if proj == self.proj:
+            return False
+        self.proj = proj
+        self.lines.reset()
+        self.markers.reset()
+        return True
+
+    def prepare(self, jd: float) -> Frame:
+        field, bright, proj = self.field, self.bright, self.proj
+        x, y, up = project_field(field.a[bright], field.b[bright], field.sin_dec[bright], jd, self.observer, proj)
+        visible = (up > 0) & (x >= 0) & (x <= proj.width) & (y >= 0) & (y <= proj.height)
+        new, entering, enter_slots, moved, move_slots, hide, unhide = self.slots.update(visible, x, y)
+
+        placed = np.concatenate([entering, moved])
+        px, py = x[placed], y[placed]
+        r = field.size[bright[placed]]
+        stars = StarDiff(new, np.concatenate([enter_slots, move_slots]),
+                         np.stack([px - r, py - r, px + r, py + r], axis=1),
+                         enter_slots, bright[entering], hide, unhide)
+
+        # lines and targets come from the small bundled catalog, which includes planets and the Moon
+        alt, az = self.engine.positions(self.observer, np.array([jd]))
+        alt, az = alt[:, 0], az[:, 0]
+        sx, sy = project_altaz(alt, az, proj)
+        a, b = self.line_pairs[:, 0], self.line_pairs[:, 1]
+        lines = np.stack([sx[a], sy[a], sx[b], sy[b]], axis=1).astype(np.float32)
+        t = self.target_ids
+        targets = np.stack([sx[t], sy[t]], axis=1).astype(np.float32)
+        return Frame(stars, lines, self.lines.update(lines, (alt[a] > 0) & (alt[b] > 0)),
+                     targets, self.markers.update(targets, alt[t] > 0), int(np.count_nonzero(visible)))
@@ -0,0 +1,258 @@
+"""Compact, memory-mapped star catalog with a declination-band grid index.
+
+File layout (``.slcat``)::
+
+    magic "SLCAT\\x01\\0\\0" | u4 header length | JSON header | pad
+    cell index: u8[cells + 1] record offsets | pad
+    records: RECORD_DTYPE[count], sorted by (cell, mag)
+
+The sky is cut into declination bands ``band_deg`` tall and each band into
+roughly square RA cells (fewer towards the poles). Because every cell is
+sorted by magnitude, "brighter than X" is a prefix of each cell, found by
+one vectorized binary search across all cells touched by a cone.
+
+Opening a catalog only reads the header; the index and the records are
+memory-mapped on the first query.
+
+    python star_catalog.py generate stars.slcat --stars 5000000
+    python star_catalog.py query stars.slcat 83.8 -5.4 2.5 --mag 9
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import struct
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"SLCAT\x01\x00\x00"
+RECORD_DTYPE = np.dtype([("ra", "<f4"), ("dec", "<f4"), ("mag", "<f4"), ("id", "<u4")])
+INDEX_DTYPE = np.dtype("<u8")
+DEFAULT_BAND_DEG = 1.0
+ALIGN = 16
+
+
+def _pad(n: int) -> int:
+    return -n % ALIGN
+
+
+def band_layout(band_deg: float) -> np.ndarray:
+    """Number of RA cells in each declination band, keeping cells close to square."""
+    bands = int(np.ceil(180 / band_deg))
+    centers = -90 + (np.arange(bands) + 0.5) * band_deg
+    return np.maximum(1, np.round(360 / band_deg * np.cos(np.radians(centers)))).astype(np.int64)
+
+
+def cell_of(ra: np.ndarray, dec: np.ndarray, band_deg: float, cells_per_band: np.ndarray,
+            band_start: np.ndarray) -> np.ndarray:
+    band = np.clip(((np.asarray(dec, np.float64) + 90) // band_deg).astype(np.int64), 0, len(cells_per_band) - 1)
+    n = cells_per_band[band]
+    col = np.minimum((np.asarray(ra, np.float64) % 360 / 360 * n).astype(np.int64), n - 1)
+    return band_start[band] + col
+
+
+# -----------------------------
+# Building
+# -----------------------------
+def build(path: str, ra: np.ndarray, dec: np.ndarray, mag: np.ndarray, ids: Optional[np.ndarray] = None,
+          band_deg: float = DEFAULT_BAND_DEG, chunk: int = 1_000_000) -> int:
+    count = len(ra)
+    if ids is None:
+        ids = np.arange(count, dtype=np.uint32)
+    cells_per_band = band_layout(band_deg)
+    band_start = np.concatenate([[0], np.cumsum(cells_per_band)[:-1]])
+    n_cells = int(cells_per_band.sum())
+
+    cell = cell_of(ra, dec, band_deg, cells_per_band, band_start)
+    order = np.lexsort((mag, cell))
+    offsets = np.zeros(n_cells + 1, dtype=INDEX_DTYPE)
+    np.cumsum(np.bincount(cell, minlength=n_cells), out=offsets[1:])
+    del cell
+
+    header = {"version": 1, "count": count, "band_deg": band_deg, "cells": n_cells,
+              "dtype": RECORD_DTYPE.descr}
+    # offsets depend on the header length, which depends on the offsets: fix point in two passes
+    for _ in range(2):
+        blob = json.dumps(header).encode()
+        head_len = len(MAGIC) + 4 + len(blob)
+        header["index_offset"] = head_len + _pad(head_len)
+        index_end = header["index_offset"] + offsets.nbytes
+        header["data_offset"] = index_end + _pad(index_end)
+    blob = json.dumps(header).encode()
+
+    with open(path, "wb") as fh:
+        fh.write(MAGIC + struct.pack("<I", len(blob)) + blob)
+        fh.write(b"\0" * (header["index_offset"] - fh.tell()))
+        fh.write(offsets.tobytes())
+        fh.write(b"\0" * (header["data_offset"] - fh.tell()))
+        fh.truncate(header["data_offset"] + count * RECORD_DTYPE.itemsize)
+
+    out = np.memmap(path, dtype=RECORD_DTYPE, mode="r+", offset=header["data_offset"], shape=(count,))
+    for start in range(0, count, chunk):
+        part = order[start:start + chunk]
+        block = np.empty(len(part), RECORD_DTYPE)
+        block["ra"], block["dec"], block["mag"], block["id"] = ra[part], dec[part], mag[part], ids[part]
+        out[start:start + len(part)] = block
+    out.flush()
+    del out
+    return count
+
+
+def synthetic_stars(count: int, seed: int = 0, mag_range: Tuple[float, float] = (-1.5, 16.0)):
+    """Random sky with a galactic-plane concentration and a realistic (steep) magnitude distribution."""
+    rng = np.random.default_rng(seed)
+    # galactic coordinates: half the stars in a thin disc, the rest spread out
+    l = rng.uniform(0, 2 * np.pi, count)
+    b = np.where(rng.random(count) < 0.5,
+                 rng.laplace(0, np.radians(6), count),
+                 np.arcsin(rng.uniform(-1, 1, count)))
+    b = np.clip(b, -np.pi / 2, np.pi / 2)
+    xyz_gal = np.stack([np.cos(b) * np.cos(l), np.cos(b) * np.sin(l), np.sin(b)])
+    # galactic -> equatorial (J2000) rotation
+    rot = np.array([[-0.0548755604, 0.4941094279, -0.8676661490],
+                    [-0.8734370902, -0.4448296300, -0.1980763734],
+                    [-0.4838350155, 0.7469822445, 0.4559837762]])
+    x, y, z = rot @ xyz_gal
+    ra = (np.degrees(np.arctan2(y, x)) % 360).astype(np.float32)
+    dec = np.degrees(np.arcsin(np.clip(z, -1, 1))).astype(np.float32)
+    # star counts grow roughly as 10^(0.35 m): sample that with the inverse CDF
+    a = 0.35
+    lo, hi = 10 ** (a * mag_range[0]), 10 ** (a * mag_range[1])
+    mag = (np.log10(lo + rng.random(count) * (hi - lo)) / a).astype(np.float32)
+    return ra, dec, mag
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+class StarCatalog:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a StarLens star catalog")
+            (length,) = struct.unpack("<I", fh.read(4))
+            self.header = json.loads(fh.read(length))
+        self.count = self.header["count"]
+        self.band_deg = self.header["band_deg"]
+        self.cells_per_band = band_layout(self.band_deg)
+        self.band_start = np.concatenate([[0], np.cumsum(self.cells_per_band)[:-1]])
+        self._index = None
+        self._stars = None
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def index(self) -> np.ndarray:
+        if self._index is None:
+            self._index = np.memmap(self.path, dtype=INDEX_DTYPE, mode="r", offset=self.header["index_offset"],
+                                    shape=(self.header["cells"] + 1,))
+        return self._index
+
+    @property
+    def stars(self) -> np.ndarray:
+        if self._stars is None:
+            self._stars = np.memmap(self.path, dtype=RECORD_DTYPE, mode="r", offset=self.header["data_offset"],
+                                    shape=(self.count,))
+        return self._stars
+
+    def cells_in_cone(self, ra: float, dec: float, radius: float) -> np.ndarray:
+        bands = len(self.cells_per_band)
+        lo = max(0, int((dec - radius + 90) // self.band_deg))
+        hi = min(bands - 1, int((dec + radius + 90) // self.band_deg))
+        if abs(dec) + radius >= 90:
+            half_width = 180.0   # the cone reaches a pole: every RA is involved
+        else:
+            half_width = np.degrees(np.arcsin(min(1.0, np.sin(np.radians(radius)) / np.cos(np.radians(dec)))))
+        cells = []
+        for band in range(lo, hi + 1):
+            n = int(self.cells_per_band[band])
+            if half_width >= 180 or n == 1:
+                cols = np.arange(n)
+            else:
+                first = int(np.floor((ra - half_width) % 360 / 360 * n))
+                span = int(np.ceil(2 * half_width / 360 * n)) + 1
+                cols = np.unique((first + np.arange(min(span, n))) % n)
+            cells.append(self.band_start[band] + cols)
+        return np.concatenate(cells)
+
+    def cone(self, ra: float, dec: float, radius: float, max_mag: float = 99.0) -> np.ndarray:
+        """Stars within ``radius`` degrees of (ra, dec) and brighter than ``max_mag``, brightest first."""
+        cells = self.cells_in_cone(ra, dec, radius)
+        index, stars = self.index, self.stars
+        start = index[cells].astype(np.int64)
+        stop = index[cells + 1].astype(np.int64)
+        cut = self._mag_cut(start, stop, max_mag)
+        lengths = cut - start
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, RECORD_DTYPE)
+        # flatten the [start, cut) ranges into one gather
+        base = np.repeat(start - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        picked = stars[base + np.arange(total)]
+        ra0, dec0 = np.radians(ra), np.radians(dec)
+        r_ra, r_dec = np.radians(picked["ra"].astype(np.float64)), np.radians(picked["dec"].astype(np.float64))
+        cos_d = np.sin(dec0) * np.sin(r_dec) + np.cos(dec0) * np.cos(r_dec) * np.cos(r_ra - ra0)
+        hits = picked[cos_d >= np.cos(np.radians(radius))]
+        return hits[np.argsort(hits["mag"], kind="stable")]
+
+    def _mag_cut(self, lo: np.ndarray, hi: np.ndarray, max_mag: float) -> np.ndarray:
+        # vectorized bisection: first record in each cell fainter than max_mag
+        mags = self.stars["mag"]
+        lo, hi = lo.copy(), hi.copy()
+        active = lo < hi
+        while active.any():
+            mid = (lo + hi) // 2
+            bright = np.zeros_like(active)
+            bright[active] = mags[mid[active]] <= max_mag
+            lo = np.where(active & bright, mid + 1, lo)
+            hi = np.where(active & ~bright, mid, hi)
+            active = lo < hi
+        return lo
+
+    def brighter_than(self, max_mag: float) -> np.ndarray:
+        """Every star brighter than ``max_mag`` (whole sky), brightest first."""
+        return self.cone(0.0, 90.0, 180.0, max_mag)
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query a StarLens star catalog (.slcat).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="write a synthetic catalog")
+    gen.add_argument("path")
+    gen.add_argument("--stars", type=int, default=5_000_000)
+    gen.add_argument("--seed", type=int, default=0)
+    gen.add_argument("--band-deg", type=float, default=DEFAULT_BAND_DEG)
+
+    query = sub.add_parser("query", help="cone search")
+    query.add_argument("path")
+    query.add_argument("ra", type=float)
+    query.add_argument("dec", type=float)
+    query.add_argument("radius", type=float)
+    query.add_argument("--mag", type=float, default=99.0)
+    query.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        start = time.perf_counter()
+        count = build(args.path, *synthetic_stars(args.stars, args.seed), band_deg=args.band_deg)
+        print(f"wrote {count:,} stars to {args.path} in {time.perf_counter() - start:.1f}s")
+    else:
+        catalog = StarCatalog(args.path)
+        start = time.perf_counter()
+        hits = catalog.cone(args.ra, args.dec, args.radius, args.mag)
+        elapsed = (time.perf_counter() - start) * 1000
+        for star in hits[:args.limit]:
+            print(f"{star['id']:>10}  RA {star['ra']:8.4f}  Dec {star['dec']:+8.4f}  mag {star['mag']:5.2f}")
+        print(f"{len(hits):,} stars in {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,627 @@
+"""SQLite data access for StarLens.
+
+``Database`` owns the single connection used by the app. Reads go straight
+to SQLite; writes that nobody waits on (quiz results, completed topics,
+schedule edits) are queued and committed together by ``flush()`` so a burst
+of clicks costs one transaction instead of one fsync each.
+"""
+from __future__ import annotations
+
+import hmac
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import auth
+
+DB_PATH = "astronomy_app.db"
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",   # WAL + NORMAL: commits no longer fsync, checkpoints do
+    "PRAGMA cache_size=-16000",    # ~16 MB page cache
+    "PRAGMA temp_store=MEMORY",
+)
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        username TEXT PRIMARY KEY,
+        password TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quiz_results (
+        username TEXT,
+        score INTEGER,
+        total INTEGER,
+        level TEXT,
+        time TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS completed_topics (
+        username TEXT,
+        topic_id INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS schedules (
+        username TEXT,
+        time TEXT,
+        object TEXT
+    )
+    """,
+    # per-user, per-level quiz aggregates (kept up to date by add_quiz_result)
+    """
+    CREATE TABLE IF NOT EXISTS quiz_stats (
+        username TEXT,
+        level TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        pct_sum REAL NOT NULL DEFAULT 0,
+        best_pct REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (username, level)
+    )
+    """,
+    # where each user observes from, for the sky engine
+    """
+    CREATE TABLE IF NOT EXISTS observers (
+        username TEXT PRIMARY KEY,
+        latitude REAL NOT NULL,
+        longitude REAL NOT NULL
+    )
+    """,
+    # question bank: ord is dense per level (0..n-1) so a position maps to a question by primary key
+    """
+    CREATE TABLE IF NOT EXISTS questions (
+        id INTEGER PRIMARY KEY,
+        level TEXT NOT NULL,
+        ord INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        options TEXT NOT NULL,
+        answer TEXT NOT NULL,
+        tags TEXT NOT NULL DEFAULT '',
+        difficulty REAL NOT NULL DEFAULT 0.5,
+        source TEXT,
+        UNIQUE (level, ord),
+        UNIQUE (level, text)
+    )
+    """,
+    # the same dense numbering per (tag, level), for picks from one topic
+    """
+    CREATE TABLE IF NOT EXISTS question_tags (
+        tag TEXT NOT NULL,
+        level TEXT NOT NULL,
+        ord INTEGER NOT NULL,
+        question_id INTEGER NOT NULL,
+        PRIMARY KEY (tag, level, ord)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS question_history (
+        username TEXT NOT NULL,
+        question_id INTEGER NOT NULL,
+        correct INTEGER NOT NULL,
+        time TEXT
+    )
+    """,
+    # per-user answer counts per tag, for choosing weak topics
+    """
+    CREATE TABLE IF NOT EXISTS tag_stats (
+        username TEXT NOT NULL,
+        tag TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        correct INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (username, tag)
+    )
+    """,
+    # where each user is in their own permutation of a level's questions
+    """
+    CREATE TABLE IF NOT EXISTS quiz_cursors (
+        username TEXT NOT NULL,
+        level TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        step INTEGER NOT NULL,
+        shift INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (username, level)
+    )
+    """,
+    # remembered logins; only a hash of the token is stored
+    """
+    CREATE TABLE IF NOT EXISTS sessions (
+        token_hash TEXT PRIMARY KEY,
+        username TEXT NOT NULL,
+        expires REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_quiz_results_username ON quiz_results (username)",
+    "CREATE INDEX IF NOT EXISTS idx_schedules_username ON schedules (username)",
+    "CREATE INDEX IF NOT EXISTS idx_question_history_user ON question_history (username, question_id)",
+)
+
+# Statements are module constants so sqlite3's per-connection statement
+# cache hands back the same prepared statement on every call.
+SQL_PASSWORD = "SELECT password FROM users WHERE username=?"
+SQL_SET_PASSWORD = "UPDATE users SET password=? WHERE username=? AND password=?"
+SQL_PLAINTEXT_PASSWORDS = """
+    SELECT rowid, username, password FROM users
+    WHERE rowid > ? AND password NOT GLOB 'scrypt$*' AND password NOT GLOB 'pbkdf2_sha256$*'
+    ORDER BY rowid LIMIT ?
+"""
+SQL_ADD_SESSION = "INSERT INTO sessions (token_hash, username, expires) VALUES (?, ?, ?)"
+SQL_SESSION_USER = "SELECT username FROM sessions WHERE token_hash=? AND expires > ?"
+SQL_DELETE_SESSION = "DELETE FROM sessions WHERE token_hash=?"
+SQL_PURGE_SESSIONS = "DELETE FROM sessions WHERE expires <= ?"
+SQL_CREATE_USER = "INSERT INTO users (username, password) VALUES (?, ?)"
+SQL_INSERT_RESULT = "INSERT INTO quiz_results (username, score, total, level, time) VALUES (?, ?, ?, ?, ?)"
+SQL_UPSERT_STATS = """
+    INSERT INTO quiz_stats (username, level, attempts, pct_sum, best_pct) VALUES (?, ?, 1, ?, ?)
+    ON CONFLICT (username, level) DO UPDATE SET
+        attempts = attempts + 1,
+        pct_sum = pct_sum + excluded.pct_sum,
+        best_pct = MAX(best_pct, excluded.best_pct)
+"""
+# one-off backfill for databases created before quiz_stats existed
+SQL_BACKFILL_STATS = """
+    INSERT INTO quiz_stats (username, level, attempts, pct_sum, best_pct)
+    SELECT username, level, COUNT(*), SUM(score * 100.0 / total), MAX(score * 100.0 / total)
+    FROM quiz_results WHERE total > 0 AND NOT EXISTS (SELECT 1 FROM quiz_stats)
+    GROUP BY username, level
+"""
+SQL_PROFILE_STATS = "SELECT SUM(attempts), SUM(pct_sum), MAX(best_pct) FROM quiz_stats WHERE username=?"
+SQL_RECENT_RESULTS = "SELECT score, total, level, time FROM quiz_results WHERE username=? ORDER BY rowid DESC LIMIT ?"
+SQL_COMPLETE_TOPIC = """
+    INSERT INTO completed_topics (username, topic_id) VALUES (?, ?)
+    ON CONFLICT (username, topic_id) DO NOTHING
+"""
+SQL_COMPLETED_TOPICS = "SELECT topic_id FROM completed_topics WHERE username=?"
+# older versions inserted a row per click; keep the first of each (username, topic_id)
+SQL_DEDUP_TOPICS = """
+    DELETE FROM completed_topics WHERE rowid NOT IN (
+        SELECT MIN(rowid) FROM completed_topics GROUP BY username, topic_id
+    )
+"""
+SQL_UNIQUE_TOPICS = """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_completed_topics_unique ON completed_topics (username, topic_id)
+"""
+SQL_SCHEDULES = "SELECT rowid, time, object FROM schedules WHERE username=? ORDER BY rowid"
+SQL_ADD_SCHEDULE = "INSERT INTO schedules (username, time, object) VALUES (?, ?, ?)"
+SQL_UPDATE_SCHEDULE = "UPDATE schedules SET time=?, object=? WHERE rowid=? AND username=?"
+SQL_OBSERVER = "SELECT latitude, longitude FROM observers WHERE username=?"
+SQL_SET_OBSERVER = """
+    INSERT INTO observers (username, latitude, longitude) VALUES (?, ?, ?)
+    ON CONFLICT (username) DO UPDATE SET latitude = excluded.latitude, longitude = excluded.longitude
+"""
+SQL_EXPORT_SCHEDULES = "SELECT rowid, username, time, object FROM schedules ORDER BY username, rowid"
+SQL_EXPORT_USER_SCHEDULES = "SELECT rowid, username, time, object FROM schedules WHERE username=? ORDER BY rowid"
+SQL_QUESTION_COUNT = "SELECT COALESCE(MAX(ord) + 1, 0) FROM questions WHERE level=?"
+SQL_QUESTION_AT = "SELECT id, level, text, options, answer, tags, difficulty FROM questions WHERE level=? AND ord=?"
+SQL_QUESTION_EXISTS = "SELECT 1 FROM questions WHERE level=? AND text=?"
+SQL_SOURCE_LOADED = "SELECT 1 FROM questions WHERE source=? LIMIT 1"
+
+# Schema versions, applied in order and recorded in PRAGMA user_version, so
+# opening an up-to-date database costs one pragma read. Version 1 is the
+# schema from before versioning: IF NOT EXISTS and repeatable data fixes let
+# those databases (user_version 0) upgrade in place. Append, never edit.
+MIGRATIONS: Tuple[Tuple[str, ...], ...] = (
+    SCHEMA + (
+        SQL_BACKFILL_STATS,
+        # duplicates go before completed_topics can be unique; the new index covers username lookups too
+        SQL_DEDUP_TOPICS,
+        "DROP INDEX IF EXISTS idx_completed_topics_username",
+        SQL_UNIQUE_TOPICS,
+    ),
+    # question_bank.ensure_builtin looks up bundled packs by name on every quiz start
+    ("CREATE INDEX IF NOT EXISTS idx_questions_source ON questions (source)",),
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+SQL_ADD_QUESTION = """
+    INSERT INTO questions (level, ord, text, options, answer, tags, difficulty, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_TAG_COUNT = "SELECT COALESCE(MAX(ord) + 1, 0) FROM question_tags WHERE tag=? AND level=?"
+SQL_TAG_QUESTION_AT = """
+    SELECT q.id, q.level, q.text, q.options, q.answer, q.tags, q.difficulty
+    FROM question_tags t JOIN questions q ON q.id = t.question_id
+    WHERE t.tag=? AND t.level=? AND t.ord=?
+"""
+SQL_ADD_QUESTION_TAG = "INSERT INTO question_tags (tag, level, ord, question_id) VALUES (?, ?, ?, ?)"
+SQL_ANSWERED = "SELECT 1 FROM question_history WHERE username=? AND question_id=? LIMIT 1"
+SQL_ADD_ANSWER = "INSERT INTO question_history (username, question_id, correct, time) VALUES (?, ?, ?, ?)"
+SQL_UPSERT_TAG_STATS = """
+    INSERT INTO tag_stats (username, tag, attempts, correct) VALUES (?, ?, 1, ?)
+    ON CONFLICT (username, tag) DO UPDATE SET attempts = attempts + 1, correct = correct + excluded.correct
+"""
+SQL_WEAK_TAGS = """
+    SELECT tag FROM tag_stats WHERE username=? AND attempts >= ?
+    ORDER BY (correct + 1.0) / (attempts + 2.0), attempts DESC LIMIT ?
+"""
+SQL_QUIZ_CURSOR = "SELECT size, step, shift, position FROM quiz_cursors WHERE username=? AND level=?"
+SQL_SET_QUIZ_CURSOR = """
+    INSERT INTO quiz_cursors (username, level, size, step, shift, position) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (username, level) DO UPDATE SET
+        size = excluded.size, step = excluded.step, shift = excluded.shift, position = excluded.position
+"""
+
+
+class QuizResult(NamedTuple):
+    score: int
+    total: int
+    level: str
+    time: str
+
+    @property
+    def pct(self) -> float:
+        return round(self.score / self.total * 100, 1) if self.total else 0
+
+
+class ProfileStats(NamedTuple):
+    attempts: int
+    average: float
+    best: float
+
+
+class Question(NamedTuple):
+    id: int
+    level: str
+    text: str
+    options: List[str]
+    answer: str
+    tags: List[str]
+    difficulty: float
+
+    @classmethod
+    def from_row(cls, row) -> "Question":
+        qid, level, text, options, answer, tags, difficulty = row
+        return cls(qid, level, text, json.loads(options), answer, tags.split(",") if tags else [], difficulty)
+
+
+class QuizCursor(NamedTuple):
+    size: int       # questions in the level when the permutation was drawn
+    step: int       # position k maps to ord (step * k + shift) % size; gcd(step, size) == 1
+    shift: int
+    position: int
+
+
+class ScheduleEntry(NamedTuple):
+    id: Optional[int]   # schedules.rowid; None for the built-in suggestions
+    time: str
+    object: str
+
+
+class Database:
+    def __init__(self, path: str = DB_PATH, batch_size: int = 64, max_delay: float = 0.5,
+                 hasher: Optional[auth.PasswordHasher] = None):
+        self.path = path
+        self.hasher = hasher or auth.PasswordHasher()
+        self._migrated_upto = 0
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        # autocommit mode: transactions are opened explicitly in flush()/_write()
+        self.conn = sqlite3.connect(path, isolation_level=None, cached_statements=256)
+        self.cur = self.conn.cursor()
+        self._pending: List[Tuple[str, tuple]] = []
+        self._progress: Dict[str, FrozenSet[int]] = {}    # username -> completed topic ids
+        self._pending_since = 0.0
+        for pragma in PRAGMAS:
+            self.cur.execute(pragma)
+        self._migrate()
+
+    @property
+    def schema_version(self) -> int:
+        return self.cur.execute("PRAGMA user_version").fetchone()[0]
+
+    def _migrate(self):
+        if self.schema_version >= SCHEMA_VERSION:
+            return
+        with self.transaction(immediate=True):
+            # re-read under the write lock: another connection may have just migrated
+            for statements in MIGRATIONS[self.schema_version:]:
+                for sql in statements:
+                    self.cur.execute(sql)
+            self.cur.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    # -----------------------------
+    # Transactions / write-behind queue
+    # -----------------------------
+    def transaction(self, immediate: bool = False):
+        return _Transaction(self.conn, "BEGIN IMMEDIATE" if immediate else "BEGIN")
+
+    def defer(self, sql: str, params: tuple = ()):
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        self._pending.append((sql, params))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def flush_due(self) -> Optional[float]:
+        """``time.monotonic()`` at which flush_if_due() commits the queue; None while it is empty."""
+        return self._pending_since + self.max_delay if self._pending else None
+
+    def flush(self):
+        if not self._pending:
+            return
+        try:
+            try:
+                self._commit_batch(self._pending)
+            except sqlite3.OperationalError:
+                raise
+            except sqlite3.Error:
+                # a statement that can never commit (constraint, bad value): commit the rest without it
+                self._commit_batch(self._pending, isolate=True)
+        except sqlite3.OperationalError:
+            # rolled back (busy, locked, disk full, ...): keep the batch and retry it max_delay from now
+            self._pending_since = time.monotonic()
+            raise
+        self._pending.clear()
+
+    def _commit_batch(self, batch: List[Tuple[str, tuple]], isolate: bool = False):
+        with self.transaction():
+            for sql, params in batch:
+                if not isolate:
+                    self.cur.execute(sql, params)
+                    continue
+                self.cur.execute("SAVEPOINT queued")
+                try:
+                    self.cur.execute(sql, params)
+                except sqlite3.OperationalError:
+                    raise
+                except sqlite3.Error as exc:
+                    self.cur.execute("ROLLBACK TO queued")
+                    print(f"[storage] dropped queued write {' '.join(sql.split())[:60]} {params!r}: {exc}",
+                          file=sys.stderr)
+                self.cur.execute("RELEASE queued")
+
+    def flush_if_due(self):
+        if self._pending and time.monotonic() - self._pending_since >= self.max_delay:
+            self.flush()
+
+    def _write(self, sql: str, params: tuple = ()) -> int:
+        # immediate write for callers that need the new rowid back
+        self.flush()
+        with self.transaction():
+            return self.cur.execute(sql, params).lastrowid
+
+    def _read(self, sql: str, params: tuple = ()):
+        # queued writes must be visible to whoever reads next; if they can't commit just now
+        # (locked, disk full), the read goes ahead without them and the worker's next flush retries
+        try:
+            self.flush()
+        except sqlite3.OperationalError:
+            pass
+        return self.cur.execute(sql, params)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+
+    # -----------------------------
+    # Users
+    # -----------------------------
+    # password derivation takes tens of milliseconds: call these from the DB worker only
+    def check_login(self, username: str, password: str) -> bool:
+        row = self._read(SQL_PASSWORD, (username,)).fetchone()
+        stored = row[0] if row else None
+        if stored is not None and not auth.is_hashed(stored):
+            # plaintext row that migrate_passwords() has not reached yet
+            ok = hmac.compare_digest(stored.encode(), password.encode())
+        else:
+            ok = self.hasher.verify(password, stored)
+        if ok and (not auth.is_hashed(stored) or self.hasher.needs_rehash(stored)):
+            self._write(SQL_SET_PASSWORD, (self.hasher.hash(password), username, stored))
+        return ok
+
+    def create_user(self, username: str, password: str) -> bool:
+        try:
+            self._write(SQL_CREATE_USER, (username, self.hasher.hash(password)))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def migrate_passwords(self, batch: int = 8) -> int:
+        """Hash up to ``batch`` plaintext passwords; returns how many were converted (0 when done)."""
+        rows = self._read(SQL_PLAINTEXT_PASSWORDS, (self._migrated_upto, batch)).fetchall()
+        if not rows:
+            return 0
+        self._migrated_upto = rows[-1][0]
+        # derive outside the transaction so the write lock is held for the UPDATEs only
+        updates = [(self.hasher.hash(password), username, password) for _, username, password in rows]
+        with self.transaction():
+            self.cur.executemany(SQL_SET_PASSWORD, updates)
+        return len(rows)
+
+    def create_session(self, username: str, days: float = auth.SESSION_DAYS) -> str:
+        token, digest = auth.new_token()
+        now = time.time()
+        self.flush()
+        with self.transaction():
+            self.cur.execute(SQL_PURGE_SESSIONS, (now,))
+            self.cur.execute(SQL_ADD_SESSION, (digest, username, now + days * 86400))
+        return token
+
+    def session_user(self, token: str) -> Optional[str]:
+        row = self._read(SQL_SESSION_USER, (auth.token_digest(token), time.time())).fetchone()
+        return row[0] if row else None
+
+    def delete_session(self, token: str):
+        self._write(SQL_DELETE_SESSION, (auth.token_digest(token),))
+
+    # -----------------------------
+    # Quiz results
+    # -----------------------------
+    def add_quiz_result(self, username: str, score: int, total: int, level: str, when: Optional[str] = None):
+        when = when or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        pct = score * 100.0 / total if total else 0.0
+        self.defer(SQL_INSERT_RESULT, (username, score, total, level, when))
+        self.defer(SQL_UPSERT_STATS, (username, level, pct, pct))
+
+    def profile_stats(self, username: str) -> ProfileStats:
+        # at most one quiz_stats row per level, so this is constant time
+        attempts, pct_sum, best = self._read(SQL_PROFILE_STATS, (username,)).fetchone()
+        if not attempts:
+            return ProfileStats(0, 0, 0)
+        return ProfileStats(attempts, round(pct_sum / attempts, 1), round(best, 1))
+
+    def recent_results(self, username: str, limit: int = 10) -> List[QuizResult]:
+        rows = self._read(SQL_RECENT_RESULTS, (username, limit)).fetchall()
+        return [QuizResult(*row) for row in reversed(rows)]
+
+    # -----------------------------
+    # Learning progress
+    # -----------------------------
+    def mark_topic_complete(self, username: str, topic_id: int):
+        self.defer(SQL_COMPLETE_TOPIC, (username, topic_id))
+        self._progress.pop(username, None)
+
+    def completed_topics(self, username: str) -> FrozenSet[int]:
+        # one query per user until their next write
+        if username not in self._progress:
+            self._progress[username] = frozenset(t for (t,) in self._read(SQL_COMPLETED_TOPICS, (username,)))
+        return self._progress[username]
+
+    # -----------------------------
+    # Schedules
+    # -----------------------------
+    def schedules(self, username: str) -> List[ScheduleEntry]:
+        return [ScheduleEntry(*row) for row in self._read(SQL_SCHEDULES, (username,))]
+
+    def add_schedule(self, username: str, time_: str, obj: str) -> ScheduleEntry:
+        return ScheduleEntry(self._write(SQL_ADD_SCHEDULE, (username, time_, obj)), time_, obj)
+
+    def update_schedule(self, username: str, entry_id: int, time_: str, obj: str):
+        self.defer(SQL_UPDATE_SCHEDULE, (time_, obj, entry_id, username))
+
+    def add_schedules(self, rows: Iterable[Tuple[str, str, str]]) -> int:
+        """Insert (username, time, object) rows with one executemany in one transaction."""
+        self.flush()
+        with self.transaction():
+            self.cur.executemany(SQL_ADD_SCHEDULE, rows)
+            return self.cur.rowcount
+
+    def iter_schedules(self, username: Optional[str] = None, batch: int = 1000) -> Iterator[Tuple[int, str, str, str]]:
+        """Stream (rowid, username, time, object) rows without loading the table."""
+        self.flush()
+        # own cursor so other calls on self.cur don't reset the stream
+        cur = self.conn.cursor()
+        if username is None:
+            cur.execute(SQL_EXPORT_SCHEDULES)
+        else:
+            cur.execute(SQL_EXPORT_USER_SCHEDULES, (username,))
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            yield from rows
+
+    # -----------------------------
+    # Observer location
+    # -----------------------------
+    def observer_location(self, username: str) -> Optional[Tuple[float, float]]:
+        return self._read(SQL_OBSERVER, (username,)).fetchone()
+
+    def set_observer_location(self, username: str, latitude: float, longitude: float):
+        self.defer(SQL_SET_OBSERVER, (username, latitude, longitude))
+
+    # -----------------------------
+    # Question bank
+    # -----------------------------
+    def question_count(self, level: str) -> int:
+        return self._read(SQL_QUESTION_COUNT, (level,)).fetchone()[0]
+
+    def has_source(self, source: str) -> bool:
+        """Whether any question came from the pack named ``source``."""
+        return self._read(SQL_SOURCE_LOADED, (source,)).fetchone() is not None
+
+    def question_at(self, level: str, ord_: int) -> Optional[Question]:
+        row = self._read(SQL_QUESTION_AT, (level, ord_)).fetchone()
+        return Question.from_row(row) if row else None
+
+    def tag_question_count(self, tag: str, level: str) -> int:
+        return self._read(SQL_TAG_COUNT, (tag, level)).fetchone()[0]
+
+    def tag_question_at(self, tag: str, level: str, ord_: int) -> Optional[Question]:
+        row = self._read(SQL_TAG_QUESTION_AT, (tag, level, ord_)).fetchone()
+        return Question.from_row(row) if row else None
+
+    def add_questions(self, rows: Iterable[Tuple[str, str, List[str], str, List[str], float, Optional[str]]]) -> int:
+        """Append (level, text, options, answer, tags, difficulty, source) rows in one transaction.
+
+        Questions already in the bank (same level and text) are skipped; returns how many were added.
+        """
+        self.flush()
+        added = 0
+        next_ord, next_tag_ord = {}, {}
+        with self.transaction():
+            for level, text, options, answer, tags, difficulty, source in rows:
+                if self.cur.execute(SQL_QUESTION_EXISTS, (level, text)).fetchone():
+                    continue
+                if level not in next_ord:
+                    next_ord[level] = self.cur.execute(SQL_QUESTION_COUNT, (level,)).fetchone()[0]
+                qid = self.cur.execute(SQL_ADD_QUESTION, (level, next_ord[level], text, json.dumps(options), answer,
+                                                          ",".join(tags), difficulty, source)).lastrowid
+                next_ord[level] += 1
+                for tag in tags:
+                    key = (tag, level)
+                    if key not in next_tag_ord:
+                        next_tag_ord[key] = self.cur.execute(SQL_TAG_COUNT, key).fetchone()[0]
+                    self.cur.execute(SQL_ADD_QUESTION_TAG, (tag, level, next_tag_ord[key], qid))
+                    next_tag_ord[key] += 1
+                added += 1
+        return added
+
+    def has_answered(self, username: str, question_id: int) -> bool:
+        return self._read(SQL_ANSWERED, (username, question_id)).fetchone() is not None
+
+    def record_answer(self, username: str, question: Question, correct: bool, when: Optional[str] = None):
+        when = when or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.defer(SQL_ADD_ANSWER, (username, question.id, int(correct), when))
+        for tag in question.tags:
+            self.defer(SQL_UPSERT_TAG_STATS, (username, tag, int(correct)))
+
+    def weak_tags(self, username: str, limit: int = 3, min_attempts: int = 2) -> List[str]:
+        """Tags with the worst (smoothed) success rate for this user."""
+        return [tag for (tag,) in self._read(SQL_WEAK_TAGS, (username, min_attempts, limit))]
+
+    def quiz_cursor(self, username: str, level: str) -> Optional[QuizCursor]:
+        row = self._read(SQL_QUIZ_CURSOR, (username, level)).fetchone()
+        return QuizCursor(*row) if row else None
+
+    def set_quiz_cursor(self, username: str, level: str, cursor: QuizCursor):
+        self.defer(SQL_SET_QUIZ_CURSOR, (username, level, *cursor))
+
+
+class _Transaction:
+    def __init__(self, conn, begin="BEGIN"):
+        self.conn = conn
+        self.begin = begin
+
+    def __enter__(self):
+        self.conn.execute(self.begin)
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            try:
+                self.conn.execute("COMMIT")
+                return False
+            except sqlite3.Error:
+                # a failed COMMIT (SQLITE_BUSY) leaves the transaction open
+                self._rollback()
+                raise
+        self._rollback()
+        return False
+
+    def _rollback(self):
+        # some errors (disk full, I/O) have already rolled the transaction back
+        if self.conn.in_transaction:
+            self.conn.execute("ROLLBACK")
@@ -0,0 +1,217 @@
+"""Database I/O off the Tk main thread.
+
+``DbWorker`` runs every database job on one dedicated thread (SQLite
+connections stay on the thread that opened them) and hands results back to
+Tk by polling a queue with ``root.after``. What ``factory`` opens need not
+be a Database: the leaderboard runs analytics on a worker of its own. Given
+an ``instrument.Tracer``, a worker records a span for each job and result
+callback. ``CallbackMonitor`` times every
+Python callback Tk dispatches so we can check that nothing on the main
+thread runs longer than a few milliseconds, and ``StartupProfile`` records
+the phases between launch and a usable login window.
+"""
+from __future__ import annotations
+
+import queue
+import sys
+import threading
+import time
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class DbWorker:
+    def __init__(self, root, factory, poll_ms=15, tracer=None, name="starlens-db"):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.tracer = tracer
+        self.db = None
+        self._open_error = None
+        self._results = queue.SimpleQueue()
+        self._flush_id = None
+        self.closed = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name,
+                                            initializer=self._open, initargs=(factory,))
+        self._after_id = root.after(poll_ms, self._poll)
+
+    def _open(self, factory):
+        try:
+            self.db = factory()
+        except Exception as exc:
+            # fail each job (to its error callback) rather than break the executor
+            self._open_error = exc
+
+    def submit(self, job, callback=None, error=None):
+        """Run ``job(db)`` on the worker; ``callback(result)`` runs later on the Tk thread."""
+        tracer = self.tracer
+        queued = time.perf_counter()
+
+        def run():
+            try:
+                if self._open_error is not None:
+                    raise self._open_error
+                if tracer is not None and tracer.enabled:
+                    wait_ms = round((time.perf_counter() - queued) * 1000, 2)
+                    with tracer.span(getattr(job, "__qualname__", "job"), "db job", queued_ms=wait_ms):
+                        result = job(self.db)
+                else:
+                    result = job(self.db)
+            except Exception as exc:
+                self._results.put((error, exc, True))
+            else:
+                self._results.put((callback, result, False))
+        self._executor.submit(run)
+
+    def _poll(self):
+        while not self.closed:
+            try:
+                callback, value, failed = self._results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                self._deliver(callback, value, failed)
+            except Exception:
+                # a broken screen callback must not stop result delivery for the rest of the session
+                self.root.report_callback_exception(*sys.exc_info())
+        if self.closed:
+            return      # a callback closed the app; root may be gone
+        # group queued writes into one commit: one timer, due when the oldest is old enough
+        due = getattr(self.db, "flush_due", None)
+        if due is not None and self._flush_id is None:
+            self._flush_id = self.root.after(max(0, round((due - time.monotonic()) * 1000)), self._flush_when_due)
+        self._after_id = self.root.after(self.poll_ms, self._poll)
+
+    def _deliver(self, callback, value, failed):
+        if failed and callback is None:
+            self.root.report_callback_exception(type(value), value, value.__traceback__)
+        elif callback is not None:
+            if self.tracer is not None and self.tracer.enabled:
+                with self.tracer.span(getattr(callback, "__qualname__", "callback"), "db result"):
+                    callback(value)
+            else:
+                callback(value)
+
+    def _flush_when_due(self):
+        self._flush_id = None
+        self.submit(self._flush_if_due)
+
+    @staticmethod
+    def _flush_if_due(db):
+        db.flush_if_due()
+
+    def close(self, wait=True):
+        """Stop delivering results and close the connection after the jobs already queued.
+
+        ``wait=False`` returns at once and lets a long job finish in the background.
+        """
+        self.closed = True
+        self.root.after_cancel(self._after_id)
+        if self._flush_id is not None:
+            self.root.after_cancel(self._flush_id)
+        self._executor.submit(lambda: self.db and self.db.close())
+        self._executor.shutdown(wait=wait)
+
+
+class CallbackMonitor:
+    """Times Tk -> Python callbacks by swapping in a timing ``tkinter.CallWrapper``.
+
+    Callbacks that spin a nested event loop (message boxes, simpledialog)
+    are counted separately as modal: their duration is the time the user
+    spent in the dialog, not work done on the main thread.
+    """
+
+    def __init__(self, budget_ms=5.0, stream=sys.stderr):
+        self.budget = budget_ms / 1000
+        self.stream = stream
+        self.durations = []
+        self.slow = []
+        self.modal = 0
+        self._depth = 0
+        self._nested = 0
+        self._original = None
+
+    def install(self):
+        monitor = self
+        self._original = original = tk.CallWrapper
+
+        class TimedCallWrapper(original):
+            def __call__(self, *args):
+                return monitor._timed(self.func, super().__call__, args)
+
+        tk.CallWrapper = TimedCallWrapper
+        return self
+
+    def uninstall(self):
+        if self._original is not None:
+            tk.CallWrapper = self._original
+
+    def _timed(self, func, call, args):
+        self._depth += 1
+        nested_before = self._nested
+        start = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._depth -= 1
+            modal = self._nested != nested_before
+            if self._depth:
+                self._nested += 1
+            if modal:
+                self.modal += 1
+            else:
+                self.durations.append(elapsed)
+                if elapsed > self.budget:
+                    name = getattr(func, "__qualname__", repr(func))
+                    self.slow.append((name, elapsed))
+                    print(f"[watchdog] {name} blocked the main thread for {elapsed * 1000:.1f} ms",
+                          file=self.stream)
+
+    def summary(self):
+        if not self.durations:
+            return "[watchdog] no callbacks recorded"
+        ordered = sorted(self.durations)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+        return (f"[watchdog] {len(ordered)} callbacks: p50 {pick(0.5):.2f} ms, p99 {pick(0.99):.2f} ms, "
+                f"max {ordered[-1] * 1000:.2f} ms, {len(self.slow)} over {self.budget * 1000:.0f} ms budget, "
+                f"{self.modal} modal")
+
+
+class StartupProfile:
+    """Wall-clock phases from launch to a usable login window (``--profile-startup``).
+
+    Times are relative to ``started`` (taken as StarLens.py begins executing)
+    and phases may be recorded from any thread.
+    """
+
+    def __init__(self, started, stream=sys.stderr):
+        self.started = started
+        self.stream = stream
+        self.phases = []    # (name, start, end, thread); end == start for a mark
+
+    def add(self, name, start, end=None):
+        end = start if end is None else end
+        self.phases.append((name, start - self.started, end - self.started, threading.current_thread().name))
+
+    def mark(self, name):
+        self.add(name, time.perf_counter())
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter())
+
+    def elapsed(self, name):
+        """Milliseconds from start to the end of the first phase called ``name``, or None."""
+        return next((end * 1000 for n, _, end, _ in self.phases if n == name), None)
+
+    def report(self):
+        lines = ["[startup]    at ms    took ms  phase"]
+        for name, start, end, thread in sorted(self.phases, key=lambda phase: phase[1]):
+            took = f"{(end - start) * 1000:9.1f}" if end > start else " " * 9
+            lines.append(f"[startup] {start * 1000:8.1f}  {took}  {name} ({thread})")
+        return "\n".join(lines)